@@ -0,0 +1,73 @@
+# /backend/benchmarks/bench_chunks.py
+"""Compare loading a whole map with streaming the chunks around a player.
+
+    python -m benchmarks.bench_chunks [--sizes 250 1000 2000]
+
+Builds square synthetic maps in memory, packs them the way MapChunk
+stores them, and times, per map size: rebuilding the server's MapGrid
+from every chunk, serializing the whole map as maps/<id>/ does, and
+serializing the 3 x 3 chunks a client starts with from maps/<id>/chunks/.
+Only the last of these is what a player waits on before the first frame.
+"""
+import argparse
+import json
+import random
+import time
+import numpy as np
+from .common import setup_django
+
+setup_django()
+
+from game_app.map_chunks import CHUNK_SIZE, chunk_payload, grid_chunks
+from game_app.map_grid import MapGrid
+
+COLORS = ['#654321', '#808080', '#3a7d44', '#d4a373']
+
+def make_square_map(size, seed=0):
+    """Terrain on layer 1 with scattered decoration on layers 0 and 2."""
+    rng = np.random.default_rng(seed)
+    grid = MapGrid('synthetic', size, size, palette=[None, *COLORS])
+    surface = (size * 0.6 + np.cumsum(rng.integers(-1, 2, size))).clip(1, size - 1)
+    rows = np.arange(size)[:, None]
+    grid.layers[1] = np.where(rows >= surface[None, :], 1, 0).astype(np.uint8)
+    for layer in (0, 2):
+        decorated = rng.random((size, size)) < 0.1
+        grid.layers[layer] = np.where(decorated, rng.integers(2, len(COLORS) + 1, (size, size)), 0).astype(np.uint8)
+    return grid
+
+def timed(function, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main(args):
+    print(f"{'size':>6} {'chunks':>7} {'stored KB':>10} {'load ms':>9} {'whole map ms':>13} {'whole map KB':>13} "
+          f"{'3x3 chunks ms':>14} {'3x3 chunks KB':>14}")
+    for size in args.sizes:
+        grid = make_square_map(size)
+        chunks = list(grid_chunks(grid))
+        stored = sum(len(data) for *_, data in chunks)
+
+        load, _ = timed(lambda: MapGrid.from_chunks('synthetic', size, size, chunks))
+        whole, body = timed(lambda: json.dumps(grid.to_payload(), separators=(',', ':')))
+
+        # A player spawned somewhere on the map starts with its chunk and the 8 around it
+        cx, cy = random.Random(size).randrange(1, size // CHUNK_SIZE - 1), size // CHUNK_SIZE // 2
+        by_key = {}
+        for layer, chunk_x, chunk_y, data in chunks:
+            if abs(chunk_x - cx) <= 1 and abs(chunk_y - cy) <= 1:
+                by_key.setdefault((chunk_x, chunk_y), []).append((layer, data))
+        streamed, first_frame = timed(lambda: json.dumps(
+            {'chunks': [chunk_payload(x, y, layers) for (x, y), layers in sorted(by_key.items())]},
+            separators=(',', ':')))
+
+        print(f"{size:>6} {len(chunks):>7} {stored / 1024:>10.1f} {load * 1000:>9.1f} {whole * 1000:>13.1f} "
+              f"{len(body) / 1024:>13.1f} {streamed * 1000:>14.2f} {len(first_frame) / 1024:>14.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[250, 1000, 2000])
+    main(parser.parse_args())
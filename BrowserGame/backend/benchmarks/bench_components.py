@@ -0,0 +1,193 @@
+# /backend/benchmarks/bench_components.py
+"""Per-component micro-benchmarks, with stored baselines to catch regressions.
+
+    python -m benchmarks.bench_components [--maps 400x60 2000x250] [--densities 0.05 0.3]
+                                          [--players 1 100] [--components ground collision ...]
+                                          [--save-baseline FILE] [--baseline FILE] [--tolerance 0.15]
+
+Times, on synthetic maps of each size and solid-tile density and with each
+player count, one call of:
+
+- ground:    GameState.get_ground_level
+- collision: CollisionComponent.check_collision, moving a player a little
+- movement:  MovementComponent.update_player_position, one tick's step,
+             which includes the collision check and the animation update
+- animation: AnimationComponent.update_pivot_points
+
+Each case calls its component once per player, round after round, and
+reports the best ops/s over `--repeat` runs. A separate traced pass
+reports, per call, the bytes allocated while the call ran (its peak above
+what was live before it) and the bytes still held after it. Components run
+without the /metrics profiler.
+
+`--save-baseline` stores the results as JSON. `--baseline` compares against
+a stored file and flags every case whose ops/s dropped, or whose allocations
+grew, by more than `--tolerance`; the exit status is 1 if any did.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from .common import setup_django, make_random_map, make_game_state
+
+setup_django()
+
+from django.conf import settings
+
+COMPONENTS = ('ground', 'collision', 'movement', 'animation')
+
+def make_case(grid, players, seed=0):
+    """A game state on `grid` with `players` players standing on the ground, spread across it."""
+    state = make_game_state(grid)
+    rng = random.Random(seed)
+    for i in range(players):
+        state.add_player(f'player-{i:04d}', rng.uniform(1, grid.width - 2), grid.height)
+    return state
+
+def component_call(state, component, rng):
+    """`call(round_index, i)`, running `component` once for player `i`, and the number of players."""
+    players = list(state.players.items())
+    xs = [rng.uniform(0, state.map_data.width - 1) for _ in players]
+
+    if component == 'ground':
+        get_ground_level = state.get_ground_level
+        def call(round_index, i):
+            get_ground_level(xs[i])
+    elif component == 'collision':
+        check_collision = state.collision_component.check_collision
+        def call(round_index, i):
+            player = players[i][1]
+            check_collision(player, player['x'] + (0.5 if round_index % 2 else -0.5), player['y'] - 0.1)
+    elif component == 'movement':
+        update_player_position = state.movement_component.update_player_position
+        def call(round_index, i):
+            # Back and forth, so players stay where the case put them
+            step = 1 if (round_index // 30) % 2 else -1
+            update_player_position(players[i][0], step, i % 3 == 0, i % 5 == 0)
+    elif component == 'animation':
+        update_pivot_points = state.animation_component.update_pivot_points
+        def call(round_index, i):
+            update_pivot_points(players[i][1], i % 3 == 0, i % 7 == 0, i % 5 == 0)
+    else:
+        raise ValueError(f"Unknown component: {component}")
+    return call, len(players)
+
+def time_ops(call, calls, min_time, repeat):
+    best = 0.0
+    round_index = 0
+    for _ in range(repeat):
+        ops = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            for i in range(calls):
+                call(round_index, i)
+            round_index += 1
+            ops += calls
+            elapsed = time.perf_counter() - start
+        best = max(best, ops / elapsed)
+    return best
+
+def trace_allocations(call, calls, rounds=20):
+    """Mean bytes allocated during one call (its peak above what was live before it), and still held after it."""
+    tracemalloc.start()
+    try:
+        allocated = 0
+        held_before, _ = tracemalloc.get_traced_memory()
+        for round_index in range(rounds):
+            for i in range(calls):
+                tracemalloc.reset_peak()
+                current, _ = tracemalloc.get_traced_memory()
+                call(round_index, i)
+                _, peak = tracemalloc.get_traced_memory()
+                allocated += peak - current
+        held_after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    ops = rounds * calls
+    return allocated / ops, max(0, held_after - held_before) / ops
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+def run_suite(args):
+    settings.GAME_METRICS = False
+    results = {}
+    for size in args.maps:
+        width, height = parse_size(size)
+        for density in args.densities:
+            grid = make_random_map(width, height, density, args.seed)
+            for players in args.players:
+                state = make_case(grid, players, args.seed)
+                for component in args.components:
+                    call, calls = component_call(state, component, random.Random(args.seed))
+                    for i in range(calls):
+                        call(0, i)  # warm up caches and lazily built state
+                    ops = time_ops(call, calls, args.min_time, args.repeat)
+                    allocated, held = trace_allocations(call, calls)
+                    key = f'{component} map={width}x{height} density={density} players={players}'
+                    results[key] = {'ops_per_sec': ops, 'alloc_bytes_per_op': allocated, 'held_bytes_per_op': held}
+                    yield key, results[key]
+
+def compare(result, baseline, tolerance):
+    """Why `result` is a regression from `baseline`, or None."""
+    reasons = []
+    if result['ops_per_sec'] < baseline['ops_per_sec'] * (1 - tolerance):
+        reasons.append(f"ops/s {result['ops_per_sec'] / baseline['ops_per_sec'] - 1:+.0%}")
+    # Allocation sizes are exact; a few bytes either way is not a regression
+    allowed = baseline['alloc_bytes_per_op'] * (1 + tolerance) + 16
+    if result['alloc_bytes_per_op'] > allowed:
+        reasons.append(f"alloc {result['alloc_bytes_per_op'] - baseline['alloc_bytes_per_op']:+.0f} B/op")
+    return ', '.join(reasons) or None
+
+def main(args):
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+
+    print(f"{'case':<55} {'ops/s':>12} {'alloc B/op':>11} {'held B/op':>10} {'vs baseline':>12}")
+    results = {}
+    regressions = []
+    for key, result in run_suite(args):
+        results[key] = result
+        change = ''
+        if baseline is not None and key in baseline:
+            change = f"{result['ops_per_sec'] / baseline[key]['ops_per_sec'] - 1:+.0%}"
+            reason = compare(result, baseline[key], args.tolerance)
+            if reason:
+                regressions.append((key, reason))
+                change += ' REGRESSED'
+        print(f"{key:<55} {result['ops_per_sec']:>12,.0f} {result['alloc_bytes_per_op']:>11.0f} "
+              f"{result['held_bytes_per_op']:>10.1f} {change:>12}")
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump({'python': sys.version.split()[0], 'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                       'results': results}, baseline_file, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for key, reason in regressions:
+            print(f"  {key}: {reason}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--maps', nargs='+', default=['400x60', '2000x250'], help="map sizes, WIDTHxHEIGHT")
+    parser.add_argument('--densities', type=float, nargs='+', default=[0.05, 0.3],
+                        help="fraction of cells above the ground that are solid")
+    parser.add_argument('--players', type=int, nargs='+', default=[1, 100])
+    parser.add_argument('--components', nargs='+', choices=COMPONENTS, default=list(COMPONENTS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.1, help="seconds per timed run")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-baseline', help="store the results in this JSON file")
+    parser.add_argument('--baseline', help="compare against results stored with --save-baseline")
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help="relative slowdown or allocation growth flagged as a regression")
+    sys.exit(main(parser.parse_args()))
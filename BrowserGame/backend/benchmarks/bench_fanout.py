@@ -0,0 +1,113 @@
+# /backend/benchmarks/bench_fanout.py
+"""Compare tick fan-out through the channel layer with StateBroadcaster.
+
+    python -m benchmarks.bench_fanout [--clients 10 100 500] [--ticks 30] [--binary]
+
+Every simulated client is also a player in the snapshot, a quarter of the
+players move each tick and clients ack every frame they receive. The
+channel layer route is the one consumers used before: a group_send per tick,
+then each consumer pulls the event off its own queue and encodes its own
+frame.
+"""
+import argparse
+import asyncio
+import time
+from .common import setup_django
+
+setup_django()
+
+from channels.layers import InMemoryChannelLayer
+from game_app.animation_component import AnimationComponent
+from game_app.pose_evaluator import idle_layer, cycle_layer, single
+from game_app.broadcaster import StateBroadcaster
+from game_app.delta_encoder import DeltaEncoder, SnapshotHistory, quantize_state
+from game_app.wire_codec import JSON_CODEC, BINARY_CODEC, PlayerIndexTable
+
+class SimulatedClient:
+    def __init__(self, history, codec):
+        self.codec = codec
+        self.delta_encoder = DeltaEncoder(history)
+        self.bytes_received = 0
+        self.last_seq = None
+
+    async def send(self, text_data=None, bytes_data=None):
+        self.bytes_received += len(bytes_data if bytes_data is not None else text_data)
+
+def make_states(players, ticks):
+    idle = AnimationComponent(None).get_idle_frame('forward', False)
+    states = []
+    for tick in range(ticks):
+        state = {}
+        for i in range(players):
+            moving = (i + tick) % 4 == 0
+            offset = tick * 0.05 if moving else 0.0
+            state[f'player-{i:04d}'] = {
+                'x': i + offset, 'y': 2.0, 'speed': 30, 'angle': 0, 'direction': 'forward',
+                'crouching': False, 'running': False, 'jumping': False,
+                'mouse_position': {'x': 0, 'y': 0},
+                'input_seq': (i + tick) // 4,  # a movement step on each tick it moves
+                'pivot_points': idle + [offset, 0.0],
+                'anim': single(cycle_layer(offset % 1.0, 0.0, False, False) if moving else idle_layer(False, False))
+            }
+        states.append(quantize_state(state))
+    return states
+
+async def run_channel_layer(states, clients, codec):
+    layer = InMemoryChannelLayer(capacity=len(states) + 10)
+    history = SnapshotHistory()
+    table = PlayerIndexTable()
+    consumers = [SimulatedClient(history, codec) for _ in range(clients)]
+    channels = []
+    for _ in consumers:
+        channel = await layer.new_channel()
+        await layer.group_add('game', channel)
+        channels.append(channel)
+
+    start = time.perf_counter()
+    for seq, snapshot in enumerate(states, 1):
+        history.add(seq, snapshot)
+        table.update(snapshot)
+        await layer.group_send('game', {'type': 'game.state', 'seq': seq})
+        for consumer, channel in zip(consumers, channels):
+            event = await layer.receive(channel)
+            frame = consumer.delta_encoder.encode(event['seq'])
+            payload = consumer.codec.encode_frame(frame, table)
+            if consumer.codec.binary:
+                await consumer.send(bytes_data=payload)
+            else:
+                await consumer.send(text_data=payload)
+            consumer.delta_encoder.ack(seq)
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(consumer.bytes_received for consumer in consumers)
+
+async def run_broadcaster(states, clients, codec):
+    broadcaster = StateBroadcaster()
+    consumers = [SimulatedClient(broadcaster.history, codec) for _ in range(clients)]
+    for consumer in consumers:
+        broadcaster.add(consumer)
+
+    start = time.perf_counter()
+    for seq, snapshot in enumerate(states, 1):
+        await broadcaster.broadcast(seq, snapshot)
+        for consumer in consumers:
+            consumer.delta_encoder.ack(seq)
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(consumer.bytes_received for consumer in consumers)
+
+async def main(args):
+    codec = BINARY_CODEC if args.binary else JSON_CODEC
+    print(f"{'clients':>8} {'channel layer ms/tick':>22} {'broadcaster ms/tick':>20} {'speedup':>8} {'MB sent':>8}")
+    for clients in args.clients:
+        states = make_states(clients, args.ticks)
+        layer_time, layer_bytes = await run_channel_layer(states, clients, codec)
+        direct_time, direct_bytes = await run_broadcaster(states, clients, codec)
+        assert layer_bytes == direct_bytes, "Both routes should send identical frames"
+        print(f"{clients:>8} {layer_time / args.ticks * 1000:>22.2f} {direct_time / args.ticks * 1000:>20.2f} "
+              f"{layer_time / direct_time:>7.1f}x {direct_bytes / 1e6:>8.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--ticks', type=int, default=30)
+    parser.add_argument('--binary', action='store_true', help="use the binary codec instead of JSON")
+    asyncio.run(main(parser.parse_args()))
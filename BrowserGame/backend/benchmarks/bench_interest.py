@@ -0,0 +1,105 @@
+# /backend/benchmarks/bench_interest.py
+"""Compare broadcasting every player to every client with interest management and LOD.
+
+    python -m benchmarks.bench_interest [--players 50 200 1000] [--ticks 30] [--binary]
+
+Players are spread over a world that grows with the player count, so each
+client has about the same number of neighbours in every run. Every player
+is also a client, a quarter of the players move each tick and clients ack
+every frame. Without interest management the bytes each client receives
+grow with the room; with it they follow the neighbour count. Each client
+then needs its own frame, so CPU per tick grows with the client count
+instead of being shared, while staying flat per client. LOD then cuts
+what each neighbour costs: only the nearest get skeletons every tick.
+"""
+import argparse
+import asyncio
+import random
+import time
+from .common import setup_django
+
+setup_django()
+
+from game_app.animation_component import AnimationComponent
+from game_app.pose_evaluator import idle_layer, cycle_layer, single
+from game_app.broadcaster import StateBroadcaster
+from game_app.delta_encoder import DeltaEncoder, quantize_state
+from game_app.interest import InterestManager
+from game_app.wire_codec import JSON_CODEC, BINARY_CODEC
+
+# World tiles per player; about 20 neighbours inside the default 96x64 view box
+AREA_PER_PLAYER = 250
+WORLD_HEIGHT = 60
+
+class SimulatedClient:
+    def __init__(self, player_id, history, codec):
+        self.player_id = player_id
+        self.codec = codec
+        self.delta_encoder = DeltaEncoder(history)
+        self.bytes_received = 0
+
+    async def send(self, text_data=None, bytes_data=None):
+        self.bytes_received += len(bytes_data if bytes_data is not None else text_data)
+
+def make_states(players, ticks, seed=0):
+    rng = random.Random(seed)
+    width = players * AREA_PER_PLAYER / WORLD_HEIGHT
+    spawns = [(rng.uniform(0, width), rng.uniform(0, WORLD_HEIGHT)) for _ in range(players)]
+    idle = AnimationComponent(None).get_idle_frame('forward', False)
+    states = []
+    for tick in range(ticks):
+        state = {}
+        for i, (x, y) in enumerate(spawns):
+            moving = (i + tick) % 4 == 0
+            offset = tick * 0.05 if moving else 0.0
+            state[f'player-{i:04d}'] = {
+                'x': x + offset, 'y': y, 'speed': 30, 'angle': 0, 'direction': 'forward',
+                'crouching': False, 'running': False, 'jumping': False,
+                'mouse_position': {'x': 0, 'y': 0},
+                'input_seq': (i + tick) // 4,  # a movement step on each tick it moves
+                'pivot_points': idle + [offset, 0.0],
+                'anim': single(cycle_layer(offset % 1.0, 0.0, False, False) if moving else idle_layer(False, False))
+            }
+        states.append(quantize_state(state))
+    return states
+
+async def run(states, codec, interest):
+    broadcaster = StateBroadcaster(interest=interest)
+    clients = [SimulatedClient(player_id, broadcaster.history, codec) for player_id in states[0]]
+    for client in clients:
+        broadcaster.add(client)
+
+    start = time.perf_counter()
+    for seq, snapshot in enumerate(states, 1):
+        await broadcaster.broadcast(seq, snapshot)
+        for client in clients:
+            client.delta_encoder.ack(seq)
+    elapsed = time.perf_counter() - start
+
+    visible = sum(len(client.delta_encoder.view or states[-1]) for client in clients) / len(clients)
+    bytes_per_client = sum(client.bytes_received for client in clients) / len(clients) / len(states)
+    return elapsed / len(states), bytes_per_client, visible
+
+async def main(args):
+    codec = BINARY_CODEC if args.binary else JSON_CODEC
+    modes = {
+        'all': lambda: None,
+        # Full-detail box as large as the view, so every visible player gets a skeleton
+        'interest': lambda: InterestManager(lod_radii=(InterestManager().radius,) * 2),
+        'interest+LOD': InterestManager,
+    }
+    print(f"{'players':>8} {'visible':>8}" + ''.join(f" {mode + ' ms/tick':>18} {mode + ' B/client':>19}" for mode in modes))
+    for players in args.players:
+        states = make_states(players, args.ticks)
+        columns = []
+        for make_interest in modes.values():
+            elapsed, bytes_per_client, visible = await run(states, codec, make_interest())
+            columns.append(f" {elapsed * 1000:>18.2f} {bytes_per_client:>19.0f}")
+        print(f"{players:>8} {visible:>8.1f}" + ''.join(columns))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, nargs='+', default=[50, 200, 1000])
+    parser.add_argument('--ticks', type=int, default=30)
+    parser.add_argument('--binary', action='store_true', help="use the binary codec instead of JSON")
+    asyncio.run(main(parser.parse_args()))
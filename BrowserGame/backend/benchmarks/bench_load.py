@@ -0,0 +1,332 @@
+# /backend/benchmarks/bench_load.py
+"""Load-test the game server with simulated clients, and report how it held up.
+
+    python -m benchmarks.bench_load [--clients 10 50 100] [--seconds 10] [--warmup 2]
+                                    [--map-id ID] [--workers N] [--codec binary|json]
+                                    [--output report.json]
+
+Every client connects to the ASGI `application` in this process through
+channels' WebsocketCommunicator, so consumers, rooms, broadcasting and the
+wire codecs all run as they do behind a server. Clients play like the
+frontend does: a numbered movement step every tick (60 Hz) with an ack,
+walking or running back and forth, mouse moves in bursts, a jump every few
+seconds and an occasional crouch. Each client count runs in a fresh room.
+
+Per run the report has:
+
+- broadcast latency: from the room starting to broadcast a tick until each
+  client has that frame
+- frame sizes and bytes per client per second
+- tick rate and jitter: how far apart broadcasts start, against 1/60 s,
+  plus the tick scheduler's skipped and catch-up ticks. A run keeps up
+  when no tick was skipped and p99 jitter stays under one tick
+- CPU: this process's CPU time per wall second, which includes the
+  simulated clients, and the share of wall time rooms spent ticking, from
+  the /metrics profiler
+
+The map is a synthetic one unless `--map-id` picks a stored map, so runs are
+comparable across commits. `--output` writes the report as JSON, with the
+commit it ran on.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import random
+import resource
+import struct
+import subprocess
+import sys
+import time
+import numpy as np
+from .common import BACKEND_DIR, setup_django, make_synthetic_map, quiet_stdout
+
+setup_django()
+
+from django.conf import settings
+from asgiref.sync import sync_to_async
+from channels.testing import WebsocketCommunicator
+from game_app.game_state import GameState
+from game_app.models import Map
+from game_app.rooms import room_manager
+from game_app.room_workers import RoomWorkerPool
+from game_app.wire_codec import BINARY_SUBPROTOCOL, encode_binary_input
+
+with quiet_stdout():
+    from game_project.asgi import application
+# Every connection and room logs at INFO; keep them out of the results
+logging.getLogger('game_app').setLevel(logging.WARNING)
+
+FRAME_INTERVAL = 1 / 60
+# Map id the synthetic map's room is registered under
+SYNTHETIC_MAP_ID = 1_000_000
+# Tiles per second a player moves, walking and running flat out; clients use
+# them to guess when they reach the edge of the map and should turn around
+WALK_SPEED = 30 / 30
+RUN_SPEED = 150 / 30
+
+def percentiles(values, scale=1.0):
+    if not len(values):
+        return None
+    values = np.asarray(values, dtype=float) * scale
+    p50, p95, p99 = np.percentile(values, [50, 95, 99]).tolist()
+    return {'mean': float(values.mean()), 'p50': p50, 'p95': p95, 'p99': p99, 'max': float(values.max())}
+
+def frame_seq(message):
+    """Seq of a state frame as sent on the wire, or None for other messages."""
+    if message.get('bytes') is not None:
+        return struct.unpack_from('<BI', message['bytes'])[1]
+    text = message['text']
+    if not text.startswith('{"type":"key"') and not text.startswith('{"type":"delta"'):
+        return None
+    start = text.index('"seq":') + 6
+    return int(text[start:text.index(',', start)])
+
+
+class SimulatedClient:
+    def __init__(self, index, map_id, width, binary, rng):
+        self.player_id = f'load-{index:04d}'
+        self.binary = binary
+        self.width = width
+        self.rng = rng
+        self.communicator = WebsocketCommunicator(application, f'/ws/game/{map_id}/{self.player_id}/',
+                                                  subprotocols=[BINARY_SUBPROTOCOL] if binary else [])
+        self.x = rng.uniform(5, width - 5)
+        self.direction = rng.choice((-1, 1))
+        self.running = False
+        self.crouching = False
+        self.last_seq = None
+        self.step_seq = 0
+        self.inputs_sent = 0
+        # (seq, arrival time, bytes) of every state frame received while recording
+        self.frames = []
+        self.recording = False
+
+    async def connect(self):
+        connected, _ = await self.communicator.connect(timeout=30)
+        return connected
+
+    async def send(self, data):
+        if self.binary:
+            await self.communicator.send_to(bytes_data=encode_binary_input(data))
+        else:
+            await self.communicator.send_to(text_data=json.dumps(data))
+        self.inputs_sent += 1
+
+    async def receive(self):
+        while True:
+            message = await self.communicator.receive_output(timeout=None)
+            if message['type'] != 'websocket.send':
+                return
+            arrival = time.perf_counter()
+            seq = frame_seq(message)
+            if seq is None:
+                continue
+            self.last_seq = seq
+            if self.recording:
+                size = len(message['bytes']) if message.get('bytes') is not None else len(message['text'])
+                self.frames.append((seq, arrival, size))
+
+    async def play(self, stop):
+        rng = self.rng
+        next_turn = time.perf_counter() + rng.uniform(1, 4)
+        next_jump = time.perf_counter() + rng.uniform(1, 5)
+        next_crouch = time.perf_counter() + rng.uniform(3, 10)
+        mouse_until = 0.0
+        mouse = {'x': 15, 'y': 30}
+        # Clients start out of step with each other, as real ones would
+        await asyncio.sleep(rng.uniform(0, FRAME_INTERVAL))
+        while not stop.is_set():
+            now = time.perf_counter()
+            if now >= next_turn:
+                self.direction = -self.direction
+                self.running = rng.random() < 0.3
+                next_turn = now + rng.uniform(1, 4)
+            self.x += self.direction * (RUN_SPEED if self.running else WALK_SPEED) * FRAME_INTERVAL
+            if not 1 <= self.x <= self.width - 2:
+                self.direction = -self.direction
+                self.x = min(max(self.x, 1), self.width - 2)
+
+            self.step_seq += 1
+            await self.send({'seq': self.step_seq, 'move': self.direction, 'running': self.running,
+                             'crouching': self.crouching, 'ack': self.last_seq})
+            if now >= next_jump:
+                await self.send({'jump': True})
+                next_jump = now + rng.uniform(2, 5)
+            if now >= next_crouch:
+                self.crouching = not self.crouching
+                await self.send({'crouching': self.crouching})
+                next_crouch = now + (rng.uniform(0.5, 1.5) if self.crouching else rng.uniform(5, 15))
+            # The frontend sends every mousemove event; the mouse moves in bursts
+            if now >= mouse_until + rng.uniform(0, 2):
+                mouse_until = now + rng.uniform(0.2, 1.0)
+            if now < mouse_until:
+                mouse = {'x': mouse['x'] + rng.randint(-3, 3), 'y': mouse['y'] + rng.randint(-3, 3)}
+                await self.send({'player_mouse_position': mouse})
+            await asyncio.sleep(FRAME_INTERVAL)
+
+
+async def open_room(args, grid):
+    """Map id and width of the room clients will join, opening it on the synthetic map
+    unless a stored map was asked for."""
+    if args.map_id is not None:
+        width = await sync_to_async(Map.objects.values_list('width', flat=True).get)(id=args.map_id)
+        return args.map_id, width
+    map_id = SYNTHETIC_MAP_ID
+    room = room_manager.worker_pool.create_room(map_id, grid) if room_manager.worker_pool else GameState(map_id)
+    if not room_manager.worker_pool:
+        room.set_map_data(grid)
+    await room.start_physics_update()
+    room_manager.rooms[map_id] = room
+    return map_id, grid.width
+
+def watch_broadcasts(room):
+    """Record when the room starts broadcasting each tick."""
+    started = {}
+    broadcast = room.broadcaster.broadcast
+
+    async def timed_broadcast(seq, snapshot):
+        started[seq] = time.perf_counter()
+        await broadcast(seq, snapshot)
+    room.broadcaster.broadcast = timed_broadcast
+    return started
+
+def tick_busy(room):
+    samples = room.profiler.series.get('tick')
+    return samples.total if samples is not None else None
+
+async def run(args, client_count, grid, rng):
+    map_id, width = await open_room(args, grid)
+    clients = []
+    for index in range(client_count):
+        client = SimulatedClient(index, map_id, width, args.codec == 'binary', random.Random(rng.random()))
+        if not await client.connect():
+            raise RuntimeError(f"{client.player_id} could not connect")
+        clients.append(client)
+    room = room_manager.get(map_id)
+    started = watch_broadcasts(room)
+
+    stop = asyncio.Event()
+    receivers = [asyncio.create_task(client.receive()) for client in clients]
+    players = [asyncio.create_task(client.play(stop)) for client in clients]
+    await asyncio.sleep(args.warmup)
+
+    tick_metrics = room.get_tick_metrics() or {}
+    busy = tick_busy(room)
+    inputs = sum(client.inputs_sent for client in clients)
+    for client in clients:
+        client.recording = True
+    started.clear()
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    await asyncio.sleep(args.seconds)
+    for client in clients:
+        client.recording = False
+    elapsed = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    inputs = sum(client.inputs_sent for client in clients) - inputs
+    end_metrics = room.get_tick_metrics() or {}
+    end_busy = tick_busy(room)
+
+    stop.set()
+    await asyncio.gather(*players)
+    for client in clients:
+        await client.communicator.disconnect()
+    for task in receivers:
+        task.cancel()
+    if args.map_id is None and room_manager.get(map_id) is room:
+        # Rooms close when their last player leaves; make sure the synthetic one did
+        await room.stop_physics_update()
+        del room_manager.rooms[map_id]
+
+    latencies = [arrival - started[seq] for client in clients for seq, arrival, _ in client.frames if seq in started]
+    sizes = [size for client in clients for _, _, size in client.frames]
+    starts = sorted(started.values())
+    intervals = np.diff(starts)
+    jitter = percentiles(np.abs(intervals - FRAME_INTERVAL), 1000)
+    skipped = end_metrics.get('skipped_ticks', 0) - tick_metrics.get('skipped_ticks', 0)
+    frames = sum(len(client.frames) for client in clients)
+    return {
+        'clients': client_count,
+        'seconds': elapsed,
+        'inputs_per_second': inputs / elapsed,
+        'frames_received': frames,
+        'frames_per_client_per_second': frames / client_count / elapsed,
+        'latency_ms': percentiles(latencies, 1000),
+        'frame_bytes': percentiles(sizes),
+        'bytes_per_client_per_second': sum(sizes) / client_count / elapsed,
+        'tick': {
+            'rate_hz': len(starts) / elapsed,
+            'interval_ms': percentiles(intervals, 1000),
+            'jitter_ms': jitter,
+            'skipped': skipped,
+            'catch_up': end_metrics.get('catch_up_ticks', 0) - tick_metrics.get('catch_up_ticks', 0),
+        },
+        'cpu': {
+            'process_percent': 100 * cpu / elapsed,
+            'tick_busy_percent': None if busy is None or end_busy is None else 100 * (end_busy - busy) / elapsed,
+        },
+        # A room that falls behind runs ticks back to back, so its rate alone can look fine
+        'keeps_up': skipped == 0 and jitter is not None and jitter['p99'] < FRAME_INTERVAL * 1000,
+    }
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BACKEND_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def main(args):
+    if args.workers:
+        room_manager.worker_pool = RoomWorkerPool(args.workers)
+    grid = make_synthetic_map(args.width)
+    rng = random.Random(args.seed)
+    runs = []
+    print(f"{'clients':>8} {'ticks/s':>8} {'skipped':>8} {'jitter p99 ms':>14} {'latency p50 ms':>15} {'latency p99 ms':>15} "
+          f"{'frame B p50':>12} {'KB/s/client':>12} {'CPU %':>6} {'tick %':>7} {'keeps up':>9}")
+    for client_count in args.clients:
+        result = await run(args, client_count, grid, rng)
+        runs.append(result)
+        tick_busy_percent = result['cpu']['tick_busy_percent']
+        print(f"{client_count:>8} {result['tick']['rate_hz']:>8.1f} {result['tick']['skipped']:>8} {result['tick']['jitter_ms']['p99']:>14.2f} "
+              f"{result['latency_ms']['p50']:>15.2f} {result['latency_ms']['p99']:>15.2f} "
+              f"{result['frame_bytes']['p50']:>12.0f} {result['bytes_per_client_per_second'] / 1024:>12.1f} "
+              f"{result['cpu']['process_percent']:>6.0f} "
+              f"{'-' if tick_busy_percent is None else f'{tick_busy_percent:.0f}':>7} "
+              f"{'yes' if result['keeps_up'] else 'no':>9}")
+    await room_manager.shutdown()
+
+    report = {
+        'commit': current_commit(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': sys.version.split()[0],
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'config': {
+            'map': args.map_id if args.map_id is not None else f'synthetic {args.width}x{grid.height}',
+            'workers': args.workers,
+            'codec': args.codec,
+            'seconds': args.seconds,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'pose_replication': settings.GAME_POSE_REPLICATION,
+        },
+        'runs': runs,
+    }
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f"Report written to {args.output}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[10, 50, 100])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=2, help="seconds to play before measuring")
+    parser.add_argument('--map-id', type=int, help="play on this stored map instead of a synthetic one")
+    parser.add_argument('--width', type=int, default=400, help="width of the synthetic map")
+    parser.add_argument('--workers', type=int, default=0, help="simulate rooms in this many worker processes")
+    parser.add_argument('--codec', choices=('binary', 'json'), default='binary')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the report to this JSON file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,48 @@
+# /backend/benchmarks/bench_logging.py
+"""Measure what tick loop debug logging costs per tick.
+
+    python -m benchmarks.bench_logging [--players 50 500] [--ticks 120] [--output FILE]
+
+Runs the bench_players workload with the game_log channels in three modes:
+`off` is the default, with every channel disabled; `sampled` turns all of
+them on at their usual rate limit; `unsampled` turns them on with no limit,
+so every record is formatted and written, as the print calls they replaced
+were. Records go to `--output` (the null device by default, which leaves
+out the cost of a terminal or a log pipe).
+"""
+import argparse
+import asyncio
+import logging
+import os
+from .bench_players import run
+from game_app.game_log import CHANNELS
+
+MODES = ('off', 'sampled', 'unsampled')
+
+def configure(mode, handler):
+    for log in CHANNELS.values():
+        log.logger.handlers = [handler] if mode != 'off' else []
+        log.logger.propagate = mode == 'off'
+        log.logger.setLevel(logging.DEBUG if mode != 'off' else logging.NOTSET)
+        log.max_per_second = None if mode == 'unsampled' else 20
+        log.window_start = log.emitted = log.dropped = 0
+
+async def main(args):
+    with open(args.output, 'w') as output:
+        handler = logging.StreamHandler(output)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+        print(f"{'players':>8} " + ' '.join(f"{mode + ' ms/tick':>18}" for mode in MODES))
+        for players in args.players:
+            per_tick = []
+            for mode in MODES:
+                configure(mode, handler)
+                per_tick.append(await run(players, args.ticks))
+            configure('off', handler)
+            print(f"{players:>8} " + ' '.join(f"{seconds * 1000:>18.2f}" for seconds in per_tick))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, nargs='+', default=[50, 500])
+    parser.add_argument('--ticks', type=int, default=120)
+    parser.add_argument('--output', default=os.devnull, help="where enabled channels write their records")
+    asyncio.run(main(parser.parse_args()))
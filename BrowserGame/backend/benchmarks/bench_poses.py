@@ -0,0 +1,77 @@
+# /backend/benchmarks/bench_poses.py
+"""Compare replicating baked skeletons with replicating animation parameters.
+
+    python -m benchmarks.bench_poses [--players 50 500] [--ticks 120]
+
+Runs full ticks as bench_players does, with one JSON and one binary
+spectator connected, so every player is sent at full detail. In
+'skeleton' mode the server evaluates each player's pose every tick and
+sends the changed joints; in 'parameters' mode it only advances the
+animation state and sends the parameters, and clients evaluate the pose.
+Reports tick cost per player and bytes per player per tick.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import time
+from .common import setup_django, make_synthetic_map, make_game_state
+
+setup_django()
+
+from game_app.animation_component import POSE_REPLICATION_MODES, POSE_REPLICATION_SKELETON
+from game_app.delta_encoder import DeltaEncoder
+from game_app.wire_codec import JSON_CODEC, BINARY_CODEC
+
+class SimulatedClient:
+    def __init__(self, player_id, history, codec):
+        self.player_id = player_id
+        self.codec = codec
+        self.delta_encoder = DeltaEncoder(history)
+        self.bytes_received = 0
+
+    async def send(self, text_data=None, bytes_data=None):
+        self.bytes_received += len(bytes_data if bytes_data is not None else text_data)
+
+async def run(mode, players, ticks):
+    grid = make_synthetic_map()
+    state = make_game_state(grid)
+    state.animation_component.bake_poses = mode == POSE_REPLICATION_SKELETON
+    clients = [SimulatedClient(f'spectator-{codec.binary}', state.broadcaster.history, codec)
+               for codec in (JSON_CODEC, BINARY_CODEC)]
+    for client in clients:
+        state.broadcaster.add(client)
+    # The game still prints per-player debug lines; keep them out of the terminal
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for i in range(players):
+            state.add_player(f'player-{i:04d}', (i * 7) % (grid.width - 10) + 5, 10)
+
+        elapsed = 0.0
+        for tick in range(ticks):
+            for i, (player_id, player) in enumerate(state.players.items()):
+                step = 1 if (tick // 60 + i) % 2 else -1
+                state.queue_input(player_id, {'seq': tick + 1, 'move': step, 'running': i % 3 == 0,
+                                              'crouching': i % 5 == 0, 'jump': (tick + i) % 90 == 0})
+            start = time.perf_counter()
+            await state.physics_update()
+            elapsed += time.perf_counter() - start
+            for client in clients:
+                client.delta_encoder.ack(state.state_seq)
+            for input_queue in state.input_queues.values():
+                input_queue.tokens = input_queue.burst
+    json_bytes, binary_bytes = (client.bytes_received / ticks / players for client in clients)
+    return elapsed / ticks, json_bytes, binary_bytes
+
+async def main(args):
+    print(f"{'mode':>10} {'players':>8} {'ms/tick':>10} {'us/player':>10} {'JSON B/player':>14} {'binary B/player':>16}")
+    for players in args.players:
+        for mode in POSE_REPLICATION_MODES:
+            per_tick, json_bytes, binary_bytes = await run(mode, players, args.ticks)
+            print(f"{mode:>10} {players:>8} {per_tick * 1000:>10.2f} {per_tick / players * 1e6:>10.1f} "
+                  f"{json_bytes:>14.1f} {binary_bytes:>16.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, nargs='+', default=[50, 500])
+    parser.add_argument('--ticks', type=int, default=120)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,89 @@
+# /backend/benchmarks/bench_workers.py
+"""Measure how many room ticks per second a server sustains with 0..N room workers.
+
+    python -m benchmarks.bench_workers [--workers 0 1 2 4] [--rooms 8] [--players 100] [--seconds 5]
+
+0 workers simulates every room in this process, as the ASGI server does by
+default. Otherwise rooms are spread over a RoomWorkerPool and this process
+only forwards inputs and receives snapshots, like the consumers would.
+Every player sends one movement input per tick. A room that keeps up
+reports 60 ticks/s; the total counts player-ticks simulated per second.
+"""
+import argparse
+import asyncio
+import time
+from .common import setup_django, make_synthetic_map, quiet_stdout
+
+setup_django()
+
+from game_app.game_state import GameState
+from game_app.room_workers import RoomWorkerPool
+
+async def open_rooms(workers, room_count, grid):
+    pool = RoomWorkerPool(workers) if workers else None
+    rooms = []
+    for map_id in range(1, room_count + 1):
+        if pool:
+            room = pool.create_room(map_id, grid)
+        else:
+            room = GameState(map_id)
+            room.set_map_data(grid)
+        await room.start_physics_update()
+        rooms.append(room)
+    return pool, rooms
+
+async def drive_inputs(rooms, players, stop):
+    interval = 1 / 60
+    tick = 0
+    while not stop.is_set():
+        for room in rooms:
+            for i in range(players):
+                step = 1 if (tick // 60 + i) % 2 else -1
+                room.queue_input(f'player-{i:04d}', {'seq': tick + 1, 'move': step,
+                                                     'running': i % 3 == 0, 'crouching': False})
+        tick += 1
+        await asyncio.sleep(interval)
+
+async def run(workers, room_count, players, seconds, warmup):
+    grid = make_synthetic_map()
+    pool, rooms = await open_rooms(workers, room_count, grid)
+    for room in rooms:
+        for i in range(players):
+            room.add_player(f'player-{i:04d}', 20 + i % 300, 10)
+
+    stop = asyncio.Event()
+    driver = asyncio.create_task(drive_inputs(rooms, players, stop))
+    # Workers need a moment to start and import Django
+    await asyncio.sleep(warmup)
+    start_seqs = [room.state_seq for room in rooms]
+    start = time.perf_counter()
+    await asyncio.sleep(seconds)
+    elapsed = time.perf_counter() - start
+    ticks = [room.state_seq - seq for room, seq in zip(rooms, start_seqs)]
+
+    stop.set()
+    await driver
+    for room in rooms:
+        await room.stop_physics_update()
+    if pool:
+        await pool.shutdown()
+    return [count / elapsed for count in ticks]
+
+async def main(args):
+    print(f"{'workers':>8} {'rooms':>6} {'players':>8} {'ticks/s/room':>13} {'of 60 Hz':>9} {'player-ticks/s':>15}")
+    for workers in args.workers:
+        # Rooms print debug lines every tick, workers included; keep them out of the results
+        with quiet_stdout():
+            rates = await run(workers, args.rooms, args.players, args.seconds, args.warmup)
+        rate = sum(rates) / len(rates)
+        print(f"{workers:>8} {args.rooms:>6} {args.players:>8} {rate:>13.1f} {rate / 60:>8.0%} "
+              f"{sum(rates) * args.players:>15.0f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--rooms', type=int, default=8)
+    parser.add_argument('--players', type=int, default=100, help="players per room")
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--warmup', type=float, default=3, help="seconds to wait before measuring")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,65 @@
+# /backend/benchmarks/common.py
+import contextlib
+import os
+import random
+import sys
+import django
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def setup_django():
+    # Benchmarks import game_app directly; no server is started
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    os.chdir(BACKEND_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'game_project.settings')
+    django.setup()
+
+
+def make_synthetic_map(width=400, height=60, seed=0):
+    """Flat ground two tiles thick with random steps and floating platforms."""
+    from game_app.map_grid import MapGrid
+    rng = random.Random(seed)
+    tiles = []
+    for x in range(width):
+        tiles.append((x, height - 1, '#654321', 1))
+        tiles.append((x, height - 2, '#654321', 1))
+        if x % 17 == 0:
+            for step in range(rng.randint(1, 3)):
+                tiles.append((x, height - 3 - step, '#808080', 1))
+        if x % 29 < 4:
+            tiles.append((x, height - 8, '#808080', 1))
+    return MapGrid.from_tiles('synthetic', width, height, tiles)
+
+def make_random_map(width, height, density, seed=0):
+    """Ground two tiles thick under randomly placed solid tiles filling `density` of the rest."""
+    import numpy as np
+    from game_app.map_grid import MapGrid
+    rng = np.random.default_rng(seed)
+    grid = MapGrid('synthetic', width, height, palette=[None, '#654321'])
+    solid = rng.random((height, width)) < density
+    solid[-2:, :] = True
+    grid.layers[1] = solid.astype(np.uint8)
+    return grid
+
+def make_game_state(grid):
+    """A GameState on an in-memory map, without touching the database."""
+    from game_app.game_state import GameState
+    state = GameState()
+    state.set_map_data(grid)
+    return state
+
+@contextlib.contextmanager
+def quiet_stdout():
+    """Silence stdout at the file descriptor, which also covers child processes."""
+    sys.stdout.flush()
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(devnull, 1)
+        yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved, 1)
+        os.close(saved)
+        os.close(devnull)
@@ -1,448 +1,350 @@
-import json
-import time
-import math
-import numpy as np
-
-class AnimationComponent:
-    def __init__(self, game_state):
-        self.game_state = game_state
-        self.animation_frames = self.load_animation_frames()
-        self.player_animation_states = {}
-        self.run_cycle_distance = 2.5
-        self.walk_cycle_distance = 0.4
-        self.crouch_cycle_distance = 0.85
-        self.idle_transition_duration = 0.2
-        self.walk_run_transition_duration = 0.5
-        self.turn_duration = 0.1
-        self.turn_exit_duration = 0.2
-        self.jump_start_duration = 0.1
-        self.jump_apex_duration = 0.2
-        self.jump_land_duration = 0.1
-        self.crouch_transition_duration = 0.2
-
-    def load_animation_frames(self):
-        with open('game_app/animation_frames.json', 'r') as file:
-            frames = json.load(file)
-            for frame in frames.values():
-                if 'r_elbow' not in frame:
-                    frame['r_elbow'] = [0.85, 0.8]
-                if 'r_hand' not in frame:
-                    frame['r_hand'] = [0.9, 1.1]
-            return frames
-
-    def get_frame(self, frame_name, direction):
-        if direction == 'backward':
-            flipped_frame_name = f"{frame_name}_FLIP"
-            if flipped_frame_name in self.animation_frames:
-                return self.animation_frames[flipped_frame_name]
-            else:
-                return self.flip_frame(self.animation_frames[frame_name])
-        return self.animation_frames[frame_name]
-
-    def get_idle_frame(self, direction, crouching):
-        if crouching:
-            return self.get_frame('CROUCH_IDLE', direction)
-        return self.get_frame('IDLE', direction)
-
-    def set_player_animation_state(self, player_id, state):
-        self.player_animation_states[player_id] = {
-            'current_state': state,
-            'last_update_time': time.time(),
-            'is_moving': False,
-            'is_running': False,
-            'is_jumping': False,
-            'is_crouching': False,
-            'jump_start_time': None,
-            'jump_phase': None,
-            'direction': 'forward',
-            'facing_direction': 'forward',
-            'last_x_position': None,
-            'distance_traveled': 0.0,
-            'cycle_progress': 0.0,
-            'last_direction': 'forward',
-            'idle_transition_start': None,
-            'last_movement_frame': None,
-            'walk_run_transition_start': None,
-            'walk_run_blend_factor': 0.0,
-            'turn_start_time': None,
-            'is_turning': False,
-            'crouch_transition_start': None,
-            'crouch_blend_factor': 0.0
-        }
-
-    def flip_frame(self, frame):
-        flipped_frame = {}
-        for key, value in frame.items():
-            flipped_frame[key] = [1 - value[0], value[1]]
-        return flipped_frame
-
-    def bicubic_interpolate(self, start_frame, end_frame, t):
-        interpolated_frame = {}
-        for key in start_frame.keys():
-            p0 = np.array(start_frame[key])
-            p1 = np.array(end_frame[key])
-            
-            # get tangent vectors
-            t0 = (p1 - p0) * 0.5
-            t1 = t0
-            
-            # hermite basis functions
-            h00 = 2*t**3 - 3*t**2 + 1
-            h10 = t**3 - 2*t**2 + t
-            h01 = -2*t**3 + 3*t**2
-            h11 = t**3 - t**2
-            
-            # final interpolation
-            interpolated_point = h00*p0 + h10*t0 + h01*p1 + h11*t1
-            interpolated_frame[key] = interpolated_point.tolist()
-        
-        return interpolated_frame
-
-    def interpolate_to_idle(self, start_frame, end_frame, progress):
-        return self.bicubic_interpolate(start_frame, end_frame, progress)
-
-    def get_cycle_frame(self, cycle_progress, blend_factor, direction, crouching):
-        if crouching:
-            return self.get_crouch_cycle_frame(cycle_progress, direction)
-        else:
-            walk_frame = self.get_walk_frame(cycle_progress, direction)
-            run_frame = self.get_run_frame(cycle_progress, direction)
-            return self.blend_frames(walk_frame, run_frame, blend_factor)
-
-    def get_crouch_cycle_frame(self, cycle_progress, direction):
-        if cycle_progress < 0.5:
-            start_frame = self.get_frame(self.crouch_cycle_frames[0], direction)
-            end_frame = self.get_frame(self.crouch_cycle_frames[1], direction)
-            t = cycle_progress * 2
-        else:
-            start_frame = self.get_frame(self.crouch_cycle_frames[1], direction)
-            end_frame = self.get_frame(self.crouch_cycle_frames[0], direction)
-            t = (cycle_progress - 0.5) * 2
-        return self.bicubic_interpolate(start_frame, end_frame, t)
-
-    def get_crouch_cycle_frame(self, cycle_progress, direction):
-        if cycle_progress < 0.5:
-            start_frame = self.get_frame('CROUCH_PASS', direction)
-            end_frame = self.get_frame('CROUCH_REACH', direction)
-            t = cycle_progress * 2
-        else:
-            start_frame = self.get_frame('CROUCH_REACH', direction)
-            end_frame = self.get_frame('CROUCH_PASS', direction)
-            t = (cycle_progress - 0.5) * 2
-        return self.bicubic_interpolate(start_frame, end_frame, t)
-
-    def get_walk_frame(self, cycle_progress, direction):
-        if cycle_progress < 0.5:
-            start_frame = self.get_frame('WALK_PASS', direction)
-            end_frame = self.get_frame('WALK_REACH', direction)
-            t = cycle_progress * 2
-        else:
-            start_frame = self.get_frame('WALK_REACH', direction)
-            end_frame = self.get_frame('WALK_PASS', direction)
-            t = (cycle_progress - 0.5) * 2
-        return self.bicubic_interpolate(start_frame, end_frame, t)
-
-    def get_run_frame(self, cycle_progress, direction):
-        if cycle_progress < 0.5:
-            start_frame = self.get_frame('RUN_PASS', direction)
-            end_frame = self.get_frame('RUN_REACH', direction)
-            t = cycle_progress * 2
-        else:
-            start_frame = self.get_frame('RUN_REACH', direction)
-            end_frame = self.get_frame('RUN_PASS', direction)
-            t = (cycle_progress - 0.5) * 2
-        return self.bicubic_interpolate(start_frame, end_frame, t)
-
-    def get_turn_frame(self, turn_progress, from_direction, to_direction, crouching):
-        if crouching:
-            start_frame = self.get_frame('CROUCH_IDLE', from_direction)
-            end_frame = self.get_frame('CROUCH_IDLE', to_direction)
-        else:
-            start_frame = self.get_frame('TURN_PASS', from_direction)
-            end_frame = self.get_frame('TURN_REACH', to_direction)
-        
-        return self.bicubic_interpolate(start_frame, end_frame, turn_progress)
-
-    def get_jump_frame(self, jump_progress, direction, crouching):
-        if not crouching:
-            if jump_progress < 0.5:  # Rising
-                start_frame = self.get_frame('JUMP_START_END', direction)
-                end_frame = self.get_frame('JUMP_APEX', direction)
-                t = jump_progress * 2
-            else:  # Falling
-                start_frame = self.get_frame('JUMP_APEX', direction)
-                end_frame = self.get_frame('JUMP_START_END', direction)
-                t = (jump_progress - 0.5) * 2
-            
-            return self.bicubic_interpolate(start_frame, end_frame, t)
-        else:
-            # For now, we'll use the CROUCH_IDLE frame for jumping while crouching
-            return self.get_frame('CROUCH_IDLE', direction)
-
-    def interpolate_frames(self, frame1, frame2, t):
-        return self.bicubic_interpolate(frame1, frame2, t)
-
-    def blend_frames(self, frame1, frame2, blend_factor):
-        blended_frame = {}
-        for key in frame1.keys():
-            blended_frame[key] = [
-                frame1[key][0] * (1 - blend_factor) + frame2[key][0] * blend_factor,
-                frame1[key][1] * (1 - blend_factor) + frame2[key][1] * blend_factor
-            ]
-        return blended_frame
-
-    def update_pivot_points(self, player, running, jumping, crouching):
-        player_id = next(id for id, p in self.game_state.players.items() if p == player)
-        
-        if player_id not in self.player_animation_states:
-            self.set_player_animation_state(player_id, 'IDLE')
-        
-        animation_state = self.player_animation_states[player_id]
-        current_time = time.time()
-        
-        if animation_state['last_x_position'] is None:
-            animation_state['last_x_position'] = player['x']
-
-        distance_traveled = abs(player['x'] - animation_state['last_x_position'])
-        animation_state['distance_traveled'] += distance_traveled
-
-        was_moving = animation_state['is_moving']
-        animation_state['is_moving'] = distance_traveled > 0.001
-
-        if animation_state['is_moving']:
-            new_movement_direction = 'forward' if player['x'] > animation_state['last_x_position'] else 'backward'
-            animation_state['facing_direction'] = new_movement_direction
-        else:
-            new_movement_direction = animation_state['direction']
-
-        direction_changed = new_movement_direction != animation_state['direction']
-
-        # Determine the base frame based on crouching state and direction
-        base_frame = self.get_idle_frame(animation_state['facing_direction'], crouching)
-        current_frame = base_frame  # Initialize current_frame with base_frame
-
-        # Handle crouching transition
-        if crouching != animation_state['is_crouching']:
-            if animation_state['crouch_transition_start'] is None:
-                animation_state['crouch_transition_start'] = current_time
-                if animation_state['is_moving']:
-                    # If already moving, start from the current movement frame
-                    animation_state['crouch_start_frame'] = animation_state['last_movement_frame'] or self.get_cycle_frame(
-                        animation_state['cycle_progress'],
-                        animation_state['walk_run_blend_factor'],
-                        animation_state['facing_direction'],
-                        not crouching
-                    )
-                    animation_state['crouch_end_frame'] = self.get_crouch_cycle_frame(
-                        animation_state['cycle_progress'],
-                        animation_state['facing_direction']
-                    )
-                else:
-                    # If not moving, transition between idle frames
-                    animation_state['crouch_start_frame'] = self.get_idle_frame(animation_state['facing_direction'], not crouching)
-                    animation_state['crouch_end_frame'] = self.get_idle_frame(animation_state['facing_direction'], crouching)
-
-        if animation_state['crouch_transition_start'] is not None:
-            transition_progress = (current_time - animation_state['crouch_transition_start']) / self.crouch_transition_duration
-            animation_state['crouch_blend_factor'] = min(1.0, transition_progress)
-            
-            if transition_progress >= 1.0:
-                animation_state['crouch_transition_start'] = None
-                animation_state['is_crouching'] = crouching
-                current_frame = animation_state['crouch_end_frame']
-            else:
-                current_frame = self.interpolate_frames(
-                    animation_state['crouch_start_frame'],
-                    animation_state['crouch_end_frame'],
-                    animation_state['crouch_blend_factor']
-                )
-        else:
-            # Handle direction change for idle turning only
-            if direction_changed and not animation_state['is_turning'] and not animation_state['is_jumping'] and not crouching:
-                animation_state['is_turning'] = True
-                animation_state['turn_start_time'] = current_time
-                animation_state['turn_start_frame'] = animation_state['last_movement_frame'] or self.get_frame('TURN_PASS', animation_state['direction'])
-                animation_state['target_direction'] = new_movement_direction
-                animation_state['from_direction'] = animation_state['direction']
-
-            # Handle jumping
-            if jumping and not animation_state['is_jumping']:
-                animation_state['is_jumping'] = True
-                animation_state['jump_start_time'] = current_time
-                animation_state['jump_phase'] = 'start'
-                animation_state['jump_start_frame'] = animation_state['last_movement_frame'] or base_frame
-            
-            if animation_state['is_jumping']:
-                jump_duration = self.jump_start_duration + self.jump_apex_duration + self.jump_land_duration
-                jump_progress = (current_time - animation_state['jump_start_time']) / jump_duration
-                
-                if jump_progress >= 1.0:
-                    animation_state['is_jumping'] = False
-                    animation_state['jump_phase'] = None
-                    animation_state['jump_end_time'] = current_time
-                    animation_state['jump_end_frame'] = self.get_jump_frame(1.0, animation_state['direction'], crouching)
-                else:
-                    jump_frame = self.get_jump_frame(jump_progress, animation_state['direction'], crouching)
-                    if jump_progress < 0.3:
-                        current_frame = self.interpolate_frames(animation_state['jump_start_frame'], jump_frame, jump_progress / 0.3)
-                    else:
-                        current_frame = jump_frame
-                    animation_state['current_state'] = 'JUMPING'
-            elif animation_state.get('jump_end_time'):
-                jump_end_progress = (current_time - animation_state['jump_end_time']) / self.jump_land_duration
-                if jump_end_progress >= 1.0:
-                    animation_state['jump_end_time'] = None
-                    current_frame = self.get_cycle_frame(0, animation_state['walk_run_blend_factor'], animation_state['direction'], crouching) if animation_state['is_moving'] else base_frame
-                else:
-                    end_frame = self.get_cycle_frame(0, animation_state['walk_run_blend_factor'], animation_state['direction'], crouching) if animation_state['is_moving'] else base_frame
-                    current_frame = self.interpolate_frames(animation_state['jump_end_frame'], end_frame, jump_end_progress)
-            elif animation_state['is_turning']:
-                turn_progress = (current_time - animation_state['turn_start_time']) / self.turn_duration
-                if turn_progress >= 1.0:
-                    animation_state['is_turning'] = False
-                    animation_state['turn_exit_start_time'] = current_time
-                    turn_end_frame = self.get_turn_frame(1.0, animation_state['from_direction'], animation_state['target_direction'], crouching)
-                    animation_state['turn_exit_start_frame'] = turn_end_frame
-                    animation_state['direction'] = animation_state['target_direction']
-                    current_frame = animation_state['turn_exit_start_frame']
-                else:
-                    turn_frame = self.get_turn_frame(turn_progress, animation_state['from_direction'], animation_state['target_direction'], crouching)
-                    current_frame = self.interpolate_frames(animation_state['turn_start_frame'], turn_frame, turn_progress)
-                animation_state['current_state'] = 'TURNING'
-            elif animation_state.get('turn_exit_start_time'):
-                exit_progress = (current_time - animation_state['turn_exit_start_time']) / self.turn_exit_duration
-                if exit_progress >= 1.0:
-                    animation_state['turn_exit_start_time'] = None
-                    current_frame = self.get_cycle_frame(0, animation_state['walk_run_blend_factor'], animation_state['direction'], crouching) if animation_state['is_moving'] else base_frame
-                else:
-                    exit_end_frame = self.get_cycle_frame(0, animation_state['walk_run_blend_factor'], animation_state['direction'], crouching) if animation_state['is_moving'] else base_frame
-                    current_frame = self.interpolate_frames(animation_state['turn_exit_start_frame'], exit_end_frame, exit_progress)
-            else:
-                # Handle walk/run transition and movement
-                if animation_state['is_running'] != running and not crouching:
-                    if animation_state['walk_run_transition_start'] is None:
-                        animation_state['walk_run_transition_start'] = current_time
-                else:
-                    animation_state['walk_run_transition_start'] = None
-
-                if animation_state['walk_run_transition_start'] is not None:
-                    transition_progress = (current_time - animation_state['walk_run_transition_start']) / self.walk_run_transition_duration
-                    if running:
-                        animation_state['walk_run_blend_factor'] = min(1.0, transition_progress)
-                    else:
-                        animation_state['walk_run_blend_factor'] = max(0.0, 1.0 - transition_progress)
-                    
-                    if transition_progress >= 1.0:
-                        animation_state['walk_run_transition_start'] = None
-                        animation_state['is_running'] = running
-                else:
-                    animation_state['walk_run_blend_factor'] = 1.0 if running else 0.0
-
-                # Modify the movement handling to incorporate crouch state
-                if animation_state['is_moving']:
-                    animation_state['idle_transition_start'] = None
-
-                    if crouching:
-                        cycle_distance = self.crouch_cycle_distance
-                    else:
-                        cycle_distance = self.run_cycle_distance * animation_state['walk_run_blend_factor'] + \
-                                         self.walk_cycle_distance * (1 - animation_state['walk_run_blend_factor'])
-                    
-                    animation_state['cycle_progress'] += distance_traveled / cycle_distance
-                    animation_state['cycle_progress'] %= 1.0  # Ensure it wraps around to 0 when it reaches 1
-
-                    if crouching:
-                        moving_frame = self.get_crouch_cycle_frame(
-                            animation_state['cycle_progress'],
-                            animation_state['facing_direction']
-                        )
-                    else:
-                        moving_frame = self.get_cycle_frame(
-                            animation_state['cycle_progress'], 
-                            animation_state['walk_run_blend_factor'],
-                            animation_state['facing_direction'],
-                            False
-                        )
-                    
-                    # Interpolate between crouching and standing frames during transition
-                    if animation_state['crouch_blend_factor'] > 0 and animation_state['crouch_blend_factor'] < 1:
-                        standing_frame = self.get_cycle_frame(
-                            animation_state['cycle_progress'],
-                            animation_state['walk_run_blend_factor'],
-                            animation_state['facing_direction'],
-                            False
-                        )
-                        crouching_frame = self.get_crouch_cycle_frame(
-                            animation_state['cycle_progress'],
-                            animation_state['facing_direction']
-                        )
-                        current_frame = self.interpolate_frames(
-                            standing_frame,
-                            crouching_frame,
-                            animation_state['crouch_blend_factor']
-                        )
-                    else:
-                        current_frame = moving_frame
-
-                    animation_state['current_state'] = 'MOVING'
-                    animation_state['last_movement_frame'] = current_frame
-                else:
-                    if was_moving:
-                        animation_state['idle_transition_start'] = current_time
-                    
-                    if animation_state['idle_transition_start'] is not None:
-                        idle_progress = min(1.0, (current_time - animation_state['idle_transition_start']) / self.idle_transition_duration)
-                        start_frame = animation_state['last_movement_frame'] or base_frame
-                        
-                        # Interpolate between crouching and standing idle frames
-                        standing_idle_frame = self.get_idle_frame(animation_state['facing_direction'], False)
-                        crouching_idle_frame = self.get_idle_frame(animation_state['facing_direction'], True)
-                        
-                        if animation_state['crouch_blend_factor'] > 0 and animation_state['crouch_blend_factor'] < 1:
-                            interpolated_idle_frame = self.interpolate_frames(
-                                standing_idle_frame,
-                                crouching_idle_frame,
-                                animation_state['crouch_blend_factor']
-                            )
-                        else:
-                            interpolated_idle_frame = crouching_idle_frame if crouching else standing_idle_frame
-                        
-                        current_frame = self.interpolate_to_idle(start_frame, interpolated_idle_frame, idle_progress)
-                        
-                        if idle_progress == 1.0:
-                            animation_state['idle_transition_start'] = None
-                            animation_state['last_movement_frame'] = None
-                    else:
-                        current_frame = base_frame
-                    
-                    animation_state['current_state'] = 'IDLE' if not crouching else 'CROUCHING'
-
-        # Update direction only if moving
-        if animation_state['is_moving']:
-            animation_state['direction'] = new_movement_direction
-            animation_state['facing_direction'] = new_movement_direction
-
-        player['pivot_points'] = current_frame
-        animation_state['last_x_position'] = player['x']
-        animation_state['last_update_time'] = current_time
-
-    def get_animation_state(self, player_id):
-        state = self.player_animation_states.get(player_id, {})
-        return {
-            'current': state.get('current_state', 'IDLE'),
-            'direction': state.get('direction', 'forward'),
-            'is_moving': state.get('is_moving', False),
-            'is_running': state.get('is_running', False),
-            'is_jumping': state.get('is_jumping', False),
-            'is_crouching': state.get('is_crouching', False),  # New: Include crouching state
-            'jump_phase': state.get('jump_phase', None),
-            'distance_traveled': state.get('distance_traveled', 0.0),
-            'last_direction': state.get('last_direction', 'forward'),
-            'cycle_progress': state.get('cycle_progress', 0.0),
-            'idle_transition_progress': (current_time - state.get('idle_transition_start', current_time)) / self.idle_transition_duration if state.get('idle_transition_start') is not None else 1.0,
-            'walk_run_blend_factor': state.get('walk_run_blend_factor', 0.0),
-            'is_turning': state.get('is_turning', False),
-            'turn_progress': (current_time - state.get('turn_start_time', current_time)) / self.turn_duration if state.get('turn_start_time') is not None else 1.0,
-            'jump_progress': (current_time - state.get('jump_start_time', current_time)) / (self.jump_start_duration + self.jump_apex_duration + self.jump_land_duration) if state.get('jump_start_time') is not None else 0.0,
-            'crouch_blend_factor': state.get('crouch_blend_factor', 0.0)  # New: Include crouch blend factor
+import json
+import time
+import math
+import numpy as np
+from .pose_table import PoseTable, DIRECTIONS
+from .pose_evaluator import PoseEvaluator, CLIP_JUMP, CLIP_TURN, CLIP_CROUCH_TURN, idle_layer, cycle_layer, single
+from .game_log import animation_log
+
+# Fixed joint order shared by every frame in animation_frames.json. Poses are
+# (len(JOINT_NAMES), 2) arrays with rows in this order.
+JOINT_NAMES = (
+    'top_head', 'neck', 'spine_01', 'spine_02', 'pelvis',
+    'r_shoulder', 'l_elbow', 'l_hand', 'r_elbow', 'r_hand',
+    'l_knee', 'l_ankle', 'l_toe', 'r_knee', 'r_ankle', 'r_toe'
+)
+
+# Values of settings.GAME_POSE_REPLICATION: send each player's pose, or only
+# its animation parameters for clients to rebuild the pose from
+POSE_REPLICATION_SKELETON = 'skeleton'
+POSE_REPLICATION_PARAMETERS = 'parameters'
+POSE_REPLICATION_MODES = (POSE_REPLICATION_SKELETON, POSE_REPLICATION_PARAMETERS)
+
+def read_animation_frames():
+    """Frames from animation_frames.json as {name: {joint: [x, y]}}, with missing joints filled in."""
+    with open('game_app/animation_frames.json', 'r') as file:
+        frames = json.load(file)
+    for frame in frames.values():
+        if 'r_elbow' not in frame:
+            frame['r_elbow'] = [0.85, 0.8]
+        if 'r_hand' not in frame:
+            frame['r_hand'] = [0.9, 1.1]
+    return frames
+
+class AnimationComponent:
+    def __init__(self, game_state):
+        self.game_state = game_state
+        self.animation_frames = self.load_animation_frames()
+        self.player_animation_states = {}
+        self.run_cycle_distance = 2.5
+        self.walk_cycle_distance = 0.4
+        self.crouch_cycle_distance = 0.85
+        self.idle_transition_duration = 0.2
+        self.walk_run_transition_duration = 0.5
+        self.turn_duration = 0.1
+        self.turn_exit_duration = 0.2
+        self.jump_start_duration = 0.1
+        self.jump_apex_duration = 0.2
+        self.jump_land_duration = 0.1
+        self.crouch_transition_duration = 0.2
+        self.pose_table_resolution = 64  # samples per cycle
+        self.flipped_frames = {}
+        self.pose_table = PoseTable(self.get_frame_arrays(), self.pose_table_resolution)
+        self.pose_evaluator = PoseEvaluator(self.get_frame, self.pose_table)
+        # Off when clients rebuild poses from the animation parameters themselves
+        self.bake_poses = True
+
+    def load_animation_frames(self):
+        return {frame_name: self.frame_to_pose(frame) for frame_name, frame in read_animation_frames().items()}
+
+    def get_frame(self, frame_name, direction):
+        if direction == 'backward':
+            flipped_frame_name = f"{frame_name}_FLIP"
+            if flipped_frame_name in self.animation_frames:
+                return self.animation_frames[flipped_frame_name]
+            if frame_name not in self.flipped_frames:
+                self.flipped_frames[frame_name] = self.flip_frame(self.animation_frames[frame_name])
+            return self.flipped_frames[frame_name]
+        return self.animation_frames[frame_name]
+
+    def get_frame_arrays(self):
+        return {(frame_name, direction): self.get_frame(frame_name, direction)
+                for frame_name in self.animation_frames if not frame_name.endswith('_FLIP')
+                for direction in DIRECTIONS}
+
+    @staticmethod
+    def frame_to_pose(frame):
+        pose = np.array([frame[joint] for joint in JOINT_NAMES], dtype=float)
+        # Stored frames are shared by every player, so they must never change in place
+        pose.flags.writeable = False
+        return pose
+
+    @staticmethod
+    def pose_to_frame(pose):
+        return dict(zip(JOINT_NAMES, pose.tolist()))
+
+    def get_idle_frame(self, direction, crouching):
+        if crouching:
+            return self.get_frame('CROUCH_IDLE', direction)
+        return self.get_frame('IDLE', direction)
+
+    def remove_player(self, player_id):
+        self.player_animation_states.pop(player_id, None)
+
+    def set_player_animation_state(self, player_id, state):
+        self.player_animation_states[player_id] = {
+            'current_state': state,
+            'last_update_time': time.time(),
+            'is_moving': False,
+            'is_running': False,
+            'is_jumping': False,
+            'is_crouching': False,
+            'jump_start_time': None,
+            'jump_phase': None,
+            'direction': 'forward',
+            'facing_direction': 'forward',
+            'last_x_position': None,
+            'distance_traveled': 0.0,
+            'cycle_progress': 0.0,
+            'last_direction': 'forward',
+            'idle_transition_start': None,
+            'last_movement_layer': None,
+            'walk_run_transition_start': None,
+            'walk_run_blend_factor': 0.0,
+            'turn_start_time': None,
+            'is_turning': False,
+            'crouch_transition_start': None,
+            'crouch_blend_factor': 0.0
+        }
+
+    def flip_frame(self, frame):
+        flipped_frame = frame.copy()
+        flipped_frame[:, 0] = 1 - flipped_frame[:, 0]
+        flipped_frame.flags.writeable = False
+        return flipped_frame
+
+    def get_jump_layer(self, jump_progress, backward, crouching):
+        if not crouching:
+            return (CLIP_JUMP, backward, jump_progress, 0.0)
+        else:
+            # For now, we'll use the CROUCH_IDLE frame for jumping while crouching
+            return idle_layer(backward, True)
+
+    def or_last_movement_layer(self, animation_state, default_layer):
+        last_movement_layer = animation_state['last_movement_layer']
+        return default_layer if last_movement_layer is None else last_movement_layer
+
+    def update_pivot_points(self, player, running, jumping, crouching):
+        """Advance the player's animation and set its parameters, and its pose when `bake_poses` is on."""
+        player_id = player['id']
+
+        if player_id not in self.player_animation_states:
+            self.set_player_animation_state(player_id, 'IDLE')
+        
+        animation_state = self.player_animation_states[player_id]
+        previous_state = animation_state['current_state']
+        current_time = time.time()
+        
+        if animation_state['last_x_position'] is None:
+            animation_state['last_x_position'] = player['x']
+
+        distance_traveled = abs(player['x'] - animation_state['last_x_position'])
+        animation_state['distance_traveled'] += distance_traveled
+
+        was_moving = animation_state['is_moving']
+        animation_state['is_moving'] = distance_traveled > 0.001
+
+        if animation_state['is_moving']:
+            new_movement_direction = 'forward' if player['x'] > animation_state['last_x_position'] else 'backward'
+            animation_state['facing_direction'] = new_movement_direction
+        else:
+            new_movement_direction = animation_state['direction']
+
+        direction_changed = new_movement_direction != animation_state['direction']
+        facing_backward = animation_state['facing_direction'] == 'backward'
+        backward = animation_state['direction'] == 'backward'
+        blend = animation_state['walk_run_blend_factor']
+
+        # Determine the base layer based on crouching state and direction
+        base_layer = idle_layer(facing_backward, crouching)
+        anim = single(base_layer)
+
+        # Handle crouching transition
+        if crouching != animation_state['is_crouching']:
+            if animation_state['crouch_transition_start'] is None:
+                animation_state['crouch_transition_start'] = current_time
+                if animation_state['is_moving']:
+                    # If already moving, start from the current movement layer
+                    animation_state['crouch_start_layer'] = self.or_last_movement_layer(
+                        animation_state,
+                        cycle_layer(animation_state['cycle_progress'], blend, facing_backward, not crouching)
+                    )
+                    animation_state['crouch_end_layer'] = cycle_layer(
+                        animation_state['cycle_progress'], blend, facing_backward, crouching
+                    )
+                else:
+                    # If not moving, transition between idle layers
+                    animation_state['crouch_start_layer'] = idle_layer(facing_backward, not crouching)
+                    animation_state['crouch_end_layer'] = idle_layer(facing_backward, crouching)
+
+        if animation_state['crouch_transition_start'] is not None:
+            transition_progress = (current_time - animation_state['crouch_transition_start']) / self.crouch_transition_duration
+            animation_state['crouch_blend_factor'] = min(1.0, transition_progress)
+            
+            if transition_progress >= 1.0:
+                animation_state['crouch_transition_start'] = None
+                animation_state['is_crouching'] = crouching
+                anim = single(animation_state['crouch_end_layer'])
+            else:
+                anim = (animation_state['crouch_start_layer'], animation_state['crouch_end_layer'],
+                        animation_state['crouch_blend_factor'])
+        else:
+            # Handle direction change for idle turning only
+            if direction_changed and not animation_state['is_turning'] and not animation_state['is_jumping'] and not crouching:
+                animation_state['is_turning'] = True
+                animation_state['turn_start_time'] = current_time
+                animation_state['target_direction'] = new_movement_direction
+                animation_state['from_direction'] = animation_state['direction']
+                # A turn clip at 0 is TURN_PASS facing the direction being turned from
+                animation_state['turn_start_layer'] = self.or_last_movement_layer(
+                    animation_state, (CLIP_TURN, new_movement_direction == 'backward', 0.0, 0.0)
+                )
+
+            # Handle jumping
+            if jumping and not animation_state['is_jumping']:
+                animation_state['is_jumping'] = True
+                animation_state['jump_start_time'] = current_time
+                animation_state['jump_phase'] = 'start'
+                animation_state['jump_start_layer'] = self.or_last_movement_layer(animation_state, base_layer)
+            
+            if animation_state['is_jumping']:
+                jump_duration = self.jump_start_duration + self.jump_apex_duration + self.jump_land_duration
+                jump_progress = (current_time - animation_state['jump_start_time']) / jump_duration
+                
+                if jump_progress >= 1.0:
+                    animation_state['is_jumping'] = False
+                    animation_state['jump_phase'] = None
+                    animation_state['jump_end_time'] = current_time
+                    animation_state['jump_end_layer'] = self.get_jump_layer(1.0, backward, crouching)
+                else:
+                    jump_layer = self.get_jump_layer(jump_progress, backward, crouching)
+                    if jump_progress < 0.3:
+                        anim = (animation_state['jump_start_layer'], jump_layer, jump_progress / 0.3)
+                    else:
+                        anim = single(jump_layer)
+                    animation_state['current_state'] = 'JUMPING'
+            elif animation_state.get('jump_end_time'):
+                jump_end_progress = (current_time - animation_state['jump_end_time']) / self.jump_land_duration
+                end_layer = cycle_layer(0.0, blend, backward, crouching) if animation_state['is_moving'] else base_layer
+                if jump_end_progress >= 1.0:
+                    animation_state['jump_end_time'] = None
+                    anim = single(end_layer)
+                else:
+                    anim = (animation_state['jump_end_layer'], end_layer, jump_end_progress)
+            elif animation_state['is_turning']:
+                turn_progress = (current_time - animation_state['turn_start_time']) / self.turn_duration
+                turn_clip = CLIP_CROUCH_TURN if crouching else CLIP_TURN
+                turn_backward = animation_state['target_direction'] == 'backward'
+                if turn_progress >= 1.0:
+                    animation_state['is_turning'] = False
+                    animation_state['turn_exit_start_time'] = current_time
+                    animation_state['turn_exit_start_layer'] = (turn_clip, turn_backward, 1.0, 0.0)
+                    animation_state['direction'] = animation_state['target_direction']
+                    anim = single(animation_state['turn_exit_start_layer'])
+                else:
+                    anim = (animation_state['turn_start_layer'], (turn_clip, turn_backward, turn_progress, 0.0), turn_progress)
+                animation_state['current_state'] = 'TURNING'
+            elif animation_state.get('turn_exit_start_time'):
+                exit_progress = (current_time - animation_state['turn_exit_start_time']) / self.turn_exit_duration
+                exit_end_layer = cycle_layer(0.0, blend, backward, crouching) if animation_state['is_moving'] else base_layer
+                if exit_progress >= 1.0:
+                    animation_state['turn_exit_start_time'] = None
+                    anim = single(exit_end_layer)
+                else:
+                    anim = (animation_state['turn_exit_start_layer'], exit_end_layer, exit_progress)
+            else:
+                # Handle walk/run transition and movement
+                if animation_state['is_running'] != running and not crouching:
+                    if animation_state['walk_run_transition_start'] is None:
+                        animation_state['walk_run_transition_start'] = current_time
+                else:
+                    animation_state['walk_run_transition_start'] = None
+
+                if animation_state['walk_run_transition_start'] is not None:
+                    transition_progress = (current_time - animation_state['walk_run_transition_start']) / self.walk_run_transition_duration
+                    if running:
+                        animation_state['walk_run_blend_factor'] = min(1.0, transition_progress)
+                    else:
+                        animation_state['walk_run_blend_factor'] = max(0.0, 1.0 - transition_progress)
+                    
+                    if transition_progress >= 1.0:
+                        animation_state['walk_run_transition_start'] = None
+                        animation_state['is_running'] = running
+                else:
+                    animation_state['walk_run_blend_factor'] = 1.0 if running else 0.0
+                blend = animation_state['walk_run_blend_factor']
+
+                if animation_state['is_moving']:
+                    animation_state['idle_transition_start'] = None
+
+                    if crouching:
+                        cycle_distance = self.crouch_cycle_distance
+                    else:
+                        cycle_distance = self.run_cycle_distance * blend + self.walk_cycle_distance * (1 - blend)
+                    
+                    animation_state['cycle_progress'] += distance_traveled / cycle_distance
+                    animation_state['cycle_progress'] %= 1.0  # Ensure it wraps around to 0 when it reaches 1
+
+                    moving_layer = cycle_layer(animation_state['cycle_progress'], blend, facing_backward, crouching)
+                    anim = single(moving_layer)
+                    animation_state['current_state'] = 'MOVING'
+                    animation_state['last_movement_layer'] = moving_layer
+                else:
+                    if was_moving:
+                        animation_state['idle_transition_start'] = current_time
+                    
+                    if animation_state['idle_transition_start'] is not None:
+                        idle_progress = min(1.0, (current_time - animation_state['idle_transition_start']) / self.idle_transition_duration)
+                        start_layer = self.or_last_movement_layer(animation_state, base_layer)
+                        anim = (start_layer, base_layer, idle_progress)
+                        
+                        if idle_progress == 1.0:
+                            animation_state['idle_transition_start'] = None
+                            animation_state['last_movement_layer'] = None
+                    
+                    animation_state['current_state'] = 'IDLE' if not crouching else 'CROUCHING'
+
+        # Update direction only if moving
+        if animation_state['is_moving']:
+            animation_state['direction'] = new_movement_direction
+            animation_state['facing_direction'] = new_movement_direction
+
+        player['anim'] = anim
+        if self.bake_poses:
+            player['pivot_points'] = self.pose_evaluator.pose(anim)
+        animation_state['last_x_position'] = player['x']
+        animation_state['last_update_time'] = current_time
+        if animation_state['current_state'] != previous_state:
+            animation_log.debug("Player %s animation state: %s -> %s",
+                                player_id, previous_state, animation_state['current_state'])
+
+    def get_animation_state(self, player_id):
+        state = self.player_animation_states.get(player_id, {})
+        return {
+            'current': state.get('current_state', 'IDLE'),
+            'direction': state.get('direction', 'forward'),
+            'is_moving': state.get('is_moving', False),
+            'is_running': state.get('is_running', False),
+            'is_jumping': state.get('is_jumping', False),
+            'is_crouching': state.get('is_crouching', False),  # New: Include crouching state
+            'jump_phase': state.get('jump_phase', None),
+            'distance_traveled': state.get('distance_traveled', 0.0),
+            'last_direction': state.get('last_direction', 'forward'),
+            'cycle_progress': state.get('cycle_progress', 0.0),
+            'idle_transition_progress': (current_time - state.get('idle_transition_start', current_time)) / self.idle_transition_duration if state.get('idle_transition_start') is not None else 1.0,
+            'walk_run_blend_factor': state.get('walk_run_blend_factor', 0.0),
+            'is_turning': state.get('is_turning', False),
+            'turn_progress': (current_time - state.get('turn_start_time', current_time)) / self.turn_duration if state.get('turn_start_time') is not None else 1.0,
+            'jump_progress': (current_time - state.get('jump_start_time', current_time)) / (self.jump_start_duration + self.jump_apex_duration + self.jump_land_duration) if state.get('jump_start_time') is not None else 0.0,
+            'crouch_blend_factor': state.get('crouch_blend_factor', 0.0)  # New: Include crouch blend factor
         }
\ No newline at end of file
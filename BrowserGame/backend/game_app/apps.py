@@ -1,6 +1,15 @@
-#/backend/game_app/apps.py
-from django.apps import AppConfig
-
-class GameAppConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'game_app'
\ No newline at end of file
+#/backend/game_app/apps.py
+from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+class GameAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'game_app'
+
+    def ready(self):
+        from .animation_component import POSE_REPLICATION_MODES
+        # Anything but 'skeleton' would otherwise quietly mean 'parameters'
+        if settings.GAME_POSE_REPLICATION not in POSE_REPLICATION_MODES:
+            raise ImproperlyConfigured(f"GAME_POSE_REPLICATION must be one of {POSE_REPLICATION_MODES}, "
+                                       f"not {settings.GAME_POSE_REPLICATION!r}")
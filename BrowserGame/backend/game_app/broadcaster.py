@@ -0,0 +1,113 @@
+# /backend/game_app/broadcaster.py
+import asyncio
+import json
+import logging
+import time
+from .delta_encoder import SnapshotHistory, FrameBuilder
+from .wire_codec import PlayerIndexTable
+
+logger = logging.getLogger(__name__)
+
+class StateBroadcaster:
+    """Fans each tick's state out to every connection of a game.
+
+    Connections register here instead of receiving ticks through the channel
+    layer, which deep-copies every message into each recipient's queue and
+    wakes each consumer separately. Clients that get everyone at full
+    detail share one frame per baseline, serialized once per codec, and the
+    same payload object is written to every socket that needs it. Player
+    records shared between different frames are encoded only once.
+
+    With an `interest` manager, each client only gets the players near its
+    own, at a level of detail that drops with distance. The spatial hash is
+    built once per tick and per-player changes are diffed once per baseline
+    and LOD, so a client's cost follows how many players it can see rather
+    than the size of the room.
+
+    A connection provides `player_id`, `codec`, `delta_encoder` and the
+    consumer `send`. With a `profiler`, each broadcast adds its encode and
+    send time and records the bytes it wrote.
+    """
+
+    def __init__(self, max_history=120, interest=None, profiler=None):
+        self.history = SnapshotHistory(max_history)
+        self.player_table = PlayerIndexTable()
+        self.interest = interest
+        self.profiler = profiler
+        self.connections = []
+
+    def add(self, connection):
+        if connection not in self.connections:
+            self.connections.append(connection)
+
+    def discard(self, connection):
+        if connection in self.connections:
+            self.connections.remove(connection)
+
+    async def broadcast(self, seq, snapshot):
+        start = time.perf_counter()
+        self.history.add(seq, snapshot)
+        self.player_table.update(snapshot)
+        if self.interest is not None:
+            self.interest.update(snapshot)
+
+        builder = FrameBuilder(seq, self.history)
+        frames = {}
+        payloads = {}
+        records = {True: {}, False: {}}
+        sends = []
+        sent_bytes = 0
+        for connection in self.connections:
+            delta_encoder = connection.delta_encoder
+            base_seq = delta_encoder.next_base(seq)
+            if base_seq is not None and base_seq not in delta_encoder.views:
+                # No record of what that frame contained, so there is nothing to diff against
+                delta_encoder.restart(seq)
+                base_seq = None
+            base_view = None if base_seq is None else delta_encoder.views[base_seq]
+
+            view = None
+            if self.interest is not None:
+                view = self.interest.view(connection.player_id, snapshot, delta_encoder.view)
+            delta_encoder.record_view(seq, view)
+
+            codec = connection.codec
+            if view is None and base_view is None:
+                # Everyone at full detail: clients on the same baseline share the frame and payload
+                key = (codec.binary, base_seq)
+                payload = payloads.get(key)
+                if payload is None:
+                    frame = frames.get(base_seq)
+                    if frame is None:
+                        frame = frames[base_seq] = builder.frame(base_seq)
+                    payload = payloads[key] = codec.encode_frame(frame, self.player_table, records[codec.binary])
+            else:
+                # Views rarely coincide, so these frames are not looked up; their records are still shared
+                frame = builder.frame(base_seq, view, base_view)
+                payload = codec.encode_frame(frame, self.player_table, records[codec.binary])
+
+            sent_bytes += len(payload)
+            if codec.binary:
+                sends.append(connection.send(bytes_data=payload))
+            else:
+                sends.append(connection.send(text_data=payload))
+
+        encoded = time.perf_counter()
+        if sends:
+            results = await asyncio.gather(*sends, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.warning(f"Failed to send state frame {seq}: {result!r}")
+        if self.profiler is not None:
+            self.profiler.add('encode', encoded - start)
+            self.profiler.add('send', time.perf_counter() - encoded)
+            self.profiler.record('sent_bytes', sent_bytes)
+
+    async def send_map_update(self, update):
+        """Send a map update to every connection, as a JSON text frame whichever codec it uses."""
+        text_data = json.dumps(update, separators=(',', ':'))
+        results = await asyncio.gather(*(connection.send(text_data=text_data) for connection in self.connections),
+                                       return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(f"Failed to send map update {update['version']}: {result!r}")
@@ -1,53 +1,62 @@
-# /backend/game_app/consumers.py
-import json
-from channels.generic.websocket import AsyncWebsocketConsumer
-from .game_state import game_state
-
-class GameConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        self.player_id = self.scope['url_route']['kwargs']['player_id']
-        await self.channel_layer.group_add('game', self.channel_name)
-        await self.accept()
-        
-        if not game_state.physics_task:
-            await game_state.start_physics_update()
-            print("Starting physics update loop")
-
-        if not game_state.map_data:
-            await game_state.load_map_data()
-
-        initial_y = game_state.map_data['height'] if game_state.map_data else 0
-        game_state.add_player(self.player_id, 0, initial_y)
-        print(f"New player connected: {self.player_id}")
-        await game_state.broadcast_state()
-
-    async def disconnect(self, close_code):
-        print(f"Player disconnected: {self.player_id}")
-        game_state.remove_player(self.player_id)
-        await game_state.broadcast_state()
-        await self.channel_layer.group_discard('game', self.channel_name)
-
-        if not game_state.players:
-            await game_state.stop_physics_update()
-            print("Shutting down physics update loop")
-
-    async def receive(self, text_data):
-        data = json.loads(text_data)
-        x = data.get('x')
-        jump = data.get('jump', False)
-        running = data.get('running', False)
-        crouching = data.get('crouching', False)
-        
-        if x is not None:
-            game_state.movement_component.update_player_position(self.player_id, x, None, running, crouching)
-        
-        if jump:
-            game_state.movement_component.player_jump(self.player_id)
-        
-        game_state.movement_component.update_player_crouch(self.player_id, crouching)
-        
-        await game_state.broadcast_state()
-
-    async def game_state(self, event):
-        # print(f"Sending game state to {self.player_id}: {event['state']}")
-        await self.send(text_data=event['state'])
\ No newline at end of file
+# /backend/game_app/consumers.py
+from channels.generic.websocket import AsyncWebsocketConsumer
+from .game_state import DEFAULT_MAP_ID
+from .rooms import room_manager
+from .delta_encoder import DeltaEncoder
+from .wire_codec import BINARY_SUBPROTOCOL, InputDecodeError, create_codec, decode_input
+from .game_log import network_log
+
+class GameConsumer(AsyncWebsocketConsumer):
+    room = None
+
+    async def connect(self):
+        kwargs = self.scope['url_route']['kwargs']
+        self.player_id = kwargs['player_id']
+        self.map_id = int(kwargs.get('map_id', DEFAULT_MAP_ID))
+        self.codec = create_codec(self.scope.get('subprotocols', []))
+        await self.accept(subprotocol=BINARY_SUBPROTOCOL if self.codec.binary else None)
+
+        # Loads the map and starts the room's physics loop on first join
+        room = await room_manager.join(self.map_id)
+        self.room = room
+        self.delta_encoder = DeltaEncoder(room.broadcaster.history, room.keyframe_interval)
+        room.spawn_player(self.player_id)
+        # Tick frames are written straight to the socket by the broadcaster
+        room.broadcaster.add(self)
+        await self.channel_layer.group_add(room.group_name, self.channel_name)
+        network_log.info("New player connected: %s (map %d)", self.player_id, self.map_id)
+
+    async def disconnect(self, close_code):
+        network_log.info("Player disconnected: %s", self.player_id)
+        room = self.room
+        if room is None:
+            return
+        self.room = None
+        room.broadcaster.discard(self)
+        room.remove_player(self.player_id)
+        await self.channel_layer.group_discard(room.group_name, self.channel_name)
+        # Stops the physics loop and drops the room once it is empty
+        await room_manager.leave(room)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if self.room is None:
+            return
+        try:
+            data = decode_input(text_data, bytes_data)
+        except InputDecodeError as e:
+            # A broken or outdated client; closing runs disconnect, which removes the player
+            network_log.warning("Closing connection of %s after malformed input: %s", self.player_id, e)
+            await self.close(code=1003)
+            return
+        network_log.debug("Input from %s: %s", self.player_id, data)
+        if 'ack' in data:
+            self.delta_encoder.ack(data['ack'])
+
+        # Applied at the start of the next tick, whose broadcast carries the result
+        self.room.queue_input(self.player_id, data)
+
+    async def map_changed(self, event):
+        # Sent to the room's group when its map is saved; the room reloads the changed chunks
+        # once, however many of its connections pass this on, and sends the new tiles to all of them
+        if self.room is not None:
+            self.room.map_changed(event['version'], event['chunks'])
\ No newline at end of file
@@ -0,0 +1,344 @@
+# /backend/game_app/delta_encoder.py
+from collections import OrderedDict
+import numpy as np
+from .animation_component import JOINT_NAMES
+
+# Fixed-point scales for the wire format; the client divides by the same values
+POSITION_SCALE = 100
+ANGLE_SCALE = 100
+PIVOT_SCALE = 1000
+ANIM_SCALE = 1000
+
+FLAG_BACKWARD = 1
+FLAG_CROUCHING = 2
+FLAG_RUNNING = 4
+FLAG_JUMPING = 8
+
+# Set on a clip id when the clip plays facing backward
+CLIP_BACKWARD = 0x80
+# Set on the first clip id of animation parameters when a mix and a second layer follow
+CLIP_BLENDED = 0x40
+
+# Level of detail a client receives a player at, chosen by distance from its own player
+LOD_FULL = 0      # every field; the skeleton, or the full animation parameters to rebuild it from
+LOD_CLIP = 1      # only the animation layer that dominates the pose; the client rebuilds an approximation
+LOD_POSITION = 2  # position and flags only, refreshed every `position_interval` ticks
+# Records below full detail carry their LOD in these bits of `flags`
+LOD_SHIFT = 4
+
+# Only full detail carries `input_seq`: a client's own player is always at full
+# detail, and it is the only one whose acknowledged inputs the client replays
+LOD_FIELDS = {
+    LOD_FULL: ('x', 'y', 'speed', 'angle', 'flags', 'mouse_position', 'input_seq'),
+    LOD_CLIP: ('x', 'y', 'speed', 'angle', 'flags', 'mouse_position'),
+    LOD_POSITION: ('x', 'y', 'flags'),
+}
+
+def pack_flags(player_state):
+    flags = 0
+    if player_state['direction'] == 'backward':
+        flags |= FLAG_BACKWARD
+    if player_state['crouching']:
+        flags |= FLAG_CROUCHING
+    if player_state['running']:
+        flags |= FLAG_RUNNING
+    if player_state['jumping']:
+        flags |= FLAG_JUMPING
+    return flags
+
+def quantize_player(player_state):
+    record = {
+        'x': round(player_state['x'] * POSITION_SCALE),
+        'y': round(player_state['y'] * POSITION_SCALE),
+        'speed': round(player_state['speed'] * POSITION_SCALE),
+        'angle': round(player_state['angle'] * ANGLE_SCALE),
+        'flags': pack_flags(player_state),
+        'mouse_position': [round(player_state['mouse_position']['x']), round(player_state['mouse_position']['y'])],
+        'anim': quantize_anim(player_state['anim']),
+        'input_seq': player_state['input_seq']
+    }
+    if 'pivot_points' in player_state:
+        record['pivot_points'] = dict(zip(JOINT_NAMES, np.rint(player_state['pivot_points'] * PIVOT_SCALE).astype(int).tolist()))
+    return record
+
+def quantize_layer(layer):
+    clip_id, backward, progress, blend = layer
+    return [clip_id | CLIP_BACKWARD if backward else clip_id, round(progress * ANIM_SCALE), round(blend * ANIM_SCALE)]
+
+def quantize_anim(anim):
+    """Animation parameters as [clip, progress, blend], followed by [mix, clip, progress, blend] while mixing."""
+    layer_a, layer_b, mix = anim
+    quantized = quantize_layer(layer_a)
+    quantized_mix = round(mix * ANIM_SCALE)
+    if quantized_mix > 0:
+        quantized[0] |= CLIP_BLENDED
+        quantized.append(quantized_mix)
+        quantized += quantize_layer(layer_b)
+    return quantized
+
+def dequantize_layer(clip_id, progress, blend):
+    return (clip_id & ~(CLIP_BACKWARD | CLIP_BLENDED), bool(clip_id & CLIP_BACKWARD),
+            progress / ANIM_SCALE, blend / ANIM_SCALE)
+
+def dequantize_anim(quantized):
+    """Inverse of `quantize_anim`, giving what clients feed their PoseEvaluator."""
+    layer_a = dequantize_layer(*quantized[:3])
+    if len(quantized) == 3:
+        return (layer_a, layer_a, 0.0)
+    return (layer_a, dequantize_layer(*quantized[4:7]), quantized[3] / ANIM_SCALE)
+
+def dominant_anim(quantized):
+    """Quantized animation parameters cut down to their dominant layer."""
+    if len(quantized) == 3:
+        return quantized
+    if quantized[3] * 2 >= ANIM_SCALE:
+        return quantized[4:7]
+    return [quantized[0] & ~CLIP_BLENDED, quantized[1], quantized[2]]
+
+def quantize_state(state):
+    return {player_id: quantize_player(player_state) for player_id, player_state in state.items()}
+
+def quantize_columns(player_ids, x, y, speed, angle, flags, mouse_positions, anims, input_seqs, pivot_points=None):
+    """`quantize_state` for players held as arrays, one row per player.
+
+    `flags` are already packed and `pivot_points` is (n_players, n_joints, 2),
+    or None to leave skeletons out.
+    """
+    def scaled(values, scale):
+        return np.rint(values * scale).astype(int).tolist()
+
+    columns = zip(
+        player_ids,
+        scaled(x, POSITION_SCALE),
+        scaled(y, POSITION_SCALE),
+        scaled(speed, POSITION_SCALE),
+        scaled(angle, ANGLE_SCALE),
+        flags.tolist(),
+        mouse_positions,
+        anims,
+        input_seqs,
+    )
+    snapshot = {player_id: {
+        'x': qx,
+        'y': qy,
+        'speed': qspeed,
+        'angle': qangle,
+        'flags': qflags,
+        'mouse_position': [round(mouse['x']), round(mouse['y'])],
+        'anim': quantize_anim(anim),
+        'input_seq': input_seq
+    } for player_id, qx, qy, qspeed, qangle, qflags, mouse, anim, input_seq in columns}
+    if pivot_points is not None:
+        for player, points in zip(snapshot.values(), scaled(pivot_points, PIVOT_SCALE)):
+            player['pivot_points'] = dict(zip(JOINT_NAMES, points))
+    return snapshot
+
+def project_player(player, lod):
+    """The part of a quantized player record sent at `lod`.
+
+    Full detail carries the skeleton when the snapshot has one and the
+    animation parameters otherwise.
+    """
+    record = {field: player[field] for field in LOD_FIELDS[lod]}
+    if lod == LOD_FULL:
+        if 'pivot_points' in player:
+            record['pivot_points'] = player['pivot_points']
+        else:
+            record['anim'] = player['anim']
+    else:
+        if lod == LOD_CLIP:
+            record['anim'] = dominant_anim(player['anim'])
+        record['flags'] |= lod << LOD_SHIFT
+    return record
+
+def diff_player(base, current):
+    changes = {}
+    for field, value in current.items():
+        if field == 'pivot_points' and field in base:
+            base_points = base['pivot_points']
+            joints = {joint: point for joint, point in value.items() if base_points.get(joint) != point}
+            if joints:
+                changes['pivot_points'] = joints
+        elif base.get(field) != value:
+            changes[field] = value
+    return changes
+
+class SnapshotHistory:
+    """Recently broadcast snapshots by sequence number, shared by all clients of a game.
+
+    Players sent at LOD_POSITION only move every `position_interval` ticks:
+    each frame shows them as of its `position_seq`, the first broadcast of
+    the current interval. Projected records are cached for the newest
+    `max_records` snapshots, which are the baselines clients use; older
+    ones are projected again if needed.
+    """
+
+    def __init__(self, max_history=120, position_interval=6, max_records=30):
+        self.max_history = max_history
+        self.position_interval = position_interval
+        self.max_records = max_records
+        self.snapshots = OrderedDict()
+        self.position_seqs = {}
+        self.position_seq = None
+        self.records = {}
+
+    def add(self, seq, snapshot):
+        if self.position_seq is None or seq - self.position_seq >= self.position_interval:
+            self.position_seq = seq
+        self.snapshots[seq] = snapshot
+        self.position_seqs[seq] = self.position_seq
+        while len(self.snapshots) > self.max_history:
+            old_seq, _ = self.snapshots.popitem(last=False)
+            del self.position_seqs[old_seq]
+        while len(self.records) > self.max_records:
+            del self.records[next(iter(self.records))]
+
+    def get(self, seq):
+        return self.snapshots.get(seq)
+
+    def has_base(self, seq):
+        """Whether a frame can still be diffed against `seq`, including its held positions."""
+        return seq in self.snapshots and self.position_seqs[seq] in self.snapshots
+
+    def record(self, seq, player_id, lod):
+        """`player_id` at `lod` as a client was sent it in the frame at `seq`, or None if absent."""
+        if lod == LOD_POSITION:
+            # Held positions; players who joined since are shown where they are in this frame
+            position_seq = self.position_seqs[seq]
+            if player_id in self.snapshots[position_seq]:
+                seq = position_seq
+        records = self.records.get(seq)
+        if records is None:
+            records = self.records[seq] = {}
+        record = records.get((player_id, lod))
+        if record is None:
+            player = self.snapshots[seq].get(player_id)
+            if player is None:
+                return None
+            record = records[(player_id, lod)] = project_player(player, lod)
+        return record
+
+    def __contains__(self, seq):
+        return seq in self.snapshots
+
+class FrameBuilder:
+    """Builds the frames of one broadcast at `seq`, which must already be in `history`.
+
+    A client's view maps the players it is sent to their LOD, or is None
+    for everyone at full detail. Per-player changes are cached here and
+    projected records in the history, so clients whose views overlap share
+    them, and so do the frames and encoded records built from them.
+    """
+
+    def __init__(self, seq, history):
+        self.seq = seq
+        self.history = history
+        self.snapshot = history.get(seq)
+        self.record = history.record
+        self.changes = {}
+
+    def view_items(self, snapshot, view):
+        if view is None:
+            return ((player_id, LOD_FULL) for player_id in snapshot)
+        return view.items()
+
+    def frame(self, base_seq=None, view=None, base_view=None):
+        if base_seq is None:
+            return self.keyframe(view)
+        return self.delta(base_seq, view, base_view)
+
+    def keyframe(self, view=None):
+        """Full records of the players in `view`."""
+        players = {player_id: self.record(self.seq, player_id, lod)
+                   for player_id, lod in self.view_items(self.snapshot, view)}
+        # `entered` lists players sent in full; the binary codec sends their ids along
+        return {'type': 'key', 'seq': self.seq, 'players': players, 'entered': list(players)}
+
+    def delta(self, base_seq, view=None, base_view=None):
+        """Changes since the frame at `base_seq`, which the client was sent with `base_view`.
+
+        Players new to the client are sent in full and players it no
+        longer gets are listed in `removed`.
+        """
+        base = self.history.get(base_seq)
+        if base_view is None:
+            base_view = dict.fromkeys(base, LOD_FULL)
+        current_view = view
+        if current_view is None:
+            current_view = dict.fromkeys(self.snapshot, LOD_FULL)
+
+        players = {}
+        entered = []
+        for player_id, lod in current_view.items():
+            base_lod = base_view.get(player_id)
+            base_record = None if base_lod is None else self.record(base_seq, player_id, base_lod)
+            if base_record is None:
+                players[player_id] = self.record(self.seq, player_id, lod)
+                entered.append(player_id)
+                continue
+            key = (player_id, base_seq, base_lod, lod)
+            changes = self.changes.get(key)
+            if changes is None:
+                changes = self.changes[key] = diff_player(base_record, self.record(self.seq, player_id, lod))
+            if changes:
+                players[player_id] = changes
+        removed = [player_id for player_id in base_view if player_id not in current_view]
+
+        frame = {'type': 'delta', 'seq': self.seq, 'base': base_seq, 'players': players, 'entered': entered}
+        if removed:
+            frame['removed'] = removed
+        return frame
+
+class DeltaEncoder:
+    """Per-client choice of the baseline that state deltas are encoded against.
+
+    Once the client acknowledges a sequence, later frames only carry the
+    fields that changed since that snapshot. A full keyframe goes out when
+    there is no usable baseline, and every `keyframe_interval` ticks
+    regardless. Clients that acked the same sequence get identical frames.
+    """
+
+    def __init__(self, history, keyframe_interval=60):
+        self.history = history
+        self.keyframe_interval = keyframe_interval
+        self.acked_seq = None
+        self.last_keyframe_seq = None
+        # The view (players and their LOD) this client was sent in each frame
+        # it may still use as a baseline; None means everyone at full detail
+        self.views = {}
+        self.view = None
+
+    def ack(self, seq):
+        if seq not in self.history or (self.acked_seq is not None and seq <= self.acked_seq):
+            return
+        self.acked_seq = seq
+        # Later bases are never older than the newest ack
+        for sent_seq in [sent_seq for sent_seq in self.views if sent_seq < seq]:
+            del self.views[sent_seq]
+
+    def next_base(self, seq):
+        """Baseline for the frame at `seq`, or None when a keyframe is due."""
+        if (self.acked_seq is None or not self.history.has_base(self.acked_seq) or
+                self.last_keyframe_seq is None or seq - self.last_keyframe_seq >= self.keyframe_interval):
+            self.last_keyframe_seq = seq
+            return None
+        return self.acked_seq
+
+    def restart(self, seq):
+        """Send a keyframe at `seq` instead of the delta `next_base` chose."""
+        self.last_keyframe_seq = seq
+
+    def record_view(self, seq, view):
+        self.views[seq] = view
+        self.view = view
+        # Bound memory for clients that never ack
+        while len(self.views) > self.history.max_history:
+            del self.views[next(iter(self.views))]
+
+    def encode(self, seq):
+        """Frame for `seq`, which must already be in the history, with everyone at full detail."""
+        builder = FrameBuilder(seq, self.history)
+        base_seq = self.next_base(seq)
+        if base_seq is None:
+            return builder.keyframe()
+        return builder.delta(base_seq)
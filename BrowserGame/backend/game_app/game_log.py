@@ -0,0 +1,64 @@
+# /backend/game_app/game_log.py
+"""Debug logging for the tick loop, one channel per component.
+
+Each channel is a logger under game_app.<component>, off unless listed in
+settings.GAME_DEBUG_LOGS. Call sites pass %-style arguments, which are only
+formatted when a record is emitted, and loops that log per player check
+`ready()` first, so a disabled channel costs one level check per tick.
+Debug records are rate limited per channel: past `max_per_second` they are
+dropped, and the next record emitted says how many were.
+"""
+import logging
+import time
+
+class GameLog:
+    def __init__(self, component, max_per_second=20):
+        self.logger = logging.getLogger(f'game_app.{component}')
+        # None logs every record
+        self.max_per_second = max_per_second
+        self.window_start = 0.0
+        self.emitted = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self):
+        return self.logger.isEnabledFor(logging.DEBUG)
+
+    def ready(self):
+        """Whether a debug record would be emitted now, so a loop can skip building its records."""
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return False
+        if self.max_per_second is None:
+            return True
+        now = time.monotonic()
+        if now - self.window_start >= 1.0:
+            self.window_start = now
+            self.emitted = 0
+        return self.emitted < self.max_per_second
+
+    def debug(self, msg, *args):
+        if not self.ready():
+            if self.enabled:
+                self.dropped += 1
+            return
+        if self.max_per_second is not None:
+            self.emitted += 1
+        if self.dropped:
+            msg = f'{msg} (%d earlier records dropped)'
+            args = (*args, self.dropped)
+            self.dropped = 0
+        self.logger.debug(msg, *args, stacklevel=2)
+
+    def info(self, msg, *args):
+        self.logger.info(msg, *args, stacklevel=2)
+
+    def warning(self, msg, *args):
+        self.logger.warning(msg, *args, stacklevel=2)
+
+
+physics_log = GameLog('physics')
+collision_log = GameLog('collision')
+animation_log = GameLog('animation')
+network_log = GameLog('network')
+
+CHANNELS = {'physics': physics_log, 'collision': collision_log, 'animation': animation_log, 'network': network_log}
@@ -1,165 +1,370 @@
-# game_state.py
-import json
-import asyncio
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync, sync_to_async
-from .models import Map, MapTile
-from .movement_component import MovementComponent
-from .animation_component import AnimationComponent
-from .collision_component import CollisionComponent
-
-class GameState:
-    def __init__(self):
-        self.players = {}
-        self.player_mouse_positions = {}        
-        self.gravity = -37
-        self.update_interval = 1/60
-        self.jump_velocity = 6.5
-        self.base_speed = 30  # pixels per second
-        self.max_speed = 150
-        self.acceleration_rate = 100  # pixels per second^2 
-        self.deceleration_rate = 200      
-        self.physics_task = None
-        self.tile_width = 1
-        self.tile_height = 1
-        self.player_width = 1
-        self.player_height = 2
-        self.map_data = None
-        self.map_id = 7
-        self.collision_buffer = 0.1
-        self.movement_component = MovementComponent(self)
-        self.animation_component = AnimationComponent(self)
-        self.collision_component = CollisionComponent(self)               
-
-    @sync_to_async
-    def _get_map_data(self):
-        try:
-            map_obj = Map.objects.get(id=self.map_id)
-            return {
-                'name': map_obj.name,
-                'width': map_obj.width,
-                'height': map_obj.height,
-                'tiles': list(map_obj.tiles.values('x', 'y', 'color', 'layer'))
-            }
-        except Map.DoesNotExist:
-            print(f"Map with id {self.map_id} not found")
-            return None
-
-    async def load_map_data(self):
-        self.map_data = await self._get_map_data()
-        if self.map_data:
-            print("Map data loaded:")
-            print(f"Map dimensions: {self.map_data['width']}x{self.map_data['height']}")
-            print("Layer 1 tiles:")
-            for tile in self.map_data['tiles']:
-                if tile['layer'] == 1:
-                    print(f"x: {tile['x']}, y: {tile['y']}")
-        else:
-            print(f"Failed to load map data for map_id: {self.map_id}")
-
-    def get_ground_level(self, x):
-        if not self.map_data:
-            return 0
-
-        player_left = x
-        player_right = x + self.player_width
-        
-        highest_ground = 0
-        for tile in self.map_data['tiles']:
-            if tile['layer'] == 1:
-                tile_left = tile['x']
-                tile_right = tile['x'] + self.tile_width
-                tile_top = self.map_data['height'] - tile['y'] - 1
-                if (player_left < tile_right and player_right > tile_left and 
-                    highest_ground + self.collision_buffer <= tile_top):
-                    highest_ground = tile_top - self.tile_height
-
-        print(f"Ground level at x={x}: {highest_ground}")
-        return highest_ground
-
-    async def start_physics_update(self):
-        if not self.physics_task:
-            print("Starting physics update loop")
-            self.physics_task = asyncio.create_task(self._physics_loop())
-
-    async def stop_physics_update(self):
-        if self.physics_task:
-            self.physics_task.cancel()
-            self.physics_task = None
-            print("Shutting down physics update loop")
-
-    async def _physics_loop(self):
-        while True:
-            await self.physics_update()
-            await asyncio.sleep(self.update_interval)
-
-    async def physics_update(self):
-        for player_id, player in self.players.items():
-            old_y = player['y']
-            old_x = player['x']
-            
-            player['vy'] += self.gravity * self.update_interval
-            new_y = player['y'] + player['vy'] * self.update_interval
-            
-            ground_level = self.get_ground_level(player['x'])
-            if new_y <= ground_level + self.player_height:
-                new_y = ground_level + self.player_height
-                player['vy'] = 0
-            
-            player['y'] = new_y
-            
-            if old_y != player['y'] or old_x != player['x']:
-                print(f"Physics update for player {player_id}: old_y={old_y}, new_y={player['y']}, vy={player['vy']}, old_x={old_x}, new_x={player['x']}")
-            
-            running = player.get('speed', self.base_speed) > self.base_speed
-            jumping = player['vy'] != 0
-            crouching = player.get('crouching', False)
-            self.animation_component.update_pivot_points(player, running, jumping, crouching)
-        
-        if self.players:
-            await self.broadcast_state()
-
-    def add_player(self, player_id, x, y):
-        ground_level = self.get_ground_level(x)
-        self.players[player_id] = {
-            'x': float(x),
-            'y': max(float(y), ground_level),
-            'vy': 0,
-            'direction': 'forward',
-            'pivot_points': self.animation_component.get_idle_frame('forward', False),
-            'crouching': False
-        }
-        self.animation_component.set_player_animation_state(player_id, 'IDLE')
-        print(f"Player added: id={player_id}, x={x}, y={self.players[player_id]['y']}")
-
-    def remove_player(self, player_id):
-        if player_id in self.players:
-            del self.players[player_id]
-            print(f"Player removed: id={player_id}")
-
-    def get_state(self):
-        return {player_id: {
-            'x': player['x'],
-            'y': player['y'],
-            'pivot_points': player['pivot_points'],
-            'speed': player.get('speed', self.base_speed),
-            'angle': player.get('angle', 0),
-            'direction': player.get('direction', 'forward'),
-            'crouching': player.get('crouching', False),
-            'mouse_position': self.player_mouse_positions.get(player_id, {'x': 0, 'y': 0})
-        } for player_id, player in self.players.items()}
-
-    async def broadcast_state(self):
-        state = self.get_state()
-        # print(f"Broadcasting state: {state}")
-        channel_layer = get_channel_layer()
-        await channel_layer.group_send(
-            'game',
-            {
-                'type': 'game.state',
-                'state': json.dumps(state)
-            }
-        )
-        # print("State broadcast complete")
-
-game_state = GameState()
\ No newline at end of file
+# game_state.py
+import json
+import asyncio
+import logging
+import numpy as np
+from django.conf import settings
+from channels.layers import get_channel_layer
+from asgiref.sync import async_to_sync, sync_to_async
+from .models import Map
+from .movement_component import MovementComponent, MOVEMENT_PARAMS
+from .animation_component import AnimationComponent, POSE_REPLICATION_SKELETON
+from .pose_evaluator import idle_layer, single
+from .collision_component import CollisionComponent
+from .tile_index import TileIndex
+from .map_grid import MapGrid
+from .map_chunks import CHUNK_SIZE
+from .map_edits import load_map_chunks
+from .tick_scheduler import TickScheduler
+from .tick_profiler import TickProfiler
+from .delta_encoder import quantize_columns, FLAG_BACKWARD, FLAG_CROUCHING, FLAG_RUNNING, FLAG_JUMPING
+from .input_queue import InputQueue
+from .broadcaster import StateBroadcaster
+from .interest import InterestManager
+from .player_store import PlayerStore
+from .game_log import physics_log, collision_log, network_log
+
+logger = logging.getLogger(__name__)
+
+# Map served by /initialize/ and the websocket route without a map id
+DEFAULT_MAP_ID = 7
+# A failed map reload is retried this many times, this many seconds apart
+MAP_RELOAD_RETRIES = 3
+MAP_RELOAD_RETRY_DELAY = 1.0
+
+class GameState:
+    def __init__(self, map_id=DEFAULT_MAP_ID):
+        self.player_mouse_positions = {}        
+        self.input_queues = {}
+        self.max_input_rate = 120  # messages per second per connection
+        self.input_burst = 30
+        self.gravity = -37
+        self.update_interval = MOVEMENT_PARAMS['update_interval']
+        self.tick_policy = TickScheduler.CATCH_UP
+        self.max_catch_up_ticks = 5
+        self.jump_velocity = 6.5
+        self.base_speed = MOVEMENT_PARAMS['base_speed']  # pixels per second
+        self.max_speed = MOVEMENT_PARAMS['max_speed']
+        self.acceleration_rate = MOVEMENT_PARAMS['acceleration_rate']  # pixels per second^2
+        self.deceleration_rate = MOVEMENT_PARAMS['deceleration_rate']
+        self.tile_pixels = MOVEMENT_PARAMS['tile_pixels']
+        self.players = PlayerStore(default_speed=self.base_speed)
+        self.physics_task = None
+        self.tick_scheduler = None
+        self.tile_width = 1
+        self.tile_height = 1
+        self.player_width = MOVEMENT_PARAMS['player_width']
+        self.player_height = MOVEMENT_PARAMS['player_height']
+        self.map_data = None
+        self.tile_index = None
+        # Chunks to re-read after an edit to the stored map; None means all of it
+        self.pending_map_chunks = set()
+        self.requested_map_version = 0
+        self.map_reload_task = None
+        # Past this many changed chunks clients are told to re-fetch them instead
+        self.max_pushed_chunks = 16
+        self.map_id = map_id
+        self.group_name = f'game_{map_id}'
+        self.collision_buffer = 0.1
+        self.keyframe_interval = 60
+        self.state_seq = 0
+        self.latest_snapshot = (0, {})
+        self.profiler = TickProfiler(settings.GAME_METRICS)
+        self.broadcaster = StateBroadcaster(interest=InterestManager(), profiler=self.profiler)
+        self.movement_component = MovementComponent(self)
+        self.animation_component = AnimationComponent(self)
+        self.animation_component.bake_poses = settings.GAME_POSE_REPLICATION == POSE_REPLICATION_SKELETON
+        self.collision_component = CollisionComponent(self)               
+        if self.profiler.enabled:
+            self.instrument()
+
+    def instrument(self):
+        """Time the phases of the tick for /metrics by routing them through the profiler."""
+        profiler = self.profiler
+        self.physics_update = profiler.tick(self.physics_update)
+        self.apply_inputs = profiler.timed('inputs', self.apply_inputs)
+        self.get_snapshot = profiler.timed('snapshot', self.get_snapshot)
+        collision, animation = self.collision_component, self.animation_component
+        collision.check_collision = profiler.timed('collision', collision.check_collision)
+        animation.update_pivot_points = profiler.timed('animation', animation.update_pivot_points)
+
+    @sync_to_async
+    def _get_map_data(self):
+        try:
+            map_obj = Map.objects.get(id=self.map_id)
+            return MapGrid.from_map(map_obj)
+        except Map.DoesNotExist:
+            logger.warning(f"Map with id {self.map_id} not found")
+            return None
+
+    def set_map_data(self, map_data):
+        self.map_data = map_data
+        self.tile_index = TileIndex.from_grid(map_data, self.tile_width, self.tile_height) if map_data else None
+
+    async def load_map_data(self):
+        self.set_map_data(await self._get_map_data())
+        if self.map_data:
+            logger.info(f"Loaded map {self.map_id}: {self.map_data.width}x{self.map_data.height}, "
+                        f"{np.count_nonzero(self.tile_index.occupancy)} solid tiles")
+        else:
+            logger.warning(f"Failed to load map data for map_id: {self.map_id}")
+
+    def get_ground_level(self, x):
+        if not self.map_data:
+            return 0
+
+        # Tiles only count as ground once their top clears the collision buffer
+        highest_top = self.tile_index.highest_top(x, x + self.player_width)
+        if highest_top >= self.collision_buffer:
+            highest_ground = highest_top - self.tile_height
+        else:
+            highest_ground = 0
+
+        collision_log.debug("Ground level at x=%s: %s", x, highest_ground)
+        return highest_ground
+
+    def get_ground_levels(self, xs):
+        """`get_ground_level` for an array of x positions."""
+        if not self.map_data:
+            return np.zeros(len(xs))
+        highest_tops = self.tile_index.highest_tops(xs, xs + self.player_width)
+        return np.where(highest_tops >= self.collision_buffer, highest_tops - self.tile_height, 0.0)
+
+    async def start_physics_update(self):
+        if not self.physics_task:
+            logger.info(f"Starting physics update loop for map {self.map_id}")
+            self.physics_task = asyncio.create_task(self._physics_loop())
+
+    async def stop_physics_update(self):
+        if self.physics_task:
+            self.physics_task.cancel()
+            self.physics_task = None
+            logger.info(f"Shutting down physics update loop for map {self.map_id}")
+        if self.map_reload_task:
+            self.map_reload_task.cancel()
+            self.map_reload_task = None
+
+    def map_changed(self, version, chunks):
+        """Reload the part of the map an edit changed, in the background.
+
+        `chunks` holds (layer, cx, cy) keys, or is None to reload the whole
+        map. Every connection of the room passes the same notice on, so
+        versions already loaded or requested are ignored. Ticks keep running
+        while the chunks load; they are swapped in between two ticks.
+        """
+        loaded_version = self.map_data.version if self.map_data else 0
+        if version <= max(loaded_version, self.requested_map_version):
+            return
+        self.requested_map_version = version
+        self._add_pending_map_chunks(chunks)
+        if self.map_reload_task is None or self.map_reload_task.done():
+            self.map_reload_task = asyncio.create_task(self._reload_map())
+
+    def _add_pending_map_chunks(self, chunks):
+        if chunks is None or self.pending_map_chunks is None:
+            self.pending_map_chunks = None
+        else:
+            self.pending_map_chunks.update(tuple(key) for key in chunks)
+
+    async def _reload_map(self):
+        # Loads run one after another, so a later edit's chunks are never overwritten by an earlier read
+        failures = 0
+        while self.pending_map_chunks is None or self.pending_map_chunks:
+            chunks, self.pending_map_chunks = self.pending_map_chunks, set()
+            try:
+                if chunks is None or self.map_data is None:
+                    map_data = await self._get_map_data()
+                    if map_data is None:
+                        continue
+                    self.set_map_data(map_data)
+                    update = {'type': 'map', 'version': map_data.version, 'width': map_data.width,
+                              'height': map_data.height, 'stale': None}
+                else:
+                    version, loaded = await sync_to_async(load_map_chunks)(self.map_id, chunks)
+                    update = self.apply_map_chunks(version, loaded)
+            except Map.DoesNotExist:
+                logger.warning(f"Map with id {self.map_id} no longer exists")
+                return
+            except Exception as e:
+                # The chunks stay pending, merged with any edited since
+                self._add_pending_map_chunks(chunks)
+                failures += 1
+                if failures > MAP_RELOAD_RETRIES:
+                    logger.warning(f"Failed to reload map {self.map_id}: {e!r}; retrying on the next change")
+                    # Lets the next notice through, even a repeat of one already requested
+                    self.requested_map_version = self.map_data.version if self.map_data else 0
+                    return
+                logger.warning(f"Failed to reload map {self.map_id}: {e!r}; retrying")
+                await asyncio.sleep(MAP_RELOAD_RETRY_DELAY)
+                continue
+            failures = 0
+            logger.info(f"Reloaded map {self.map_id} at version {update['version']}")
+            await self.broadcaster.send_map_update(update)
+
+    def apply_map_chunks(self, version, chunks):
+        """Swap reloaded chunks into the map and rebuild collision for their columns.
+
+        `chunks` maps (layer, cx, cy) to a MapChunk blob, or None for a
+        chunk that is now empty. Returns the map update for clients: the
+        changed chunks themselves, or only their keys past
+        `max_pushed_chunks`.
+        """
+        map_data = self.map_data
+        for (layer, cx, cy), data in chunks.items():
+            map_data.set_chunk(layer, cx, cy, data)
+        map_data.version = max(map_data.version, version)
+
+        solid = map_data.layer(self.tile_index.layer)
+        if solid is not None:
+            for cx in sorted({cx for layer, cx, _ in chunks if layer == self.tile_index.layer}):
+                self.tile_index.update_columns(solid, cx * CHUNK_SIZE, (cx + 1) * CHUNK_SIZE - 1)
+
+        keys = sorted({(cx, cy) for _, cx, cy in chunks})
+        update = {'type': 'map', 'version': map_data.version}
+        if len(keys) <= self.max_pushed_chunks:
+            update['chunks'] = [map_data.chunk_payload(cx, cy) for cx, cy in keys]
+        else:
+            update['stale'] = [list(key) for key in keys]
+        return update
+
+    async def _physics_loop(self):
+        self.tick_scheduler = TickScheduler(self.physics_update, self.update_interval,
+                                            self.tick_policy, self.max_catch_up_ticks)
+        await self.tick_scheduler.run()
+
+    def get_tick_metrics(self):
+        if not self.tick_scheduler:
+            return None
+        return self.tick_scheduler.metrics.snapshot()
+
+    def queue_input(self, player_id, data):
+        input_queue = self.input_queues.get(player_id)
+        if input_queue is None:
+            return False
+        return input_queue.push(data)
+
+    def apply_inputs(self):
+        """Apply every connection's queued inputs; returns the most any one of them had."""
+        deepest = 0
+        for player_id, input_queue in self.input_queues.items():
+            inputs = input_queue.drain()
+            if inputs:
+                deepest = max(deepest, len(inputs))
+                self.movement_component.apply_inputs(player_id, inputs)
+        return deepest
+
+    async def physics_update(self):
+        self.profiler.record('input_queue_depth', self.apply_inputs())
+
+        players = self.players
+        slots = players.active_slots
+        if len(slots):
+            # Gravity, integration and ground clamp for every player at once
+            old_y = players.y[slots]
+            vy = players.vy[slots] + self.gravity * self.update_interval
+            new_y = old_y + vy * self.update_interval
+            floor = self.get_ground_levels(players.x[slots]) + self.player_height
+            landed = new_y <= floor
+            players.y[slots] = np.where(landed, floor, new_y)
+            players.vy[slots] = np.where(landed, 0.0, vy)
+
+            if physics_log.ready():
+                for i in np.flatnonzero(players.y[slots] != old_y).tolist():
+                    slot = slots[i]
+                    physics_log.debug("Physics update for player %s: old_y=%s, new_y=%s, vy=%s, x=%s",
+                                      players.slot_ids[slot], old_y[i], players.y[slot], players.vy[slot], players.x[slot])
+
+            running = (players.speed[slots] > self.base_speed).tolist()
+            jumping = (players.vy[slots] != 0).tolist()
+            crouching = (players.flags[slots] & FLAG_CROUCHING != 0).tolist()
+            for slot, is_running, is_jumping, is_crouching in zip(slots.tolist(), running, jumping, crouching):
+                self.animation_component.update_pivot_points(players.views[slot], is_running, is_jumping, is_crouching)
+        
+        if self.players:
+            await self.broadcast_state()
+
+    def spawn_player(self, player_id):
+        # New players drop in from the top of the map at its left edge
+        initial_y = self.map_data.height if self.map_data else 0
+        self.add_player(player_id, 0, initial_y)
+
+    def add_player(self, player_id, x, y):
+        ground_level = self.get_ground_level(x)
+        self.players.add(player_id, float(x), max(float(y), ground_level),
+                         direction='forward', crouching=False,
+                         pivot_points=self.animation_component.get_idle_frame('forward', False),
+                         anim=single(idle_layer(False, False)), input_seq=0)
+        self.input_queues[player_id] = InputQueue(self.max_input_rate, self.input_burst)
+        self.animation_component.set_player_animation_state(player_id, 'IDLE')
+        network_log.debug("Player added: id=%s, x=%s, y=%s", player_id, x, self.players[player_id]['y'])
+
+    def remove_player(self, player_id):
+        if player_id in self.players:
+            del self.players[player_id]
+            self.input_queues.pop(player_id, None)
+            self.animation_component.remove_player(player_id)
+            self.movement_component.remove_player(player_id)
+            network_log.debug("Player removed: id=%s", player_id)
+
+    def get_state(self):
+        players = self.players
+        slots = players.active_slots
+        speeds = players.speed[slots]
+        flags = players.flags[slots]
+        columns = zip(
+            slots.tolist(),
+            players.x[slots].tolist(),
+            players.y[slots].tolist(),
+            speeds.tolist(),
+            players.angle[slots].tolist(),
+            (flags & FLAG_BACKWARD != 0).tolist(),
+            (flags & FLAG_CROUCHING != 0).tolist(),
+            (speeds > self.base_speed).tolist(),
+            (players.vy[slots] != 0).tolist(),
+        )
+        state = {}
+        for slot, x, y, speed, angle, backward, crouching, running, jumping in columns:
+            player_id = players.slot_ids[slot]
+            state[player_id] = {
+                'x': x,
+                'y': y,
+                'pivot_points': players.views[slot].fields['pivot_points'],
+                'anim': players.views[slot].fields['anim'],
+                'speed': speed,
+                'angle': angle,
+                'direction': 'backward' if backward else 'forward',
+                'crouching': crouching,
+                'running': running,
+                'jumping': jumping,
+                'mouse_position': self.player_mouse_positions.get(player_id, {'x': 0, 'y': 0}),
+                'input_seq': players.views[slot].fields['input_seq']
+            }
+        return state
+
+    def get_snapshot(self):
+        """Quantized `get_state`, built straight from the player arrays."""
+        players = self.players
+        slots = players.active_slots
+        flags = (players.flags[slots]
+                 | np.where(players.speed[slots] > self.base_speed, FLAG_RUNNING, 0)
+                 | np.where(players.vy[slots] != 0, FLAG_JUMPING, 0))
+        slot_list = slots.tolist()
+        player_ids = [players.slot_ids[slot] for slot in slot_list]
+        pivot_points = None
+        if self.animation_component.bake_poses:
+            if slot_list:
+                pivot_points = np.stack([players.views[slot].fields['pivot_points'] for slot in slot_list])
+            else:
+                pivot_points = np.zeros((0, 0, 2))
+        default_mouse_position = {'x': 0, 'y': 0}
+        mouse_positions = [self.player_mouse_positions.get(player_id, default_mouse_position) for player_id in player_ids]
+        anims = [players.views[slot].fields['anim'] for slot in slot_list]
+        input_seqs = [players.views[slot].fields['input_seq'] for slot in slot_list]
+        return quantize_columns(player_ids, players.x[slots], players.y[slots], players.speed[slots],
+                                players.angle[slots], flags, mouse_positions, anims, input_seqs, pivot_points)
+
+    async def broadcast_state(self):
+        self.state_seq += 1
+        self.latest_snapshot = (self.state_seq, self.get_snapshot())
+        await self.broadcaster.broadcast(*self.latest_snapshot)
+        network_log.debug("Broadcast state %d of map %d to %d players", self.state_seq, self.map_id, len(self.players))
\ No newline at end of file
@@ -0,0 +1,81 @@
+# /backend/game_app/input_queue.py
+import time
+from collections import deque
+
+class InputQueue:
+    """Inputs from one connection, held until the next physics tick.
+
+    A token bucket bounds how many messages per second are accepted, and
+    messages over the budget are dropped: a mouse position is superseded by
+    the next one, and the client finds out about a lost movement step when a
+    later one is acknowledged. Only a jump or a change of crouch state
+    cannot be made up for later, so those are let through without a token.
+    At most `max_pending` messages wait for a tick; past that the oldest
+    other message makes room, or the oldest of all if every one is a jump
+    or a crouch change.
+
+    Each movement step moves the player one tick's worth, so `drain`, which
+    runs once per tick, also hands out at most one step per tick, plus up to
+    `max_steps` saved from ticks that had none, for steps that arrive
+    bunched up. Steps past that lose their movement but keep their sequence
+    number, so they are still acknowledged.
+    """
+
+    def __init__(self, max_rate=120, burst=30, max_pending=64, max_steps=4):
+        self.max_rate = max_rate
+        self.burst = burst
+        # (message, whether it is a jump or crouch change), oldest first
+        self.pending = deque()
+        self.max_pending = max_pending
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.crouching = False
+        self.dropped = 0
+        self.max_steps = max_steps
+        self.steps = max_steps
+
+    def _take_token(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.max_rate)
+        self.last_refill = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def _is_transition(self, data):
+        return data.get('jump') is True or data.get('crouching', self.crouching) != self.crouching
+
+    def push(self, data):
+        transition = self._is_transition(data)
+        if not self._take_token() and not transition:
+            self.dropped += 1
+            return False
+        if 'crouching' in data:
+            self.crouching = data['crouching']
+        if len(self.pending) >= self.max_pending:
+            self._drop_oldest()
+        self.pending.append((data, transition))
+        return True
+
+    def _drop_oldest(self):
+        for i, (_, transition) in enumerate(self.pending):
+            if not transition:
+                del self.pending[i]
+                break
+        else:
+            self.pending.popleft()
+        self.dropped += 1
+
+    def drain(self):
+        inputs = [data for data, _ in self.pending]
+        self.pending.clear()
+        self.steps = min(self.max_steps, self.steps + 1)
+        for data in inputs:
+            if 'move' in data:
+                if self.steps >= 1:
+                    self.steps -= 1
+                else:
+                    del data['move']
+                    self.dropped += 1
+        return inputs
@@ -0,0 +1,104 @@
+# /backend/game_app/interest.py
+from .delta_encoder import POSITION_SCALE, LOD_FULL, LOD_CLIP, LOD_POSITION
+
+class SpatialHash:
+    """Players bucketed into square cells by position, rebuilt every tick.
+
+    Buckets hold `(player_id, x, y)` so queries need no further lookups.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    @classmethod
+    def from_snapshot(cls, snapshot, cell_size):
+        """Hash a quantized snapshot; positions stay in its fixed-point units."""
+        spatial_hash = cls(cell_size * POSITION_SCALE)
+        size = spatial_hash.cell_size
+        cells = spatial_hash.cells
+        for player_id, player in snapshot.items():
+            x, y = player['x'], player['y']
+            cell = (x // size, y // size)
+            bucket = cells.get(cell)
+            if bucket is None:
+                cells[cell] = [(player_id, x, y)]
+            else:
+                bucket.append((player_id, x, y))
+        return spatial_hash
+
+    def query(self, x, y, half_width, half_height):
+        """Entries in every cell the box around (x, y) touches; callers filter by exact distance."""
+        size = self.cell_size
+        found = []
+        for cell_x in range(int((x - half_width) // size), int((x + half_width) // size) + 1):
+            for cell_y in range(int((y - half_height) // size), int((y + half_height) // size) + 1):
+                bucket = self.cells.get((cell_x, cell_y))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+class InterestManager:
+    """Decides which players each client is sent, and at what level of detail.
+
+    A client sees the players inside a box centred on its own player, sized
+    to cover the largest zoomed-out view. Inside it, nested boxes pick the
+    LOD: full skeletons within `lod_radii[0]`, animation clips within
+    `lod_radii[1]` and positions only beyond that.
+
+    Every boundary has hysteresis: a player crosses inward at the box edge
+    but only back outward beyond it plus a margin (`margin` for the view,
+    `lod_margin` for LODs), so someone walking along an edge does not
+    flicker in and out or keep switching detail every tick.
+    """
+
+    def __init__(self, radius=(48, 32), margin=8, lod_radii=((16, 12), (32, 24)), lod_margin=2, cell_size=32):
+        self.radius = radius
+        self.margin = margin
+        self.lod_radii = lod_radii
+        self.lod_margin = lod_margin
+        self.cell_size = cell_size
+        self.spatial_hash = None
+        # (lod, half width, half height, margin) from the innermost box out, in quantized units
+        self.boxes = [(lod, rx * POSITION_SCALE, ry * POSITION_SCALE, lod_margin * POSITION_SCALE)
+                      for lod, (rx, ry) in zip((LOD_FULL, LOD_CLIP), lod_radii)]
+        self.boxes.append((LOD_POSITION, radius[0] * POSITION_SCALE, radius[1] * POSITION_SCALE,
+                           margin * POSITION_SCALE))
+
+    def update(self, snapshot):
+        self.spatial_hash = SpatialHash.from_snapshot(snapshot, self.cell_size)
+
+    def view(self, viewer_id, snapshot, previous=None):
+        """{player_id: lod} for the players the viewer gets this tick, itself included at full detail.
+
+        `previous` is the view it got last tick. Returns None when the
+        viewer has no player in the room (a spectator), meaning everyone
+        at full detail.
+        """
+        viewer = snapshot.get(viewer_id)
+        if viewer is None:
+            return None
+        if previous is None:
+            previous = {}
+
+        x, y = viewer['x'], viewer['y']
+        _, outer_x, outer_y, outer_margin = self.boxes[-1]
+        outer_x += outer_margin
+        outer_y += outer_margin
+        view = {}
+        for player_id, player_x, player_y in self.spatial_hash.query(x, y, outer_x, outer_y):
+            dx = abs(player_x - x)
+            dy = abs(player_y - y)
+            if dx > outer_x or dy > outer_y:
+                continue
+            previous_lod = previous.get(player_id)
+            for lod, half_width, half_height, margin in self.boxes:
+                # Players already at this detail or closer keep it until past the margin
+                if previous_lod is not None and previous_lod <= lod:
+                    half_width += margin
+                    half_height += margin
+                if dx <= half_width and dy <= half_height:
+                    view[player_id] = lod
+                    break
+        view[viewer_id] = LOD_FULL
+        return view
@@ -0,0 +1,71 @@
+# /backend/game_app/map_cache.py
+import gzip
+import hashlib
+import json
+import logging
+from .models import Map
+from .map_grid import MapGrid
+
+try:
+    import brotli
+except ImportError:  # Optional; without it clients get gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+class MapPayload:
+    """A map serialized once, with precompressed copies of the body.
+
+    `encodings` maps a Content-Encoding ('identity', 'gzip' and, when the
+    brotli package is installed, 'br') to the body in that encoding. All
+    of them share one weak ETag since they decode to the same JSON.
+    """
+
+    def __init__(self, map_id, version, body):
+        self.map_id = map_id
+        self.version = version
+        self.etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+        # mtime=0 so the same map always compresses to the same bytes
+        self.encodings = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.encodings['br'] = brotli.compress(body, quality=11)
+
+    @classmethod
+    def from_map(cls, map_obj):
+        payload = MapGrid.from_map(map_obj).to_payload()
+        body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return cls(map_obj.id, map_obj.version, body)
+
+class MapPayloadCache:
+    """Serialized map payloads by map id.
+
+    Serializing a map means loading every tile, so it is done once per
+    `Map.version`. A lookup costs a single query for the version, which
+    also picks up saves made by other processes; saves invalidate their
+    own process's entry directly.
+    """
+
+    def __init__(self):
+        self.payloads = {}
+
+    def get(self, map_id):
+        """The current MapPayload for `map_id`, or None if there is no such map."""
+        version = Map.objects.filter(id=map_id).values_list('version', flat=True).first()
+        if version is None:
+            self.payloads.pop(map_id, None)
+            return None
+        payload = self.payloads.get(map_id)
+        if payload is None or payload.version != version:
+            try:
+                map_obj = Map.objects.get(id=map_id)
+            except Map.DoesNotExist:
+                return None
+            payload = self.payloads[map_id] = MapPayload.from_map(map_obj)
+            logger.info(f"Cached map {map_id}: {len(payload.encodings['identity'])} bytes, "
+                        f"{len(payload.encodings['gzip'])} gzipped")
+        return payload
+
+    def invalidate(self, map_id):
+        self.payloads.pop(map_id, None)
+
+map_payload_cache = MapPayloadCache()
@@ -0,0 +1,91 @@
+# /backend/game_app/map_chunks.py
+import struct
+import zlib
+import numpy as np
+
+# Maps are stored as CHUNK_SIZE x CHUNK_SIZE regions, one packed blob per layer
+CHUNK_SIZE = 32
+# Longest tile color a chunk holds; the editor paints '#rrggbb'
+MAX_COLOR_LENGTH = 7
+
+FORMAT_VERSION = 1
+# Format version, chunk size, number of colors
+HEADER = struct.Struct('<BBH')
+
+def chunk_key(x, y):
+    """(cx, cy) of the chunk holding tile (x, y)."""
+    return x // CHUNK_SIZE, y // CHUNK_SIZE
+
+def cell_dtype(colors):
+    return np.dtype('u1') if colors <= np.iinfo(np.uint8).max else np.dtype('<u2')
+
+def pack_chunk(colors, cells):
+    """Pack one layer of one chunk into a blob.
+
+    `cells` is a (CHUNK_SIZE, CHUNK_SIZE) array of indices into
+    `[None, *colors]`, so 0 is an empty cell as in MapGrid. Before
+    compression the blob is the header, each color as a length byte and
+    its UTF-8 bytes, then the cells row by row as uint8 (uint16 for
+    chunks with more than 255 colors).
+    """
+    parts = [HEADER.pack(FORMAT_VERSION, CHUNK_SIZE, len(colors))]
+    for color in colors:
+        encoded = color.encode('utf-8')
+        parts.append(bytes([len(encoded)]) + encoded)
+    parts.append(np.ascontiguousarray(cells, dtype=cell_dtype(len(colors))).tobytes())
+    return zlib.compress(b''.join(parts))
+
+def unpack_chunk(data):
+    """(colors, cells) from a blob written by `pack_chunk`."""
+    raw = zlib.decompress(data)
+    version, size, count = HEADER.unpack_from(raw)
+    if version != FORMAT_VERSION or size != CHUNK_SIZE:
+        raise ValueError(f"Unsupported chunk format {version} with size {size}")
+    offset = HEADER.size
+    colors = []
+    for _ in range(count):
+        length = raw[offset]
+        colors.append(raw[offset + 1:offset + 1 + length].decode('utf-8'))
+        offset += 1 + length
+    cells = np.frombuffer(raw, dtype=cell_dtype(count), count=size * size, offset=offset)
+    return colors, cells.reshape(size, size)
+
+def compact_chunk(palette, cells):
+    """(colors, cells) keeping only the entries of `palette` that `cells` uses.
+
+    `palette` is a MapGrid-style list with None at index 0; the returned
+    cells index `[None, *colors]` instead. Colors are sorted so a chunk
+    packs to the same blob whatever order its map's palette is in.
+    """
+    used = np.unique(cells)
+    used = used[used != 0].tolist()
+    used.sort(key=lambda index: palette[index])
+    remap = np.zeros(len(palette), dtype=cell_dtype(len(used)))
+    remap[used] = np.arange(1, len(used) + 1)
+    return [palette[index] for index in used], remap[cells]
+
+def grid_chunks(grid):
+    """(layer, cx, cy, blob) for every chunk of a MapGrid that has tiles."""
+    for layer, layer_array in sorted(grid.layers.items()):
+        rows, cols = layer_array.shape
+        for cy in range(-(-rows // CHUNK_SIZE)):
+            for cx in range(-(-cols // CHUNK_SIZE)):
+                cells = grid.chunk_cells(layer, cx, cy)
+                if cells.any():
+                    yield (layer, cx, cy, pack_chunk(*compact_chunk(grid.palette, cells)))
+
+def layer_payload(layer, cx, cy, colors, cells):
+    """One layer of a chunk as the frontend draws it: its colors and the
+    filled cells as flat [x, y, color index, ...] in map coordinates."""
+    ys, xs = np.nonzero(cells)
+    tiles = np.empty((len(xs), 3), dtype=np.int64)
+    tiles[:, 0] = xs + cx * CHUNK_SIZE
+    tiles[:, 1] = ys + cy * CHUNK_SIZE
+    tiles[:, 2] = cells[ys, xs].astype(np.int64) - 1
+    return {'layer': layer, 'colors': colors, 'tiles': tiles.ravel().tolist()}
+
+def chunk_payload(cx, cy, layers):
+    """Every layer of a chunk, from (layer, blob) pairs, in the format
+    maps/<id>/chunks/ serves."""
+    return {'cx': cx, 'cy': cy,
+            'layers': [layer_payload(layer, cx, cy, *unpack_chunk(data)) for layer, data in sorted(layers)]}
@@ -0,0 +1,201 @@
+# /backend/game_app/map_edits.py
+import functools
+import logging
+import operator
+from collections import defaultdict
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+from .models import Map, MapChunk
+from .map_chunks import (CHUNK_SIZE, MAX_COLOR_LENGTH, chunk_key, compact_chunk, grid_chunks,
+                         pack_chunk, unpack_chunk)
+
+logger = logging.getLogger(__name__)
+
+# Chunks per INSERT ... ON CONFLICT, per SELECT and per DELETE
+CHUNK_BATCH_SIZE = 500
+
+class MapVersionConflict(Exception):
+    """The edits were made against an older version of the map than the stored one."""
+
+    def __init__(self, map_id, version):
+        super().__init__(f"Map {map_id} is at version {version}")
+        self.version = version
+
+class TileEdits:
+    """Tile changes to one map: cells to paint (added or recoloured) and cells to clear.
+
+    Both are keyed by (layer, x, y). A cell is in at most one of them; a
+    later change to the same cell replaces the earlier one.
+    """
+
+    def __init__(self):
+        self.painted = {}
+        self.cleared = set()
+
+    @classmethod
+    def from_request(cls, layers):
+        """Parse `[{'layer': n, 'set': [{'x', 'y', 'color'}], 'remove': [{'x', 'y'}]}]`.
+
+        Within a layer removals apply before sets. Raises ValueError on
+        malformed input.
+        """
+        edits = cls()
+        if not isinstance(layers, list):
+            raise ValueError("layers must be a list")
+        for layer_edits in layers:
+            layer = cls._coordinate(layer_edits, 'layer')
+            for tile in layer_edits.get('remove', []):
+                edits.clear(layer, cls._coordinate(tile, 'x'), cls._coordinate(tile, 'y'))
+            for tile in layer_edits.get('set', []):
+                color = tile.get('color')
+                if not isinstance(color, str) or len(color) > MAX_COLOR_LENGTH:
+                    raise ValueError(f"Invalid tile color: {color!r}")
+                edits.paint(layer, cls._coordinate(tile, 'x'), cls._coordinate(tile, 'y'), color)
+        return edits
+
+    @staticmethod
+    def _coordinate(item, key):
+        value = item.get(key) if isinstance(item, dict) else None
+        if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+            raise ValueError(f"Invalid {key}: {value!r}")
+        return value
+
+    def paint(self, layer, x, y, color):
+        self.cleared.discard((layer, x, y))
+        self.painted[(layer, x, y)] = color
+
+    def clear(self, layer, x, y):
+        self.painted.pop((layer, x, y), None)
+        self.cleared.add((layer, x, y))
+
+    def __len__(self):
+        return len(self.painted) + len(self.cleared)
+
+    def bounds(self):
+        """(min_x, min_y, max_x, max_y) of the changed cells, or None if nothing changed."""
+        cells = [*self.painted, *self.cleared]
+        if not cells:
+            return None
+        xs = [x for _, x, _ in cells]
+        ys = [y for _, _, y in cells]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    def by_chunk(self):
+        """{(layer, cx, cy): [(x, y, color)]} with color None for cleared cells."""
+        chunks = defaultdict(list)
+        for (layer, x, y), color in self.painted.items():
+            chunks[(layer, *chunk_key(x, y))].append((x, y, color))
+        for layer, x, y in self.cleared:
+            chunks[(layer, *chunk_key(x, y))].append((x, y, None))
+        return chunks
+
+def stored_chunks(map_obj, keys):
+    """The stored chunks of `map_obj` (a Map or its id) among the (layer, cx, cy) `keys`."""
+    return MapChunk.objects.filter(map=map_obj).filter(
+        functools.reduce(operator.or_, (Q(layer=layer, cx=cx, cy=cy) for layer, cx, cy in keys)))
+
+def replace_map_chunks(map_obj, grid):
+    """Make the stored chunks of `map_obj` those of `grid` and return the (layer, cx, cy) that changed.
+
+    Chunks whose blob is unchanged are left alone, so saving a whole map
+    only writes, and only reports, the regions that actually differ.
+    Written chunks take the map's current version.
+    """
+    stored = {(layer, cx, cy): bytes(data) for layer, cx, cy, data in
+              MapChunk.objects.filter(map=map_obj).values_list('layer', 'cx', 'cy', 'data').iterator()}
+    upserts = []
+    for layer, cx, cy, data in grid_chunks(grid):
+        if stored.pop((layer, cx, cy), None) != data:
+            upserts.append(MapChunk(map=map_obj, layer=layer, cx=cx, cy=cy, data=data, version=map_obj.version))
+    MapChunk.objects.bulk_create(upserts, batch_size=CHUNK_BATCH_SIZE, update_conflicts=True,
+                                 unique_fields=['map', 'layer', 'cx', 'cy'], update_fields=['data', 'version'])
+    # Whatever is left in `stored` is no longer in the map
+    emptied = list(stored)
+    for start in range(0, len(emptied), CHUNK_BATCH_SIZE):
+        stored_chunks(map_obj, emptied[start:start + CHUNK_BATCH_SIZE]).delete()
+    return sorted([(chunk.layer, chunk.cx, chunk.cy) for chunk in upserts] + emptied)
+
+def load_map_chunks(map_id, keys):
+    """(version, {(layer, cx, cy): blob or None}) for the given chunks of a map.
+
+    Keys with no stored chunk map to None, meaning the region is empty.
+    The version is read first, so the chunks are at least that new.
+    Raises Map.DoesNotExist for a missing map.
+    """
+    version = Map.objects.filter(id=map_id).values_list('version', flat=True).get()
+    keys = list(keys)
+    chunks = dict.fromkeys(keys)
+    for start in range(0, len(keys), CHUNK_BATCH_SIZE):
+        rows = stored_chunks(map_id, keys[start:start + CHUNK_BATCH_SIZE]).values_list('layer', 'cx', 'cy', 'data')
+        for layer, cx, cy, data in rows:
+            chunks[(layer, cx, cy)] = bytes(data)
+    return version, chunks
+
+def apply_map_edits(map_id, edits, base_version=None):
+    """Apply `edits` to a stored map in one transaction.
+
+    Returns the map's new version and the (layer, cx, cy) of the chunks
+    that changed.
+
+    Only the chunks holding changed cells are read, rewritten and
+    upserted (or deleted once empty), so the cost follows the size of the
+    edit rather than of the map, and readers see either the old map or
+    the new one. When `base_version` is given and the map has moved on
+    since, nothing is written and MapVersionConflict is raised.
+    """
+    with transaction.atomic():
+        map_obj = Map.objects.select_for_update().get(id=map_id)
+        if base_version is not None and base_version != map_obj.version:
+            raise MapVersionConflict(map_id, map_obj.version)
+        version = map_obj.version + 1
+
+        changes = edits.by_chunk()
+        keys = list(changes)
+        stored = {}
+        for start in range(0, len(keys), CHUNK_BATCH_SIZE):
+            for layer, cx, cy, data in stored_chunks(map_obj, keys[start:start + CHUNK_BATCH_SIZE]).values_list(
+                    'layer', 'cx', 'cy', 'data'):
+                stored[(layer, cx, cy)] = data
+
+        upserts = []
+        emptied = []
+        for (layer, cx, cy), cells in changes.items():
+            data = stored.get((layer, cx, cy))
+            if data is None:
+                palette = [None]
+                chunk_cells = np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=np.uint16)
+            else:
+                colors, chunk_cells = unpack_chunk(data)
+                palette = [None, *colors]
+                chunk_cells = chunk_cells.astype(np.uint16)
+            color_indices = {color: index for index, color in enumerate(palette) if index}
+            for x, y, color in cells:
+                if color is None:
+                    index = 0
+                else:
+                    index = color_indices.get(color)
+                    if index is None:
+                        index = color_indices[color] = len(palette)
+                        palette.append(color)
+                chunk_cells[y - cy * CHUNK_SIZE, x - cx * CHUNK_SIZE] = index
+
+            if chunk_cells.any():
+                packed = pack_chunk(*compact_chunk(palette, chunk_cells))
+                # Blobs are canonical, so a chunk painted back to what it was is left alone
+                if data is None or packed != bytes(data):
+                    upserts.append(MapChunk(map=map_obj, layer=layer, cx=cx, cy=cy, version=version, data=packed))
+            elif data is not None:
+                emptied.append((layer, cx, cy))
+
+        MapChunk.objects.bulk_create(upserts, batch_size=CHUNK_BATCH_SIZE, update_conflicts=True,
+                                     unique_fields=['map', 'layer', 'cx', 'cy'], update_fields=['data', 'version'])
+        for start in range(0, len(emptied), CHUNK_BATCH_SIZE):
+            stored_chunks(map_obj, emptied[start:start + CHUNK_BATCH_SIZE]).delete()
+
+        map_obj.version = version
+        map_obj.save(update_fields=['version', 'updated_at'])
+
+    logger.info(f"Map {map_id}: applied {len(edits.painted)} painted and {len(edits.cleared)} cleared tiles "
+                f"across {len(changes)} chunks, now version {map_obj.version}")
+    return map_obj.version, sorted([(chunk.layer, chunk.cx, chunk.cy) for chunk in upserts] + emptied)
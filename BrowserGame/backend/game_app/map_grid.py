@@ -0,0 +1,214 @@
+# /backend/game_app/map_grid.py
+import logging
+import numpy as np
+from .map_chunks import CHUNK_SIZE, compact_chunk, layer_payload, unpack_chunk
+
+logger = logging.getLogger(__name__)
+
+class MapGrid:
+    """Array-backed map: one palette-index array per layer.
+
+    `layers[n][y, x]` holds an index into `palette`; 0 means no tile. This
+    replaces the list of tile dicts the game used to keep resident, and lets
+    consumers pick a layer directly instead of filtering every tile.
+    """
+    EMPTY = 0
+
+    def __init__(self, name, width, height, palette=None, layers=None, version=0):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.palette = palette if palette is not None else [None]
+        self.layers = layers if layers is not None else {}
+        # Map.version the tiles were read at
+        self.version = version
+        self.color_indices = None
+
+    @classmethod
+    def from_map(cls, map_obj):
+        # Chunks are read after the map row, so they are at least as new as its version
+        grid = cls.from_chunks(map_obj.name, map_obj.width, map_obj.height,
+                               map_obj.chunks.values_list('layer', 'cx', 'cy', 'data').iterator())
+        grid.version = map_obj.version
+        return grid
+
+    @classmethod
+    def from_chunks(cls, name, width, height, chunks):
+        """Build a grid from (layer, cx, cy, blob) tuples, as stored in MapChunk."""
+        grid = cls(name, width, height)
+        color_indices = {}
+        unpacked = []
+        for layer, cx, cy, data in chunks:
+            colors, cells = unpack_chunk(data)
+            # Chunk-local color i + 1 becomes grid color remap[i + 1]
+            remap = [cls.EMPTY]
+            for color in colors:
+                index = color_indices.get(color)
+                if index is None:
+                    index = color_indices[color] = len(grid.palette)
+                    grid.palette.append(color)
+                remap.append(index)
+            unpacked.append((layer, cx, cy, remap, cells))
+
+        dtype = grid.index_dtype(len(grid.palette))
+        extents = {}
+        for layer, cx, cy, _, _ in unpacked:
+            rows, cols = extents.get(layer, (0, 0))
+            extents[layer] = (max(rows, (cy + 1) * CHUNK_SIZE), max(cols, (cx + 1) * CHUNK_SIZE))
+        padded = {layer: np.zeros((max(height, rows), max(width, cols)), dtype=dtype)
+                  for layer, (rows, cols) in extents.items()}
+        for layer, cx, cy, remap, cells in unpacked:
+            padded[layer][cy * CHUNK_SIZE:(cy + 1) * CHUNK_SIZE,
+                          cx * CHUNK_SIZE:(cx + 1) * CHUNK_SIZE] = np.asarray(remap, dtype=dtype)[cells]
+
+        # Trim the chunk padding, keeping tiles painted past the declared size as from_tiles does
+        for layer, layer_array in padded.items():
+            filled_rows = np.flatnonzero(layer_array.any(axis=1))
+            filled_cols = np.flatnonzero(layer_array.any(axis=0))
+            rows = max(height, int(filled_rows[-1]) + 1 if len(filled_rows) else 0)
+            cols = max(width, int(filled_cols[-1]) + 1 if len(filled_cols) else 0)
+            grid.layers[layer] = np.ascontiguousarray(layer_array[:rows, :cols])
+        return grid
+
+    @classmethod
+    def from_tiles(cls, name, width, height, tiles):
+        """Build a grid from (x, y, color, layer) tuples."""
+        grid = cls(name, width, height)
+        color_indices = {}
+        columns = {}
+        for x, y, color, layer in tiles:
+            if x < 0 or y < 0:
+                logger.warning(f"Dropping tile outside map '{name}': ({x}, {y}) on layer {layer}")
+                continue
+            index = color_indices.get(color)
+            if index is None:
+                index = color_indices[color] = len(grid.palette)
+                grid.palette.append(color)
+            xs, ys, values = columns.setdefault(layer, ([], [], []))
+            xs.append(x)
+            ys.append(y)
+            values.append(index)
+
+        dtype = grid.index_dtype(len(grid.palette))
+        for layer, (xs, ys, values) in columns.items():
+            xs = np.asarray(xs, dtype=np.int64)
+            ys = np.asarray(ys, dtype=np.int64)
+            # Tiles painted past the declared size still get a cell
+            rows = max(height, int(ys.max()) + 1)
+            cols = max(width, int(xs.max()) + 1)
+            layer_array = np.zeros((rows, cols), dtype=dtype)
+            layer_array[ys, xs] = values
+            grid.layers[layer] = layer_array
+        return grid
+
+    @staticmethod
+    def index_dtype(palette_size):
+        if palette_size <= np.iinfo(np.uint8).max + 1:
+            return np.uint8
+        if palette_size <= np.iinfo(np.uint16).max + 1:
+            return np.uint16
+        raise ValueError(f"Too many distinct tile colors: {palette_size - 1}")
+
+    def layer(self, layer):
+        return self.layers.get(layer)
+
+    def color_index(self, color):
+        """Palette index of `color`, adding it to the palette if it is new."""
+        if self.color_indices is None:
+            self.color_indices = {color: index for index, color in enumerate(self.palette) if index}
+        index = self.color_indices.get(color)
+        if index is None:
+            index = self.color_indices[color] = len(self.palette)
+            self.palette.append(color)
+            dtype = self.index_dtype(len(self.palette))
+            if any(layer_array.dtype != dtype for layer_array in self.layers.values()):
+                self.layers = {layer: layer_array.astype(dtype) for layer, layer_array in self.layers.items()}
+        return index
+
+    def chunk_cells(self, layer, cx, cy):
+        """(CHUNK_SIZE, CHUNK_SIZE) palette indices of one chunk of a layer, padded
+        with empty cells past the layer's edge, or None if the layer is missing."""
+        layer_array = self.layers.get(layer)
+        if layer_array is None:
+            return None
+        block = layer_array[cy * CHUNK_SIZE:(cy + 1) * CHUNK_SIZE, cx * CHUNK_SIZE:(cx + 1) * CHUNK_SIZE]
+        cells = np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=layer_array.dtype)
+        cells[:block.shape[0], :block.shape[1]] = block
+        return cells
+
+    def set_chunk(self, layer, cx, cy, data):
+        """Replace one chunk of a layer with a MapChunk blob, or clear it when `data` is None.
+
+        The layer grows if the chunk has tiles past its edge.
+        """
+        top = cy * CHUNK_SIZE
+        left = cx * CHUNK_SIZE
+        if data is None:
+            layer_array = self.layers.get(layer)
+            if layer_array is not None:
+                layer_array[top:top + CHUNK_SIZE, left:left + CHUNK_SIZE] = self.EMPTY
+            return
+
+        colors, cells = unpack_chunk(data)
+        remap = [self.EMPTY, *(self.color_index(color) for color in colors)]
+        # Looked up after color_index, which may have widened every layer
+        layer_array = self.layers.get(layer)
+        dtype = self.index_dtype(len(self.palette))
+        filled_rows = np.flatnonzero(cells.any(axis=1))
+        filled_cols = np.flatnonzero(cells.any(axis=0))
+        rows = top + int(filled_rows[-1]) + 1 if len(filled_rows) else 0
+        cols = left + int(filled_cols[-1]) + 1 if len(filled_cols) else 0
+        if layer_array is None:
+            layer_array = np.zeros((max(self.height, rows), max(self.width, cols)), dtype=dtype)
+        elif rows > layer_array.shape[0] or cols > layer_array.shape[1]:
+            grown = np.zeros((max(layer_array.shape[0], rows), max(layer_array.shape[1], cols)), dtype=dtype)
+            grown[:layer_array.shape[0], :layer_array.shape[1]] = layer_array
+            layer_array = grown
+        self.layers[layer] = layer_array
+
+        region = layer_array[top:top + CHUNK_SIZE, left:left + CHUNK_SIZE]
+        region[...] = np.asarray(remap, dtype=dtype)[cells][:region.shape[0], :region.shape[1]]
+
+    def chunk_payload(self, cx, cy):
+        """Every layer of a chunk in the format maps/<id>/chunks/ serves."""
+        layers = []
+        for layer in sorted(self.layers):
+            cells = self.chunk_cells(layer, cx, cy)
+            if cells.any():
+                layers.append(layer_payload(layer, cx, cy, *compact_chunk(self.palette, cells)))
+        return {'cx': cx, 'cy': cy, 'layers': layers}
+
+    def occupancy(self, layer):
+        """Boolean (rows, cols) array of filled cells on a layer."""
+        layer_array = self.layers.get(layer)
+        if layer_array is None:
+            return np.zeros((0, 0), dtype=bool)
+        return layer_array != self.EMPTY
+
+    def positions(self, layer):
+        """(x, y) pairs of the filled cells on a layer."""
+        ys, xs = np.nonzero(self.occupancy(layer))
+        return list(zip(xs.tolist(), ys.tolist()))
+
+    def tiles(self):
+        """Tile dicts in the format the frontend renders, layer by layer."""
+        tiles = []
+        for layer in sorted(self.layers):
+            layer_array = self.layers[layer]
+            ys, xs = np.nonzero(layer_array)
+            colors = layer_array[ys, xs]
+            tiles.extend({'x': x, 'y': y, 'color': self.palette[c], 'layer': layer}
+                         for x, y, c in zip(xs.tolist(), ys.tolist(), colors.tolist()))
+        return tiles
+
+    def to_payload(self):
+        return {
+            'name': self.name,
+            'width': self.width,
+            'height': self.height,
+            'tiles': self.tiles()
+        }
+
+    @property
+    def nbytes(self):
+        return sum(layer_array.nbytes for layer_array in self.layers.values())
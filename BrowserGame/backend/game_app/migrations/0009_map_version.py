@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_app', '0008_map_remove_player_world_maptile_delete_chunk_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='map',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,107 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:19
+
+import struct
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The chunk format as of this migration, frozen here so that later changes to
+# game_app.map_chunks do not change what it writes. Blobs are format 1: a
+# '<BBH' header (format, chunk size, number of colors), each color as a
+# length byte and its UTF-8 bytes, then the cells row by row as indices into
+# [None, *colors], uint8 (uint16 past 255 colors), all zlib-compressed.
+CHUNK_SIZE = 32
+CHUNK_HEADER = struct.Struct('<BBH')
+
+
+def pack_chunk(cells):
+    """Blob for one chunk of a layer, from {(row, col): color}."""
+    colors = sorted(set(cells.values()))
+    indices = {color: i + 1 for i, color in enumerate(colors)}
+    values = [0] * (CHUNK_SIZE * CHUNK_SIZE)
+    for (row, col), color in cells.items():
+        values[row * CHUNK_SIZE + col] = indices[color]
+    parts = [CHUNK_HEADER.pack(1, CHUNK_SIZE, len(colors))]
+    for color in colors:
+        encoded = color.encode('utf-8')
+        parts.append(bytes([len(encoded)]) + encoded)
+    parts.append(struct.pack(f"<{len(values)}{'B' if len(colors) <= 255 else 'H'}", *values))
+    return zlib.compress(b''.join(parts))
+
+
+def unpack_chunk(data):
+    """{(row, col): color} from a blob written by pack_chunk."""
+    raw = zlib.decompress(data)
+    version, size, count = CHUNK_HEADER.unpack_from(raw)
+    if version != 1 or size != CHUNK_SIZE:
+        raise ValueError(f"Unsupported chunk format {version} with size {size}")
+    offset = CHUNK_HEADER.size
+    colors = [None]
+    for _ in range(count):
+        length = raw[offset]
+        colors.append(raw[offset + 1:offset + 1 + length].decode('utf-8'))
+        offset += 1 + length
+    values = struct.unpack_from(f"<{size * size}{'B' if count <= 255 else 'H'}", raw, offset)
+    return {divmod(i, size): colors[value] for i, value in enumerate(values) if value}
+
+
+def tiles_to_chunks(apps, schema_editor):
+    Map = apps.get_model('game_app', 'Map')
+    MapTile = apps.get_model('game_app', 'MapTile')
+    MapChunk = apps.get_model('game_app', 'MapChunk')
+    for map_obj in Map.objects.all():
+        chunks = {}
+        for x, y, color, layer in MapTile.objects.filter(map=map_obj).values_list('x', 'y', 'color', 'layer').iterator():
+            # MapTile is deleted below, so a tile chunks cannot hold would be lost
+            if x < 0 or y < 0:
+                raise ValueError(f"Map '{map_obj.name}' has a tile at ({x}, {y}) on layer {layer}, "
+                                 f"outside the chunk grid; move or delete it before migrating")
+            cells = chunks.setdefault((layer, x // CHUNK_SIZE, y // CHUNK_SIZE), {})
+            cells[(y % CHUNK_SIZE, x % CHUNK_SIZE)] = color
+        MapChunk.objects.bulk_create(
+            [MapChunk(map=map_obj, layer=layer, cx=cx, cy=cy, data=pack_chunk(cells), version=map_obj.version)
+             for (layer, cx, cy), cells in sorted(chunks.items())],
+            batch_size=500)
+
+
+def chunks_to_tiles(apps, schema_editor):
+    Map = apps.get_model('game_app', 'Map')
+    MapTile = apps.get_model('game_app', 'MapTile')
+    MapChunk = apps.get_model('game_app', 'MapChunk')
+    for map_obj in Map.objects.all():
+        tiles = []
+        for layer, cx, cy, data in MapChunk.objects.filter(map=map_obj).values_list('layer', 'cx', 'cy', 'data').iterator():
+            for (row, col), color in unpack_chunk(bytes(data)).items():
+                tiles.append(MapTile(map=map_obj, x=cx * CHUNK_SIZE + col, y=cy * CHUNK_SIZE + row,
+                                     color=color, layer=layer))
+        MapTile.objects.bulk_create(tiles, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('game_app', '0009_map_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MapChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('layer', models.IntegerField()),
+                ('cx', models.IntegerField()),
+                ('cy', models.IntegerField()),
+                ('data', models.BinaryField()),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('map', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='game_app.map')),
+            ],
+            options={
+                'unique_together': {('map', 'layer', 'cx', 'cy')},
+            },
+        ),
+        migrations.RunPython(tiles_to_chunks, chunks_to_tiles),
+        migrations.DeleteModel(
+            name='MapTile',
+        ),
+    ]
@@ -1,150 +1,193 @@
-# /backend/game_app/movement_component.py
-import math
-import time
-
-class MovementComponent:
-    def __init__(self, game_state):
-        self.game_state = game_state
-        self.player_speeds = {}
-        self.player_directions = {}
-        self.player_angles = {}
-        self.max_tilt_angle = 7  # Maximum tilt angle in degrees
-        self.tilt_speed = 180  # Degrees per second
-        self.min_speed_for_tilt = 1  # Minimum speed to start tilting
-        self.player_jumping_states = {}  # Track jumping state for each player
-        self.player_jump_start_times = {}  # Track jump start time for each player
-        self.jump_duration = 0.4  # Total duration of jump animation in seconds
-        self.player_crouching_states = {}  # Track crouching state for each player
-
-    def update_player_position(self, player_id, x, y, running, crouching):
-        if player_id in self.game_state.players:
-            player = self.game_state.players[player_id]
-            
-            current_speed = self.player_speeds.get(player_id, self.game_state.base_speed)
-            current_direction = self.player_directions.get(player_id, 0)
-            current_angle = self.player_angles.get(player_id, 0)
-            
-            direction_changed = False
-            if x is not None:
-                new_direction = 1 if x > player['x'] else -1 if x < player['x'] else 0
-                if current_direction != 0 and new_direction != current_direction:
-                    direction_changed = True
-                self.player_directions[player_id] = new_direction
-            else:
-                new_direction = 0
-
-            if direction_changed:
-                # Bring the player to a complete stop when changing direction
-                new_speed = 0
-            elif crouching:
-                # Set speed to base speed when crouching
-                new_speed = self.game_state.base_speed
-            elif running and new_direction != 0:
-                new_speed = min(current_speed + self.game_state.acceleration_rate * self.game_state.update_interval, 
-                                self.game_state.max_speed)
-            else:
-                new_speed = max(self.game_state.base_speed, 
-                                current_speed - self.game_state.deceleration_rate * self.game_state.update_interval)
-            
-            self.player_speeds[player_id] = new_speed
-
-            # Calculate new angle based on speed and direction
-            if abs(new_speed - self.game_state.base_speed) > self.min_speed_for_tilt and new_direction != 0:
-                target_angle = new_direction * self.max_tilt_angle * (new_speed - self.game_state.base_speed) / (self.game_state.max_speed - self.game_state.base_speed)
-            else:
-                target_angle = 0
-
-            angle_change = self.tilt_speed * self.game_state.update_interval
-            if abs(target_angle - current_angle) <= angle_change:
-                new_angle = target_angle
-            else:
-                new_angle = current_angle + math.copysign(angle_change, target_angle - current_angle)
-            
-            self.player_angles[player_id] = new_angle
-
-            if x is not None:
-                max_distance = new_speed * self.game_state.update_interval
-                desired_distance = abs(x - player['x'])
-                actual_distance = min(desired_distance, max_distance)
-                new_x = player['x'] + new_direction * actual_distance
-            else:
-                new_x = player['x']
-
-            if y is None:
-                new_y = player['y']
-            else:
-                new_y = float(y)
-
-            adjusted_x, adjusted_y = self.game_state.collision_component.check_collision(player, new_x, new_y)
-            
-            player['x'] = adjusted_x
-            player['y'] = adjusted_y
-            player['speed'] = new_speed
-            player['angle'] = new_angle
-            
-            # Update animation component with running state, jumping state, and crouching state
-            jumping = self.is_player_jumping(player_id)
-            self.game_state.animation_component.update_pivot_points(player, running, jumping, crouching)
-            
-        # print(f"Player position updated: id={player_id}, new state={self.game_state.players[player_id]}")
-
-    def update_player_crouch(self, player_id, crouching):
-        if player_id in self.game_state.players:
-            self.game_state.players[player_id]['crouching'] = crouching
-            print(f"Player {player_id} crouching state updated: {crouching}")
-
-    def player_jump(self, player_id):
-        if player_id in self.game_state.players:
-            player = self.game_state.players[player_id]
-            ground_level = self.game_state.get_ground_level(player['x'])
-            
-            if player['y'] == ground_level + self.game_state.player_height and not self.is_player_jumping(player_id):
-                player['vy'] = self.game_state.jump_velocity
-                self.player_jumping_states[player_id] = True
-                self.player_jump_start_times[player_id] = time.time()
-                print(f"Player jumped: id={player_id}, new vy={self.game_state.jump_velocity}")
-
-    def is_player_jumping(self, player_id):
-        if player_id in self.player_jumping_states and self.player_jumping_states[player_id]:
-            current_time = time.time()
-            jump_start_time = self.player_jump_start_times.get(player_id, current_time)
-            
-            if current_time - jump_start_time >= self.jump_duration:
-                self.player_jumping_states[player_id] = False
-                return False
-            return True
-        return False
-
-    def update_player_mouse_position(self, player_id, position):
-        if player_id in self.game_state.players:
-            self.game_state.player_mouse_positions[player_id] = position
-            jumping = self.player_jumping_states.get(player_id, False)
-            self.game_state.animation_component.update_pivot_points(self.game_state.players[player_id], False, jumping)
-            print(f"Updated mouse position for player {player_id}: {position}")
-
-    def update_player_guard(self, player_id, guard_state):
-        if player_id in self.game_state.player_guard_states:
-            self.game_state.player_guard_states[player_id] = guard_state
-            print(f"Player guard state updated: id={player_id}, guard={guard_state}")
-
-    def update(self):
-        current_time = time.time()
-        for player_id, player in self.game_state.players.items():
-            if self.is_player_jumping(player_id):
-                player['y'] += player['vy'] * self.game_state.update_interval
-                player['vy'] -= self.game_state.gravity * self.game_state.update_interval
-                
-                ground_level = self.game_state.get_ground_level(player['x'])
-                if player['y'] <= ground_level + self.game_state.player_height:
-                    player['y'] = ground_level + self.game_state.player_height
-                    player['vy'] = 0
-                    
-                    # Only reset jumping state if the jump duration has passed
-                    if current_time - self.player_jump_start_times[player_id] >= self.jump_duration:
-                        self.player_jumping_states[player_id] = False
-
-            # Update animation
-            running = self.player_speeds.get(player_id, 0) > self.game_state.base_speed
-            jumping = self.is_player_jumping(player_id)
-            crouching = self.player_crouching_states.get(player_id, False)
+# /backend/game_app/movement_component.py
+import math
+import time
+from .game_log import physics_log, animation_log
+
+# Everything the movement step depends on besides the player and the map.
+# /initialize/ sends these to clients, whose prediction runs the same step
+MOVEMENT_PARAMS = {
+    'update_interval': 1/60,
+    'base_speed': 30,  # pixels per second
+    'max_speed': 150,
+    'acceleration_rate': 100,  # pixels per second^2
+    'deceleration_rate': 200,
+    'tile_pixels': 30,  # speeds are in pixels; clients draw a tile this wide
+    'max_tilt_angle': 7,  # Maximum tilt angle in degrees
+    'tilt_speed': 180,  # Degrees per second
+    'min_speed_for_tilt': 1,  # Minimum speed to start tilting
+    'player_width': 1,
+    'player_height': 2,
+}
+
+class MovementComponent:
+    def __init__(self, game_state):
+        self.game_state = game_state
+        self.player_directions = {}
+        self.max_tilt_angle = MOVEMENT_PARAMS['max_tilt_angle']
+        self.tilt_speed = MOVEMENT_PARAMS['tilt_speed']
+        self.min_speed_for_tilt = MOVEMENT_PARAMS['min_speed_for_tilt']
+        self.player_jumping_states = {}  # Track jumping state for each player
+        self.player_jump_start_times = {}  # Track jump start time for each player
+        self.jump_duration = 0.4  # Total duration of jump animation in seconds
+        self.player_crouching_states = {}  # Track crouching state for each player
+
+    def update_player_position(self, player_id, move, running, crouching):
+        """Walk a player one tick in direction `move`: -1 (left), 0 or 1 (right).
+
+        Clients predict their own player with a copy of this step
+        (frontend/src/game/prediction.jsx), so the arithmetic must stay in
+        the same order there; MovementStepTests and `npm run check:prediction`
+        hold both to the same recorded steps. The step only reads the player's position,
+        speed and angle, which clients are sent, and the direction of its
+        previous step, which they know from their own inputs.
+        """
+        if player_id in self.game_state.players:
+            player = self.game_state.players[player_id]
+            game_state = self.game_state
+
+            current_speed = player['speed']
+            current_direction = self.player_directions.get(player_id, 0)
+            current_angle = player['angle']
+            self.player_directions[player_id] = move
+
+            if current_direction != 0 and move != current_direction:
+                # Bring the player to a complete stop when changing direction
+                new_speed = 0
+            elif crouching:
+                # Set speed to base speed when crouching
+                new_speed = game_state.base_speed
+            elif running and move != 0:
+                new_speed = min(current_speed + game_state.acceleration_rate * game_state.update_interval,
+                                game_state.max_speed)
+            else:
+                new_speed = max(game_state.base_speed,
+                                current_speed - game_state.deceleration_rate * game_state.update_interval)
+
+            # Calculate new angle based on speed and direction
+            if abs(new_speed - game_state.base_speed) > self.min_speed_for_tilt and move != 0:
+                target_angle = move * self.max_tilt_angle * (new_speed - game_state.base_speed) / (game_state.max_speed - game_state.base_speed)
+            else:
+                target_angle = 0
+
+            angle_change = self.tilt_speed * game_state.update_interval
+            if abs(target_angle - current_angle) <= angle_change:
+                new_angle = target_angle
+            else:
+                new_angle = current_angle + math.copysign(angle_change, target_angle - current_angle)
+
+            new_x = player['x'] + move * new_speed / game_state.tile_pixels * game_state.update_interval
+            if game_state.map_data:
+                new_x = min(max(new_x, 0), game_state.map_data.width - game_state.player_width)
+
+            adjusted_x, adjusted_y = game_state.collision_component.check_collision(player, new_x, player['y'])
+
+            player['x'] = adjusted_x
+            player['y'] = adjusted_y
+            player['speed'] = new_speed
+            player['angle'] = new_angle
+
+            # Update animation component with running state, jumping state, and crouching state
+            jumping = self.is_player_jumping(player_id)
+            game_state.animation_component.update_pivot_points(player, running, jumping, crouching)
+            physics_log.debug("Player position updated: id=%s, x=%s, y=%s, speed=%s",
+                              player_id, adjusted_x, adjusted_y, new_speed)
+
+    def remove_player(self, player_id):
+        # A player who rejoins starts from rest, as its new client's prediction does
+        self.player_directions.pop(player_id, None)
+
+    def apply_inputs(self, player_id, inputs):
+        # Movement steps are applied one by one, in the order the client took
+        # them, and the last one's sequence number is sent back in the player's
+        # state so the client knows which of its predicted steps are settled.
+        # The rest is applied once per tick: any jump, and the latest crouch
+        # and mouse state
+        jump = False
+        crouching = False
+        mouse_position = None
+        input_seq = None
+        for data in inputs:
+            if 'move' in data:
+                move = data['move']
+                self.update_player_position(player_id, (move > 0) - (move < 0),
+                                            data.get('running', False), data.get('crouching', False))
+            if data.get('seq') is not None:
+                input_seq = data['seq']
+            if data.get('jump', False):
+                jump = True
+            if 'player_mouse_position' in data:
+                mouse_position = data['player_mouse_position']
+            crouching = data.get('crouching', False)
+
+        if input_seq is not None and player_id in self.game_state.players:
+            self.game_state.players[player_id]['input_seq'] = input_seq
+
+        if jump:
+            self.player_jump(player_id)
+
+        self.update_player_crouch(player_id, crouching)
+
+        if mouse_position is not None and player_id in self.game_state.players:
+            self.game_state.player_mouse_positions[player_id] = mouse_position
+
+    def update_player_crouch(self, player_id, crouching):
+        if player_id in self.game_state.players:
+            self.game_state.players[player_id]['crouching'] = crouching
+            physics_log.debug("Player %s crouching state updated: %s", player_id, crouching)
+
+    def player_jump(self, player_id):
+        if player_id in self.game_state.players:
+            player = self.game_state.players[player_id]
+            ground_level = self.game_state.get_ground_level(player['x'])
+            
+            if player['y'] == ground_level + self.game_state.player_height and not self.is_player_jumping(player_id):
+                player['vy'] = self.game_state.jump_velocity
+                self.player_jumping_states[player_id] = True
+                self.player_jump_start_times[player_id] = time.time()
+                physics_log.debug("Player jumped: id=%s, new vy=%s", player_id, self.game_state.jump_velocity)
+
+    def is_player_jumping(self, player_id):
+        if player_id in self.player_jumping_states and self.player_jumping_states[player_id]:
+            current_time = time.time()
+            jump_start_time = self.player_jump_start_times.get(player_id, current_time)
+            
+            if current_time - jump_start_time >= self.jump_duration:
+                self.player_jumping_states[player_id] = False
+                return False
+            return True
+        return False
+
+    def update_player_mouse_position(self, player_id, position):
+        if player_id in self.game_state.players:
+            self.game_state.player_mouse_positions[player_id] = position
+            player = self.game_state.players[player_id]
+            jumping = self.player_jumping_states.get(player_id, False)
+            self.game_state.animation_component.update_pivot_points(player, False, jumping, player.get('crouching', False))
+            animation_log.debug("Updated mouse position for player %s: %s", player_id, position)
+
+    def update_player_guard(self, player_id, guard_state):
+        if player_id in self.game_state.player_guard_states:
+            self.game_state.player_guard_states[player_id] = guard_state
+            animation_log.debug("Player guard state updated: id=%s, guard=%s", player_id, guard_state)
+
+    def update(self):
+        current_time = time.time()
+        for player_id, player in self.game_state.players.items():
+            if self.is_player_jumping(player_id):
+                player['y'] += player['vy'] * self.game_state.update_interval
+                player['vy'] -= self.game_state.gravity * self.game_state.update_interval
+                
+                ground_level = self.game_state.get_ground_level(player['x'])
+                if player['y'] <= ground_level + self.game_state.player_height:
+                    player['y'] = ground_level + self.game_state.player_height
+                    player['vy'] = 0
+                    
+                    # Only reset jumping state if the jump duration has passed
+                    if current_time - self.player_jump_start_times[player_id] >= self.jump_duration:
+                        self.player_jumping_states[player_id] = False
+
+            # Update animation
+            running = player['speed'] > self.game_state.base_speed
+            jumping = self.is_player_jumping(player_id)
+            crouching = self.player_crouching_states.get(player_id, False)
             self.game_state.animation_component.update_pivot_points(player, running, jumping, crouching)
\ No newline at end of file
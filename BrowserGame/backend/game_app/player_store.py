@@ -0,0 +1,173 @@
+# /backend/game_app/player_store.py
+import numpy as np
+from .delta_encoder import FLAG_BACKWARD, FLAG_CROUCHING
+
+class PlayerStore:
+    """Players kept as parallel NumPy arrays, one slot per player.
+
+    The per-tick physics step reads and writes `x`, `y`, `vy`, `speed`,
+    `angle` and `flags` for every player at once. Slots freed by `remove`
+    go on a free list and are reused by the next `add`, so arrays only
+    grow when every slot is taken. `active_slots` lists the occupied
+    slots in the order players were added.
+
+    Components that work on one player at a time keep using the dict
+    interface: `store[player_id]` returns a `PlayerView` whose keys read
+    and write the arrays.
+    """
+
+    ARRAY_FIELDS = ('x', 'y', 'vy', 'speed', 'angle')
+
+    def __init__(self, capacity=64, default_speed=0.0):
+        self.default_speed = default_speed
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.angle = np.zeros(capacity)
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+        self.slots = {}  # player id -> slot
+        self.slot_ids = [None] * capacity
+        self.views = [None] * capacity
+        self.free_slots = list(range(capacity - 1, -1, -1))
+        self._active_slots = None
+
+    @property
+    def capacity(self):
+        return len(self.slot_ids)
+
+    @property
+    def active_slots(self):
+        if self._active_slots is None:
+            self._active_slots = np.fromiter(self.slots.values(), dtype=np.intp, count=len(self.slots))
+        return self._active_slots
+
+    def _grow(self):
+        old_capacity = self.capacity
+        new_capacity = old_capacity * 2
+        for field in self.ARRAY_FIELDS + ('flags',):
+            array = getattr(self, field)
+            grown = np.zeros(new_capacity, dtype=array.dtype)
+            grown[:old_capacity] = array
+            setattr(self, field, grown)
+        self.slot_ids.extend([None] * old_capacity)
+        self.views.extend([None] * old_capacity)
+        self.free_slots.extend(range(new_capacity - 1, old_capacity - 1, -1))
+
+    def add(self, player_id, x, y, **extra):
+        if player_id in self.slots:
+            self.remove(player_id)
+        if not self.free_slots:
+            self._grow()
+        slot = self.free_slots.pop()
+        self.x[slot] = x
+        self.y[slot] = y
+        self.vy[slot] = 0.0
+        self.speed[slot] = self.default_speed
+        self.angle[slot] = 0.0
+        self.flags[slot] = 0
+        self.slots[player_id] = slot
+        self.slot_ids[slot] = player_id
+        view = self.views[slot] = PlayerView(self, slot, player_id)
+        for key, value in extra.items():
+            view[key] = value
+        self._active_slots = None
+        return view
+
+    def remove(self, player_id):
+        slot = self.slots.pop(player_id, None)
+        if slot is None:
+            return False
+        self.slot_ids[slot] = None
+        self.views[slot] = None
+        self.free_slots.append(slot)
+        self._active_slots = None
+        return True
+
+    # Mapping interface, so `players[player_id]` and `players.items()` keep working
+
+    def __len__(self):
+        return len(self.slots)
+
+    def __contains__(self, player_id):
+        return player_id in self.slots
+
+    def __iter__(self):
+        return iter(list(self.slots))
+
+    def __getitem__(self, player_id):
+        return self.views[self.slots[player_id]]
+
+    def __delitem__(self, player_id):
+        if not self.remove(player_id):
+            raise KeyError(player_id)
+
+    def get(self, player_id, default=None):
+        slot = self.slots.get(player_id)
+        return default if slot is None else self.views[slot]
+
+    def keys(self):
+        return list(self.slots)
+
+    def values(self):
+        return [self.views[slot] for slot in self.slots.values()]
+
+    def items(self):
+        return [(player_id, self.views[slot]) for player_id, slot in self.slots.items()]
+
+
+class PlayerView:
+    """Dict-style access to one player's slot in a PlayerStore.
+
+    Numeric fields live in the store's arrays; `direction` and `crouching`
+    are bits of `flags`. Anything else (pivot points) is kept on the view.
+    """
+
+    __slots__ = ('store', 'slot', 'id', 'fields')
+
+    def __init__(self, store, slot, player_id):
+        self.store = store
+        self.slot = slot
+        self.id = player_id
+        self.fields = {}
+
+    def __getitem__(self, key):
+        if key in PlayerStore.ARRAY_FIELDS:
+            return float(getattr(self.store, key)[self.slot])
+        if key == 'id':
+            return self.id
+        if key == 'direction':
+            return 'backward' if self.store.flags[self.slot] & FLAG_BACKWARD else 'forward'
+        if key == 'crouching':
+            return bool(self.store.flags[self.slot] & FLAG_CROUCHING)
+        return self.fields[key]
+
+    def __setitem__(self, key, value):
+        if key in PlayerStore.ARRAY_FIELDS:
+            getattr(self.store, key)[self.slot] = value
+        elif key == 'direction':
+            self._set_flag(FLAG_BACKWARD, value == 'backward')
+        elif key == 'crouching':
+            self._set_flag(FLAG_CROUCHING, value)
+        elif key == 'id':
+            raise KeyError("A player's id is fixed by its slot")
+        else:
+            self.fields[key] = value
+
+    def _set_flag(self, flag, enabled):
+        if enabled:
+            self.store.flags[self.slot] |= flag
+        else:
+            self.store.flags[self.slot] &= ~flag & 0xFF
+
+    def __contains__(self, key):
+        return key in PlayerStore.ARRAY_FIELDS or key in ('id', 'direction', 'crouching') or key in self.fields
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __repr__(self):
+        return f"PlayerView(id={self.id!r}, x={self['x']}, y={self['y']}, vy={self['vy']})"
@@ -0,0 +1,66 @@
+# /backend/game_app/pose_evaluator.py
+from .pose_table import DIRECTIONS, hermite
+
+# Clip ids; frontend/src/game/poseEvaluator.jsx must match
+CLIP_IDLE = 0
+CLIP_CROUCH_IDLE = 1
+CLIP_MOVE = 2  # walk and run cycles blended by the walk/run factor
+CLIP_CROUCH_MOVE = 3
+CLIP_JUMP = 4
+CLIP_TURN = 5  # TURN_PASS facing away into TURN_REACH facing the clip's direction
+CLIP_CROUCH_TURN = 6
+
+def idle_layer(backward, crouching):
+    return (CLIP_CROUCH_IDLE if crouching else CLIP_IDLE, backward, 0.0, 0.0)
+
+def cycle_layer(progress, blend, backward, crouching):
+    return (CLIP_CROUCH_MOVE if crouching else CLIP_MOVE, backward, progress, blend)
+
+def single(layer):
+    return (layer, layer, 0.0)
+
+class PoseEvaluator:
+    """Turns animation parameters into poses.
+
+    A layer is `(clip, backward, progress, blend)`: one clip at a point of
+    its cycle, with `blend` mixing walk into run for CLIP_MOVE. Animation
+    parameters are `(layer_a, layer_b, mix)`: layer_a eased into layer_b by
+    `mix` along the Hermite curve every transition uses.
+
+    Poses depend on nothing but the parameters and the frames, and cycles
+    come from the same baked PoseTable on both ends, so clients running
+    frontend/src/game/poseEvaluator.jsx get the server's poses from the
+    parameters alone.
+    """
+
+    def __init__(self, get_frame, pose_table):
+        """`get_frame(frame_name, direction)` returns a (n_joints, 2) pose."""
+        self.get_frame = get_frame
+        self.pose_table = pose_table
+
+    def layer_pose(self, layer):
+        clip, backward, progress, blend = layer
+        direction = DIRECTIONS[backward]
+        if clip == CLIP_MOVE:
+            walk = self.pose_table.sample('WALK', direction, progress)
+            run = self.pose_table.sample('RUN', direction, progress)
+            return walk * (1 - blend) + run * blend
+        if clip == CLIP_CROUCH_MOVE:
+            return self.pose_table.sample('CROUCH', direction, progress)
+        if clip == CLIP_JUMP:
+            return self.pose_table.sample('JUMP', direction, progress)
+        if clip == CLIP_TURN:
+            return hermite(self.get_frame('TURN_PASS', DIRECTIONS[not backward]),
+                           self.get_frame('TURN_REACH', direction), progress)
+        if clip == CLIP_CROUCH_TURN:
+            return hermite(self.get_frame('CROUCH_IDLE', DIRECTIONS[not backward]),
+                           self.get_frame('CROUCH_IDLE', direction), progress)
+        if clip == CLIP_CROUCH_IDLE:
+            return self.get_frame('CROUCH_IDLE', direction)
+        return self.get_frame('IDLE', direction)
+
+    def pose(self, anim):
+        layer_a, layer_b, mix = anim
+        if mix <= 0:
+            return self.layer_pose(layer_a)
+        return hermite(self.layer_pose(layer_a), self.layer_pose(layer_b), mix)
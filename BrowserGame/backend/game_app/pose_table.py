@@ -0,0 +1,61 @@
+# /backend/game_app/pose_table.py
+import numpy as np
+
+# Each cycle goes PASS -> REACH over the first half and back over the second
+CYCLE_FRAMES = {
+    'WALK': ('WALK_PASS', 'WALK_REACH'),
+    'RUN': ('RUN_PASS', 'RUN_REACH'),
+    'CROUCH': ('CROUCH_PASS', 'CROUCH_REACH'),
+    'JUMP': ('JUMP_START_END', 'JUMP_APEX'),
+}
+
+DIRECTIONS = ('forward', 'backward')
+
+def hermite(start, end, t):
+    """Cubic Hermite blend with both tangents at (end - start) / 2.
+
+    `start` and `end` are (..., 2) point arrays; `t` broadcasts against them.
+    """
+    t2 = t * t
+    t3 = t2 * t
+    h00 = 2 * t3 - 3 * t2 + 1
+    h01 = -2 * t3 + 3 * t2
+    h1 = t3 - 2 * t2 + t + t3 - t2  # h10 + h11, both tangents are equal
+    return h00 * start + h01 * end + h1 * ((end - start) * 0.5)
+
+class PoseTable:
+    """Cycle poses baked once at startup.
+
+    Every cycle in CYCLE_FRAMES is sampled at `resolution` evenly spaced
+    points per direction, holding all joints in one contiguous
+    (resolution + 1, n_joints, 2) array. A lookup is an index plus a linear
+    blend between two neighbouring samples.
+    """
+
+    def __init__(self, frame_arrays, resolution=64):
+        """`frame_arrays` maps (frame name, direction) to a (n_joints, 2) array."""
+        self.resolution = resolution
+        self.samples = {}
+        self.steps = {}
+
+        progress = np.linspace(0.0, 1.0, resolution + 1)
+        first_half = progress < 0.5
+        t = np.where(first_half, progress * 2, (progress - 0.5) * 2)[:, None, None]
+        for cycle, (pass_frame, reach_frame) in CYCLE_FRAMES.items():
+            for direction in DIRECTIONS:
+                pass_pose = frame_arrays[(pass_frame, direction)]
+                reach_pose = frame_arrays[(reach_frame, direction)]
+                start = np.where(first_half[:, None, None], pass_pose, reach_pose)
+                end = np.where(first_half[:, None, None], reach_pose, pass_pose)
+                samples = np.ascontiguousarray(hermite(start, end, t))
+                self.samples[(cycle, direction)] = samples
+                # Differences between neighbouring samples, so a lookup is one multiply-add
+                self.steps[(cycle, direction)] = np.ascontiguousarray(np.diff(samples, axis=0))
+
+    def sample(self, cycle, direction, progress):
+        position = min(max(progress, 0.0), 1.0) * self.resolution
+        index = int(position)
+        samples = self.samples[(cycle, direction)]
+        if index >= self.resolution:
+            return samples[self.resolution].copy()
+        return samples[index] + self.steps[(cycle, direction)][index] * (position - index)
@@ -0,0 +1,386 @@
+# /backend/game_app/room_workers.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from multiprocessing.reduction import ForkingPickler
+from django.conf import settings
+from .broadcaster import StateBroadcaster
+from .interest import InterestManager
+from .tick_profiler import TickProfiler
+
+logger = logging.getLogger(__name__)
+
+# Both directions of a worker pipe carry lists of tuples whose first item is the kind:
+#   parent -> worker: ('open', map_id, map_grid), ('close', map_id), ('spawn', map_id, player_id),
+#                     ('add', map_id, player_id, x, y), ('remove', map_id, player_id),
+#                     ('input', map_id, player_id, data), ('map', map_id, version, chunks), ('stop',)
+#   worker -> parent: ('snapshot', map_id, seq, snapshot), ('map', map_id, update),
+#                     ('metrics', map_id, profiler_series, tick_metrics)
+
+# How often workers send their rooms' tick metrics to the parent, in seconds
+METRICS_INTERVAL = 1.0
+
+class PipeSender:
+    """Writes to one end of a worker pipe from a thread of its own.
+
+    Connection.send blocks while the pipe is full, and each end only reads
+    from its event loop. If both processes were blocked sending at once (a
+    large map going to a worker that is streaming snapshots back), neither
+    would read again. Messages are pickled on the caller's thread, so later
+    changes to them are not sent, and written in order by the thread.
+    """
+
+    def __init__(self, connection, name):
+        self.connection = connection
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def send(self, messages):
+        self.queue.put(ForkingPickler.dumps(messages))
+
+    def close(self):
+        """Stops the thread once everything queued so far is written."""
+        self.queue.put(None)
+
+    def _run(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                return
+            try:
+                self.connection.send_bytes(data)
+            except OSError as e:
+                logger.error(f"{self.thread.name}: the other end of the pipe is unreachable: {e!r}")
+                return
+
+
+class RemoteRoom:
+    """Parent-side stand-in for a room simulated in a worker process.
+
+    Provides the part of the GameState interface that GameConsumer and
+    RoomManager use. Player changes and inputs are forwarded to the worker.
+    Snapshots coming back are broadcast from here, because the client
+    connections live in the ASGI process.
+    """
+
+    def __init__(self, worker, map_id, map_grid=None, keyframe_interval=60):
+        self.worker = worker
+        self.map_id = map_id
+        self.group_name = f'game_{map_id}'
+        self.map_grid = map_grid
+        self.keyframe_interval = keyframe_interval
+        # Broadcast phases are timed here; the worker sends the simulation's
+        self.profiler = TickProfiler(settings.GAME_METRICS)
+        self.tick_metrics = None
+        self.broadcaster = StateBroadcaster(interest=InterestManager(), profiler=self.profiler)
+        self.players = set()
+        self.requested_map_version = 0
+        self.state_seq = 0
+        self.latest_snapshot = (0, {})
+        self.pending_snapshot = None
+        self.broadcast_task = None
+
+    async def load_map_data(self):
+        # The worker loads the map itself when the room opens
+        pass
+
+    async def start_physics_update(self):
+        self.worker.open_room(self)
+
+    async def stop_physics_update(self):
+        self.worker.close_room(self)
+        if self.broadcast_task:
+            self.broadcast_task.cancel()
+            self.broadcast_task = None
+
+    def spawn_player(self, player_id):
+        self.players.add(player_id)
+        self.worker.send(('spawn', self.map_id, player_id))
+
+    def add_player(self, player_id, x, y):
+        self.players.add(player_id)
+        self.worker.send(('add', self.map_id, player_id, x, y))
+
+    def remove_player(self, player_id):
+        if player_id in self.players:
+            self.players.discard(player_id)
+            self.worker.send(('remove', self.map_id, player_id))
+
+    def queue_input(self, player_id, data):
+        # Rate limiting happens in the worker's InputQueue
+        if player_id not in self.players:
+            return False
+        self.worker.send(('input', self.map_id, player_id, data))
+        return True
+
+    def map_changed(self, version, chunks):
+        # Every connection passes the notice on; the worker only needs it once
+        if version > self.requested_map_version:
+            self.requested_map_version = version
+            self.worker.send(('map', self.map_id, version, chunks))
+
+    def receive_map_update(self, update):
+        asyncio.ensure_future(self.broadcaster.send_map_update(update))
+
+    def receive_metrics(self, series, tick_metrics):
+        self.profiler.merge(series)
+        self.tick_metrics = tick_metrics
+
+    def get_tick_metrics(self):
+        return self.tick_metrics
+
+    def receive_snapshot(self, seq, snapshot):
+        self.state_seq = seq
+        self.latest_snapshot = (seq, snapshot)
+        if self.broadcast_task is None or self.broadcast_task.done():
+            self.broadcast_task = asyncio.ensure_future(self._broadcast(seq, snapshot))
+        else:
+            # Still sending an earlier tick; only the newest waiting snapshot is worth sending
+            self.pending_snapshot = (seq, snapshot)
+
+    async def _broadcast(self, seq, snapshot):
+        while True:
+            await self.broadcaster.broadcast(seq, snapshot)
+            self.profiler.end_tick()
+            if self.pending_snapshot is None:
+                return
+            (seq, snapshot), self.pending_snapshot = self.pending_snapshot, None
+
+
+class RoomWorker:
+    """One worker process and the parent's end of its pipe.
+
+    Messages sent during one pass of the event loop are flushed together,
+    so a burst of inputs costs one pipe write.
+    """
+
+    def __init__(self, index, context):
+        self.index = index
+        self.connection, self.child_connection = context.Pipe()
+        self.process = context.Process(target=run_worker, args=(self.child_connection,),
+                                       name=f'room-worker-{index}', daemon=True)
+        self.rooms = {}
+        self.outbox = []
+        self.flush_scheduled = False
+        self.loop = None
+        self.sender = None
+
+    def start(self, loop):
+        self.loop = loop
+        self.process.start()
+        self.child_connection.close()
+        self.sender = PipeSender(self.connection, f'room-worker-{self.index}-sender')
+        loop.add_reader(self.connection.fileno(), self._on_readable)
+
+    def send(self, message):
+        self.outbox.append(message)
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.loop.call_soon(self.flush)
+
+    def flush(self):
+        self.flush_scheduled = False
+        if not self.outbox:
+            return
+        messages, self.outbox = self.outbox, []
+        self.sender.send(messages)
+
+    def open_room(self, room):
+        self.rooms[room.map_id] = room
+        self.send(('open', room.map_id, room.map_grid))
+
+    def close_room(self, room):
+        if self.rooms.get(room.map_id) is room:
+            del self.rooms[room.map_id]
+            self.send(('close', room.map_id))
+
+    def _on_readable(self):
+        try:
+            while self.connection.poll():
+                for kind, map_id, *args in self.connection.recv():
+                    room = self.rooms.get(map_id)
+                    if room is None:
+                        continue
+                    if kind == 'snapshot':
+                        room.receive_snapshot(*args)
+                    elif kind == 'map':
+                        room.receive_map_update(*args)
+                    elif kind == 'metrics':
+                        room.receive_metrics(*args)
+        except (EOFError, OSError):
+            self.loop.remove_reader(self.connection.fileno())
+            logger.error(f"Room worker {self.index} exited with {len(self.rooms)} open rooms")
+
+    async def stop(self):
+        self.send(('stop',))
+        self.flush()
+        self.sender.close()
+        self.loop.remove_reader(self.connection.fileno())
+        await self.loop.run_in_executor(None, self.sender.thread.join, 2)
+        await self.loop.run_in_executor(None, self.process.join, 2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.connection.close()
+
+
+class RoomWorkerPool:
+    """Simulates rooms in `worker_count` processes instead of the ASGI event loop.
+
+    Each room lives in one worker, the one with the fewest rooms when it
+    opened. Workers start with the first room.
+    """
+
+    def __init__(self, worker_count):
+        self.worker_count = worker_count
+        self.workers = []
+
+    def start(self):
+        # Forking a process that already runs an event loop and holds database
+        # connections is unsafe, so workers start from a fresh interpreter
+        context = multiprocessing.get_context('spawn')
+        loop = asyncio.get_running_loop()
+        workers = [RoomWorker(index, context) for index in range(self.worker_count)]
+        for worker in workers:
+            worker.start(loop)
+        self.workers = workers
+
+    def create_room(self, map_id, map_grid=None):
+        if not self.workers:
+            self.start()
+        worker = min(self.workers, key=lambda worker: len(worker.rooms))
+        return RemoteRoom(worker, map_id, map_grid)
+
+    async def shutdown(self):
+        for worker in self.workers:
+            await worker.stop()
+        self.workers = []
+
+
+class SnapshotPipe:
+    """Takes the place of a room's StateBroadcaster inside a worker."""
+
+    def __init__(self, map_id, sender):
+        self.map_id = map_id
+        self.sender = sender
+
+    async def broadcast(self, seq, snapshot):
+        self.sender.send([('snapshot', self.map_id, seq, snapshot)])
+
+    async def send_map_update(self, update):
+        self.sender.send([('map', self.map_id, update)])
+
+
+def run_worker(connection):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'game_project.settings')
+    import django
+    django.setup()
+    asyncio.run(serve_rooms(connection))
+
+async def serve_rooms(connection):
+    from .game_state import GameState
+
+    loop = asyncio.get_running_loop()
+    commands = asyncio.Queue()
+
+    def on_readable():
+        try:
+            while connection.poll():
+                for message in connection.recv():
+                    commands.put_nowait(message)
+        except (EOFError, OSError):
+            # The parent went away
+            loop.remove_reader(connection.fileno())
+            commands.put_nowait(('stop',))
+
+    loop.add_reader(connection.fileno(), on_readable)
+    sender = PipeSender(connection, 'room-worker-sender')
+    rooms = {}
+
+    async def send_metrics():
+        while True:
+            await asyncio.sleep(METRICS_INTERVAL)
+            if rooms:
+                sender.send([('metrics', map_id, room.profiler.export(), room.get_tick_metrics())
+                                 for map_id, room in rooms.items()])
+
+    # map_id -> commands for a room whose map is still loading, replayed in order once it runs.
+    # Loads run beside the command loop, so rooms already running keep getting their inputs.
+    loading = {}
+    open_tasks = set()
+
+    def open_room(map_id, map_grid, deferred):
+        room = GameState(map_id)
+        room.broadcaster = SnapshotPipe(map_id, sender)
+        loading[map_id] = deferred
+        task = asyncio.create_task(start_room(room, map_grid))
+        open_tasks.add(task)
+        task.add_done_callback(open_tasks.discard)
+
+    async def start_room(room, map_grid):
+        map_id = room.map_id
+        try:
+            if map_grid is not None:
+                room.set_map_data(map_grid)
+            else:
+                await room.load_map_data()
+        except Exception:
+            # Its commands have no room to go to, as after a close
+            logger.exception(f"Failed to open room for map {map_id}")
+            del loading[map_id]
+            return
+        await room.start_physics_update()
+        rooms[map_id] = room
+        deferred = loading[map_id]
+        while deferred:
+            message = deferred.pop(0)
+            if message[0] == 'open':
+                # Closed and opened again meanwhile; what follows waits for the new room
+                open_room(map_id, message[2], deferred)
+                return
+            await apply(message)
+        del loading[map_id]
+
+    async def apply(message):
+        kind, map_id, *args = message
+        room = rooms.get(map_id)
+        if room is None:
+            return
+        if kind == 'input':
+            room.queue_input(*args)
+        elif kind == 'spawn':
+            room.spawn_player(*args)
+        elif kind == 'add':
+            room.add_player(*args)
+        elif kind == 'remove':
+            room.remove_player(*args)
+        elif kind == 'map':
+            room.map_changed(*args)
+        elif kind == 'close':
+            del rooms[map_id]
+            await room.stop_physics_update()
+
+    metrics_task = asyncio.create_task(send_metrics()) if settings.GAME_METRICS else None
+    while True:
+        message = await commands.get()
+        if message[0] == 'stop':
+            break
+        map_id = message[1]
+        if map_id in loading:
+            loading[map_id].append(message)
+        elif message[0] == 'open':
+            open_room(map_id, message[2], [])
+        else:
+            await apply(message)
+
+    if metrics_task:
+        metrics_task.cancel()
+    for task in list(open_tasks):
+        task.cancel()
+    for room in rooms.values():
+        await room.stop_physics_update()
+    sender.close()
+    await loop.run_in_executor(None, sender.thread.join)
@@ -0,0 +1,87 @@
+# /backend/game_app/rooms.py
+import asyncio
+import contextlib
+import logging
+from django.conf import settings
+from .game_state import GameState
+from .room_workers import RoomWorkerPool
+
+logger = logging.getLogger(__name__)
+
+class RoomManager:
+    """One GameState per map, created when the first player joins.
+
+    Each room runs its own physics loop and broadcasts only to its own
+    connections, so a tick costs what that room's players cost. A room is
+    torn down when its last player leaves.
+
+    With a `worker_pool`, rooms are simulated in worker processes and this
+    process only relays inputs and broadcasts their snapshots.
+    """
+
+    def __init__(self, worker_pool=None):
+        self.worker_pool = worker_pool
+        self.rooms = {}
+        # map_id -> [lock, holders and waiters]; see map_lock
+        self.locks = {}
+
+    def get(self, map_id):
+        return self.rooms.get(map_id)
+
+    @contextlib.asynccontextmanager
+    async def map_lock(self, map_id):
+        """Serializes create/teardown of one map's room, so a join never lands in a room being closed.
+
+        Rooms of other maps open and close meanwhile; a cold room's map load
+        only holds up joins to the same map. A lock is dropped once nobody
+        holds or waits for it.
+        """
+        entry = self.locks.setdefault(map_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self.locks[map_id]
+
+    def create_room(self, map_id):
+        if self.worker_pool:
+            return self.worker_pool.create_room(map_id)
+        return GameState(map_id)
+
+    async def join(self, map_id):
+        """Return the running room for `map_id`, starting it if needed.
+
+        Callers add their player before their next await, so a concurrent
+        `leave` cannot see the room empty in between.
+        """
+        async with self.map_lock(map_id):
+            room = self.rooms.get(map_id)
+            if room is None:
+                room = self.create_room(map_id)
+                await room.load_map_data()
+                await room.start_physics_update()
+                self.rooms[map_id] = room
+                logger.info(f"Opened room for map {map_id} ({len(self.rooms)} active)")
+            return room
+
+    async def leave(self, room):
+        async with self.map_lock(room.map_id):
+            if room.players or self.rooms.get(room.map_id) is not room:
+                return
+            await room.stop_physics_update()
+            del self.rooms[room.map_id]
+            logger.info(f"Closed room for map {room.map_id} ({len(self.rooms)} active)")
+
+    async def shutdown(self):
+        for map_id in list(self.rooms):
+            async with self.map_lock(map_id):
+                room = self.rooms.pop(map_id, None)
+                if room is not None:
+                    await room.stop_physics_update()
+        if self.worker_pool:
+            await self.worker_pool.shutdown()
+
+room_manager = RoomManager(RoomWorkerPool(settings.GAME_ROOM_WORKERS) if settings.GAME_ROOM_WORKERS else None)
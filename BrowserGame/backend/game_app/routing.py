@@ -1,9 +1,11 @@
-# /backend/game_app/routing.py
-from django.urls import re_path
-from . import consumers
-
-websocket_urlpatterns = [
-    re_path(r'^ws/game/(?P<player_id>[\w-]+)/$', consumers.GameConsumer.as_asgi()),
-]
-
+# /backend/game_app/routing.py
+from django.urls import re_path
+from . import consumers
+
+websocket_urlpatterns = [
+    re_path(r'^ws/game/(?P<map_id>\d+)/(?P<player_id>[\w-]+)/$', consumers.GameConsumer.as_asgi()),
+    # Without a map id the player joins the default map's room
+    re_path(r'^ws/game/(?P<player_id>[\w-]+)/$', consumers.GameConsumer.as_asgi()),
+]
+
 print("Websocket URL patterns loaded:", websocket_urlpatterns)
\ No newline at end of file
@@ -1,3 +1,1076 @@
-from django.test import TestCase
-
-# Create your tests here.
+import asyncio
+import gzip
+import json
+import multiprocessing
+import os
+import random
+import re
+import struct
+import unittest
+from unittest import mock
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from .animation_component import JOINT_NAMES, POSE_REPLICATION_MODES, POSE_REPLICATION_PARAMETERS
+from .broadcaster import StateBroadcaster
+from .collision_component import CollisionComponent
+from .delta_encoder import CLIP_BLENDED, LOD_CLIP, LOD_FULL, LOD_POSITION, LOD_SHIFT, DeltaEncoder, project_player
+from .game_state import MAP_RELOAD_RETRIES, GameState
+from .input_queue import InputQueue
+from .interest import InterestManager
+from .map_cache import brotli, map_payload_cache
+from .map_chunks import CHUNK_SIZE, compact_chunk, grid_chunks, pack_chunk, unpack_chunk
+from .map_edits import MapVersionConflict, TileEdits, apply_map_edits, load_map_chunks, replace_map_chunks
+from .map_grid import MapGrid
+from .models import Map, MapChunk
+from .movement_component import MOVEMENT_PARAMS
+from .room_workers import serve_rooms
+from .rooms import room_manager
+from . import tick_scheduler
+from .tick_scheduler import TickScheduler
+from .tick_profiler import PROMETHEUS_CONTENT_TYPE
+from .tile_index import TileIndex
+from .views import edit_map, map_payload, metrics, save_map
+from .wire_codec import (BINARY_CODEC, FIELD_ANGLE, FIELD_ANIM, FIELD_FLAGS, FIELD_INPUT_SEQ, FIELD_MOUSE,
+                         FIELD_PIVOTS, FIELD_SPEED, FIELD_X, FIELD_Y, FRAME_KEY, JSON_CODEC, InputDecodeError,
+                         decode_input)
+
+def tile_set(grid):
+    return {(tile['x'], tile['y'], tile['color'], tile['layer']) for tile in grid.tiles()}
+
+def random_tiles(width, height, count, colors, layers=(0, 1), seed=0):
+    rng = random.Random(seed)
+    tiles = {}
+    for _ in range(count):
+        # Some tiles are painted past the declared size, which maps keep
+        x = rng.randrange(width + 10)
+        y = rng.randrange(height + 10)
+        tiles[(x, y, rng.choice(layers))] = rng.choice(colors)
+    return [(x, y, color, layer) for (x, y, layer), color in tiles.items()]
+
+
+class MapChunkFormatTests(SimpleTestCase):
+    def test_pack_round_trip(self):
+        rng = np.random.default_rng(0)
+        colors = ['#000000', '#00ff00', '#ff0000']
+        cells = rng.integers(0, len(colors) + 1, size=(CHUNK_SIZE, CHUNK_SIZE))
+        unpacked_colors, unpacked_cells = unpack_chunk(pack_chunk(colors, cells))
+        self.assertEqual(unpacked_colors, colors)
+        self.assertTrue(np.array_equal(unpacked_cells, cells))
+
+    def test_pack_round_trip_past_255_colors(self):
+        colors = [f'#{i:06x}' for i in range(300)]
+        cells = (np.arange(CHUNK_SIZE * CHUNK_SIZE) % (len(colors) + 1)).reshape(CHUNK_SIZE, CHUNK_SIZE)
+        unpacked_colors, unpacked_cells = unpack_chunk(pack_chunk(colors, cells))
+        self.assertEqual(unpacked_colors, colors)
+        self.assertEqual(unpacked_cells.dtype, np.dtype('<u2'))
+        self.assertTrue(np.array_equal(unpacked_cells, cells))
+
+    def test_blob_does_not_depend_on_palette_order(self):
+        cells = np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=np.uint8)
+        cells[0, :3] = [1, 2, 1]
+        swapped = np.where(cells == 1, 2, np.where(cells == 2, 1, 0))
+        self.assertEqual(pack_chunk(*compact_chunk([None, '#aaaaaa', '#bbbbbb', '#cccccc'], cells)),
+                         pack_chunk(*compact_chunk([None, '#bbbbbb', '#aaaaaa'], swapped)))
+
+
+class MapGridTests(SimpleTestCase):
+    def test_from_chunks_matches_from_tiles(self):
+        tiles = random_tiles(100, 70, 2000, ['#111111', '#222222', '#333333'])
+        from_tiles = MapGrid.from_tiles('test', 100, 70, tiles)
+        from_chunks = MapGrid.from_chunks('test', 100, 70, grid_chunks(from_tiles))
+        self.assertEqual(tile_set(from_chunks), set(tiles))
+        self.assertEqual(tile_set(from_chunks), tile_set(from_tiles))
+        for layer, layer_array in from_tiles.layers.items():
+            self.assertEqual(from_chunks.layers[layer].shape, layer_array.shape)
+
+    def test_only_chunks_with_tiles_are_stored(self):
+        grid = MapGrid.from_tiles('test', 100, 100, [(70, 40, '#ffffff', 1)])
+        self.assertEqual([(layer, cx, cy) for layer, cx, cy, _ in grid_chunks(grid)], [(1, 2, 1)])
+
+
+class MapEditTests(TestCase):
+    def setUp(self):
+        self.map = Map.objects.create(name='test', width=64, height=64)
+        self.tiles = [(x, 0, '#00aa00', 1) for x in range(64)] + [(5, 40, '#aaaaaa', 0)]
+        replace_map_chunks(self.map, MapGrid.from_tiles('test', 64, 64, self.tiles))
+
+    def stored_grid(self):
+        return MapGrid.from_map(Map.objects.get(id=self.map.id))
+
+    def test_paint_and_clear(self):
+        edits = TileEdits()
+        edits.paint(1, 3, 0, '#ff0000')  # recolor
+        edits.paint(1, 40, 50, '#0000ff')  # new tile in a new chunk
+        edits.clear(1, 10, 0)
+        version, changed = apply_map_edits(self.map.id, edits)
+
+        expected = set(self.tiles) - {(3, 0, '#00aa00', 1), (10, 0, '#00aa00', 1)}
+        expected |= {(3, 0, '#ff0000', 1), (40, 50, '#0000ff', 1)}
+        grid = self.stored_grid()
+        self.assertEqual(tile_set(grid), expected)
+        self.assertEqual(version, 1)
+        self.assertEqual(grid.version, 1)
+        self.assertEqual(changed, [(1, 0, 0), (1, 1, 1)])
+
+    def test_emptied_chunk_is_deleted(self):
+        edits = TileEdits()
+        edits.clear(0, 5, 40)
+        _, changed = apply_map_edits(self.map.id, edits)
+        self.assertEqual(changed, [(0, 0, 1)])
+        self.assertFalse(MapChunk.objects.filter(map=self.map, layer=0).exists())
+        self.assertEqual(tile_set(self.stored_grid()), set(self.tiles) - {(5, 40, '#aaaaaa', 0)})
+
+    def test_unchanged_chunk_is_not_rewritten(self):
+        edits = TileEdits()
+        edits.paint(1, 3, 0, '#00aa00')
+        version, changed = apply_map_edits(self.map.id, edits)
+        self.assertEqual(changed, [])
+        self.assertEqual(MapChunk.objects.get(map=self.map, layer=1, cx=0, cy=0).version, 0)
+        self.assertEqual(version, 1)
+
+    def test_version_conflict_writes_nothing(self):
+        edits = TileEdits()
+        edits.paint(1, 3, 0, '#ff0000')
+        apply_map_edits(self.map.id, edits, base_version=0)
+        edits.paint(1, 4, 0, '#ff0000')
+        with self.assertRaises(MapVersionConflict) as raised:
+            apply_map_edits(self.map.id, edits, base_version=0)
+        self.assertEqual(raised.exception.version, 1)
+        self.assertIn((4, 0, '#00aa00', 1), tile_set(self.stored_grid()))
+
+    def test_edit_view_reports_version_conflict(self):
+        # Called directly: the test client's middleware needs the SECRET_KEY settings.py leaves empty
+        body = {'base_version': 0, 'layers': [{'layer': 1, 'set': [{'x': 3, 'y': 0, 'color': '#ff0000'}]}]}
+        def post():
+            return edit_map(RequestFactory().post('/', json.dumps(body), content_type='application/json'), self.map.id)
+
+        response = post()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['version'], 1)
+
+        response = post()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.content)['version'], 1)
+
+
+class MapPayloadViewTests(TestCase):
+    # Views are called directly, as in MapEditTests
+    def setUp(self):
+        self.map = Map.objects.create(name='cached', width=64, height=32)
+        replace_map_chunks(self.map, MapGrid.from_tiles('cached', 64, 32, [(x, 31, '#00aa00', 1) for x in range(64)]))
+        # Ids are reused between tests, and the cache outlives them
+        map_payload_cache.invalidate(self.map.id)
+
+    def get(self, **headers):
+        return map_payload(RequestFactory().get('/', **headers), self.map.id)
+
+    def post(self, view, body, *args):
+        return view(RequestFactory().post('/', json.dumps(body), content_type='application/json'), *args)
+
+    def test_revalidation_with_etag(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        self.assertEqual(len(json.loads(response.content)['tiles']), 64)
+
+        # Weak comparison, so the strong form matches too
+        for if_none_match in (etag, etag.removeprefix('W/'), f'"other", {etag}', '*'):
+            with self.subTest(if_none_match=if_none_match):
+                response = self.get(HTTP_IF_NONE_MATCH=if_none_match)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_encoding_choice(self):
+        body = self.get().content
+        for accept_encoding, encoding in (('gzip', 'gzip'), ('gzip, deflate', 'gzip'), ('GZIP;q=0.5', 'gzip'),
+                                          ('gzip;q=0', None), ('deflate', None), ('', None)):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.get(HTTP_ACCEPT_ENCODING=accept_encoding)
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                self.assertEqual(gzip.decompress(response.content) if encoding else response.content, body)
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_brotli_preferred(self):
+        body = self.get().content
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), body)
+
+    def test_edit_changes_etag(self):
+        etag = self.get()['ETag']
+        edits = {'layers': [{'layer': 1, 'set': [{'x': 3, 'y': 10, 'color': '#ff0000'}]}]}
+        self.assertEqual(self.post(edit_map, edits, self.map.id).status_code, 200)
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn({'x': 3, 'y': 10, 'color': '#ff0000', 'layer': 1}, json.loads(response.content)['tiles'])
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_save_changes_etag(self):
+        etag = self.get()['ETag']
+        layers = [{'data': []}, {'data': [{'x': 1, 'y': 2, 'color': '#0000ff'}]}]
+        response = self.post(save_map, {'name': 'cached', 'width': 64, 'height': 32, 'layers': layers})
+        self.assertEqual(json.loads(response.content)['map_id'], self.map.id)
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_missing_map(self):
+        self.assertEqual(map_payload(RequestFactory().get('/'), self.map.id + 1).status_code, 404)
+
+
+class MetricsViewTests(SimpleTestCase):
+    async def scrape(self, rooms):
+        with mock.patch.dict(room_manager.rooms, rooms, clear=True):
+            return await metrics(RequestFactory().get('/'))
+
+    async def test_exposition_format(self):
+        room = GameState(5)
+        room.add_player('p', 1, 1)
+        for _ in range(2):
+            room.profiler.add('test_phase', 0.25)
+            room.profiler.end_tick()
+        response = await self.scrape({5: room})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], PROMETHEUS_CONTENT_TYPE)
+        lines = response.content.decode().splitlines()
+
+        self.assertIn('game_room_players{map="5"} 1', lines)
+        name = 'game_tick_phase_seconds'
+        labels = 'map="5",phase="test_phase"'
+        self.assertEqual([line for line in lines if 'phase="test_phase"' in line], [
+            f'{name}{{{labels},quantile="0.5"}} 0.25',
+            f'{name}{{{labels},quantile="0.99"}} 0.25',
+            f'{name}_sum{{{labels}}} 0.5',
+            f'{name}_count{{{labels}}} 2',
+            f'{name}_max{{{labels}}} 0.25',
+        ])
+
+        # Every sample follows the HELP and TYPE of its family
+        described = set()
+        for line in lines:
+            if line.startswith('# HELP '):
+                family = line.split()[2]
+            elif line.startswith('# TYPE '):
+                _, _, type_family, metric_type = line.split()
+                self.assertEqual(type_family, family)
+                self.assertIn(metric_type, ('gauge', 'counter', 'summary'))
+                described.add(family)
+            else:
+                match = re.fullmatch(r'([a-z_]+?)(_sum|_count)?(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? (\S+)', line)
+                self.assertIsNotNone(match, line)
+                self.assertIn(match[1], described, line)
+                float(match[5])
+
+    @override_settings(GAME_METRICS=False)
+    async def test_disabled(self):
+        self.assertEqual((await self.scrape({})).status_code, 404)
+
+
+class MapReloadTests(TestCase):
+    def setUp(self):
+        self.map = Map.objects.create(name='reloaded', width=64, height=32)
+        replace_map_chunks(self.map, MapGrid.from_tiles('reloaded', 64, 32, [(x, 31, '#00aa00', 1) for x in range(64)]))
+
+    async def start_room(self):
+        room = GameState(self.map.id)
+        await room.load_map_data()
+        connection = FakeConnection('viewer', JSON_CODEC, room.broadcaster.history, keyframe_interval=60)
+        room.broadcaster.add(connection)
+        return room, connection
+
+    async def paint(self, x, y):
+        edits = TileEdits()
+        edits.paint(1, x, y, '#ff0000')
+        return await sync_to_async(apply_map_edits)(self.map.id, edits)
+
+    def flaky_loader(self, failures):
+        """load_map_chunks failing its first `failures` calls; records the chunks each call asked for."""
+        calls = []
+
+        def load(map_id, keys):
+            keys = sorted(keys)
+            calls.append(keys)
+            if len(calls) <= failures:
+                raise RuntimeError("database unavailable")
+            return load_map_chunks(map_id, keys)
+        return load, calls
+
+    async def test_failed_reload_is_retried(self):
+        room, connection = await self.start_room()
+        version, changed = await self.paint(40, 20)
+        load, calls = self.flaky_loader(1)
+        with mock.patch('game_app.game_state.load_map_chunks', load), \
+                mock.patch('game_app.game_state.MAP_RELOAD_RETRY_DELAY', 0), \
+                self.assertLogs('game_app.game_state', 'WARNING'):
+            room.map_changed(version, changed)
+            await room.map_reload_task
+        # The chunks the failed load dropped are asked for again
+        self.assertEqual(calls, [changed, changed])
+        self.assertIn((40, 20, '#ff0000', 1), tile_set(room.map_data))
+        self.assertTrue(room.tile_index.occupancy[20, 40])
+        self.assertEqual(room.map_data.version, version)
+        self.assertEqual(room.pending_map_chunks, set())
+        update, = (json.loads(text) for text in connection.sent)
+        self.assertEqual((update['version'], [chunk['cx'] for chunk in update['chunks']]), (version, [1]))
+
+    async def test_notice_after_giving_up_is_not_ignored(self):
+        room, connection = await self.start_room()
+        version, changed = await self.paint(40, 20)
+        load, calls = self.flaky_loader(MAP_RELOAD_RETRIES + 1)
+        with mock.patch('game_app.game_state.load_map_chunks', load), \
+                mock.patch('game_app.game_state.MAP_RELOAD_RETRY_DELAY', 0), \
+                self.assertLogs('game_app.game_state', 'WARNING'):
+            room.map_changed(version, changed)
+            await room.map_reload_task
+            self.assertEqual(len(calls), MAP_RELOAD_RETRIES + 1)
+            self.assertNotIn((40, 20, '#ff0000', 1), tile_set(room.map_data))
+            self.assertEqual(connection.sent, [])
+
+            # Another connection passing the same notice on starts a new reload, which succeeds
+            room.map_changed(version, changed)
+            await room.map_reload_task
+        self.assertIn((40, 20, '#ff0000', 1), tile_set(room.map_data))
+        self.assertEqual(len(connection.sent), 1)
+
+
+def make_player(rng, skeleton=True):
+    """A quantized player record, as quantize_player builds them."""
+    player = {
+        'x': rng.randrange(-5000, 50000), 'y': rng.randrange(0, 25000),
+        'speed': 3000, 'angle': 0, 'flags': 0, 'mouse_position': [0, 0],
+        'anim': [2, 0, 0], 'input_seq': 0
+    }
+    if skeleton:
+        player['pivot_points'] = {joint: [rng.randrange(-2000, 2000), rng.randrange(-2000, 2000)]
+                                  for joint in JOINT_NAMES}
+    return player
+
+def step_player(player, rng):
+    """`player` one tick later, with a few of its fields changed."""
+    player = dict(player)
+    player['x'] += rng.choice((0, 0, 150, -150))
+    if rng.random() < 0.3:
+        player['speed'] = rng.randrange(3000, 15000)
+        player['angle'] = rng.randrange(-700, 700)
+        player['flags'] = rng.randrange(16)
+    if rng.random() < 0.2:
+        player['mouse_position'] = [rng.randrange(-800, 800), rng.randrange(-600, 600)]
+    if rng.random() < 0.3:
+        player['anim'] = [3 | CLIP_BLENDED, rng.randrange(1000), 500, rng.randrange(1, 1000), 2, 0, 1000]
+    elif rng.random() < 0.3:
+        player['anim'] = [2, rng.randrange(1000), rng.randrange(1000)]
+    player['input_seq'] += rng.choice((0, 1))
+    if 'pivot_points' in player:
+        player['pivot_points'] = dict(player['pivot_points'])
+        for joint in rng.sample(JOINT_NAMES, rng.randrange(4)):
+            player['pivot_points'][joint] = [rng.randrange(-2000, 2000), rng.randrange(-2000, 2000)]
+    return player
+
+def decode_binary_frame(data, table):
+    """A BinaryCodec frame in the shape of a JSON one, as frontend/src/game/wireCodec.jsx decodes it.
+
+    `table` maps player indices to ids and is kept across frames.
+    """
+    offset = 0
+
+    def read(fmt):
+        nonlocal offset
+        values = struct.unpack_from('<' + fmt, data, offset)
+        offset += struct.calcsize('<' + fmt)
+        return values
+
+    frame_type, seq, base = read('BII')
+    released, = read('H')
+    for index in read(f'{released}H'):
+        del table[index]
+    assigned, = read('H')
+    for _ in range(assigned):
+        index, length = read('HB')
+        table[index] = read(f'{length}s')[0].decode('utf-8')
+
+    players = {}
+    count, = read('H')
+    for _ in range(count):
+        index, mask = read('HH')
+        player = {}
+        for field, name, fmt in ((FIELD_X, 'x', 'i'), (FIELD_Y, 'y', 'i'), (FIELD_SPEED, 'speed', 'h'),
+                                 (FIELD_ANGLE, 'angle', 'h'), (FIELD_FLAGS, 'flags', 'B')):
+            if mask & field:
+                player[name], = read(fmt)
+        if mask & FIELD_MOUSE:
+            player['mouse_position'] = list(read('hh'))
+        if mask & FIELD_PIVOTS:
+            joint_mask, = read('H')
+            player['pivot_points'] = {joint: list(read('hh')) for bit, joint in enumerate(JOINT_NAMES)
+                                      if joint_mask & (1 << bit)}
+        if mask & FIELD_ANIM:
+            player['anim'] = list(read('Bhh'))
+            if player['anim'][0] & CLIP_BLENDED:
+                player['anim'] += read('hBhh')
+        if mask & FIELD_INPUT_SEQ:
+            player['input_seq'], = read('I')
+        players[table[index]] = player
+
+    removed, = read('H')
+    frame = {'type': 'key' if frame_type == FRAME_KEY else 'delta', 'seq': seq, 'players': players,
+             'removed': [table[index] for index in read(f'{removed}H')], 'present': set(table.values())}
+    if frame_type != FRAME_KEY:
+        frame['base'] = base
+    assert offset == len(data), "trailing bytes"
+    return frame
+
+def merge_player(base, changes):
+    if base is None:
+        return changes
+    merged = dict(base, **changes)
+    if 'pivot_points' in changes:
+        merged['pivot_points'] = dict(base.get('pivot_points', {}), **changes['pivot_points'])
+    return merged
+
+class ClientState:
+    """Applies frames the way frontend/src/game/stateDecoder.jsx does, keeping quantized players."""
+
+    def __init__(self):
+        self.snapshots = {}
+
+    def apply(self, frame):
+        if frame['type'] == 'key':
+            players = dict(frame['players'])
+        else:
+            base = self.snapshots[frame['base']]
+            players = dict(base)
+            for player_id, changes in frame['players'].items():
+                players[player_id] = merge_player(base.get(player_id), changes)
+            for player_id in frame.get('removed', ()):
+                players.pop(player_id, None)
+            # Binary frames list who is still in the game, covering players whose index was released
+            if 'present' in frame:
+                players = {player_id: player for player_id, player in players.items() if player_id in frame['present']}
+        self.snapshots[frame['seq']] = players
+        return players
+
+class FakeConnection:
+    """What StateBroadcaster needs of a GameConsumer; keeps what it is sent."""
+
+    def __init__(self, player_id, codec, history, keyframe_interval):
+        self.player_id = player_id
+        self.codec = codec
+        self.delta_encoder = DeltaEncoder(history, keyframe_interval)
+        self.sent = []
+
+    async def send(self, text_data=None, bytes_data=None):
+        self.sent.append(bytes_data if text_data is None else text_data)
+
+
+# Solid tiles drawn as rows of the map, top row first
+COLLISION_MAP = [
+    '............',
+    '.....#......',
+    '............',
+    '.#.....##...',
+    '.#......#..#',
+    '############',
+]
+
+
+class TileIndexTests(SimpleTestCase):
+    """Queries through TileIndex against scanning every tile, as the game did before the index."""
+
+    def setUp(self):
+        self.tiles = [(x, y) for y, row in enumerate(COLLISION_MAP) for x, cell in enumerate(row) if cell == '#']
+        self.game_state = GameState()
+        self.game_state.set_map_data(MapGrid.from_tiles('collision', len(COLLISION_MAP[0]), len(COLLISION_MAP),
+                                                        [(x, y, '#777777', 1) for x, y in self.tiles]))
+        self.xs = [x / 4 for x in range(-4, 4 * len(COLLISION_MAP[0]) + 4)]
+
+    def scan(self, left, right, top, bottom):
+        return [(x, y) for x, y in self.tiles
+                if CollisionComponent.check_box_collision(left, right, top, bottom, x, x + 1, y, y + 1)]
+
+    def scan_ground_level(self, x):
+        height = len(COLLISION_MAP)
+        highest_ground = 0
+        for tile_x, tile_y in self.tiles:
+            tile_top = height - tile_y - 1
+            if x < tile_x + 1 and x + 1 > tile_x and highest_ground + self.game_state.collision_buffer <= tile_top:
+                highest_ground = tile_top - 1
+        return highest_ground
+
+    def test_ground_level(self):
+        for x in self.xs:
+            with self.subTest(x=x):
+                self.assertEqual(self.game_state.get_ground_level(x), self.scan_ground_level(x))
+        self.assertEqual(self.game_state.get_ground_levels(np.array(self.xs)).tolist(),
+                         [self.scan_ground_level(x) for x in self.xs])
+
+    def test_tiles_in_box(self):
+        tile_index = self.game_state.tile_index
+        for left, right, top, bottom in ((0.5, 1.5, 3.5, 5.5), (1, 2, 3, 5), (0.9, 2.1, 2.9, 5.1), (-3, 20, -3, 20),
+                                         (5, 6, 1, 2), (4.99, 5.01, 0.5, 1.01), (6, 9, 3, 4), (2, 5, 0, 3)):
+            with self.subTest(box=(left, right, top, bottom)):
+                expected = sorted(self.scan(left, right, top, bottom))
+                self.assertEqual(tile_index.tiles_in_box(left, right, top, bottom), expected)
+                self.assertEqual(tile_index.tiles_in_box(left, right, top, bottom, reverse=True), expected[::-1])
+
+    def test_horizontal_collision(self):
+        height = len(COLLISION_MAP)
+        collision = self.game_state.collision_component
+        for y in (1, 1.5, 2, 2.5, 4.1):
+            for x in self.xs:
+                for step in (0.3, -0.3, 1.7, -1.7):
+                    with self.subTest(x=x, y=y, step=step):
+                        player = {'x': x, 'y': y}
+                        blocking = self.scan(x + step, x + step + 1, height - y - 2, height - y)
+                        if not blocking:
+                            expected = x + step
+                        elif step > 0:
+                            # The nearest tile in the direction of travel stops the player
+                            tile_x = min(tile_x for tile_x, _ in blocking)
+                            expected = tile_x - 1 if x < tile_x else tile_x + 1
+                        else:
+                            tile_x = max(tile_x for tile_x, _ in blocking)
+                            expected = tile_x - 1 if x < tile_x else tile_x + 1
+                        self.assertEqual(collision.check_horizontal_collision(player, x + step, y), expected)
+
+    def test_vertical_collision(self):
+        height = len(COLLISION_MAP)
+        buffer = self.game_state.collision_buffer
+        collision = self.game_state.collision_component
+        # A tile only stops the player when it spans the whole body, which needs tiles taller than the player
+        for tile_height in (1, 3):
+            self.game_state.tile_height = tile_height
+            self.game_state.tile_index = TileIndex.from_grid(self.game_state.map_data, 1, tile_height)
+            for x in self.xs:
+                for y in (0.5, 1, 1.05, 2, 3.5):
+                    for step in (0.4, -0.4, -1.2, 1.2):
+                        with self.subTest(tile_height=tile_height, x=x, y=y, step=step):
+                            new_y = y + step
+                            bottom = height - new_y
+                            # The old scan's test: tile bottom below the collision point, tile top above the player's top
+                            blocking = [(tile_x, tile_y) for tile_x, tile_y in self.tiles
+                                        if x < tile_x + 1 and x + 1 > tile_x and
+                                        bottom - buffer < tile_y + tile_height and bottom - 2 > tile_y]
+                            if not blocking:
+                                expected = new_y
+                            elif step < 0:
+                                # Leftmost column first, then its topmost tile
+                                _, tile_y = min(blocking)
+                                expected = height - (tile_y + tile_height) + buffer
+                            else:
+                                _, tile_y = min(blocking)
+                                expected = height - tile_y - 2
+                            actual = collision.check_vertical_collision({'x': x, 'y': y}, x, new_y)
+                            self.assertEqual(actual, expected)
+
+class DeltaRoundTripTests(SimpleTestCase):
+    """Frames StateBroadcaster sends, decoded as clients decode them, give back each tick's snapshot."""
+
+    async def run_ticks(self, codec, ack_delays, skeletons=True):
+        """One client per ack delay (None never acks).
+
+        Returns the frame types each client was sent and the player indices
+        of every tick. Without `skeletons`, players carry animation
+        parameters instead, as with GAME_POSE_REPLICATION = 'parameters'.
+        """
+        rng = random.Random(1)
+        broadcaster = StateBroadcaster()
+        connections = [FakeConnection(f'client-{i}', codec, broadcaster.history, keyframe_interval=20)
+                       for i in range(len(ack_delays))]
+        for connection in connections:
+            broadcaster.add(connection)
+        clients = [ClientState() for _ in connections]
+        tables = [{} for _ in connections]
+        frame_types = [[] for _ in connections]
+        indices = {}
+
+        snapshot = {player_id: make_player(rng, skeletons) for player_id in ('a', 'b', 'c')}
+        for seq in range(1, 61):
+            snapshot = {player_id: step_player(player, rng) for player_id, player in snapshot.items()}
+            if seq == 10:
+                snapshot['d'] = make_player(rng, skeletons)
+            if seq == 15:
+                del snapshot['b']
+            if seq == 16:
+                snapshot['e'] = make_player(rng, skeletons)
+            if seq == 30:
+                del snapshot['a'], snapshot['d']
+                snapshot['b'] = make_player(rng, skeletons)  # rejoins under the same id
+            await broadcaster.broadcast(seq, snapshot)
+            indices[seq] = dict(broadcaster.player_table.indices)
+
+            expected = {player_id: project_player(player, LOD_FULL) for player_id, player in snapshot.items()}
+            for i, (connection, client, delay) in enumerate(zip(connections, clients, ack_delays)):
+                payload = connection.sent.pop()
+                if codec.binary:
+                    frame = decode_binary_frame(payload, tables[i])
+                else:
+                    frame = json.loads(payload)
+                frame_types[i].append(frame['type'])
+                self.assertEqual(client.apply(frame), expected, f"client {i} at seq {seq}")
+                if delay is not None and seq > delay:
+                    connection.delta_encoder.ack(seq - delay)
+        return frame_types, indices
+
+    async def test_json_frames_rebuild_snapshots(self):
+        for skeletons in (True, False):
+            with self.subTest(skeletons=skeletons):
+                frame_types, _ = await self.run_ticks(JSON_CODEC, (0, 3, None), skeletons)
+                self.assertEqual(frame_types[0].count('key'), 3)
+                self.assertGreater(frame_types[1].count('delta'), 40)
+                # Without acks there is no baseline, so every frame is a keyframe
+                self.assertEqual(set(frame_types[2]), {'key'})
+
+    async def test_binary_frames_rebuild_snapshots(self):
+        for skeletons in (True, False):
+            with self.subTest(skeletons=skeletons):
+                frame_types, indices = await self.run_ticks(BINARY_CODEC, (0, 3, None), skeletons)
+                self.assertGreater(frame_types[1].count('delta'), 40)
+                # 'e' joins the tick after 'b' leaves and takes over its index; clients
+                # whose baseline still has 'b' must not mistake one for the other
+                self.assertEqual(indices[16]['e'], indices[14]['b'])
+                # 'b' rejoins under a released index in the same tick others leave
+                self.assertIn(indices[30]['b'], (indices[29]['a'], indices[29]['d']))
+
+    def test_binary_record_fields_round_trip(self):
+        player = make_player(random.Random(2))
+        player['anim'] = [3 | CLIP_BLENDED, 250, 500, 750, 2, 0, 1000]
+        player['input_seq'] = 2 ** 32 - 1
+        # Changes carry only some fields and joints
+        changes = {'x': -7, 'pivot_points': {'neck': [1, -1], 'r_toe': [-32768, 32767]}}
+        broadcaster = StateBroadcaster()
+        broadcaster.player_table.update({'p': player})
+        for record in (player, changes):
+            frame = {'type': 'key', 'seq': 1, 'players': {'p': record}, 'entered': ['p']}
+            payload = BINARY_CODEC.encode_frame(frame, broadcaster.player_table)
+            self.assertEqual(decode_binary_frame(payload, {})['players'], {'p': record})
+
+
+class InterestRoundTripTests(SimpleTestCase):
+    """A player walking away from a client and back, decoded as stateDecoder.jsx decodes it.
+
+    The walker goes from the viewer's position out past the view box and
+    back, half a tile per tick, with the default InterestManager radii:
+    full detail within 16 tiles, clips within 32 and positions within 48,
+    each left only 2 tiles (8 for the view) past its edge.
+    """
+
+    async def walk(self, codec, skeletons):
+        """(dx in tiles, LOD or None, decoded record or None) per tick, after checking each record."""
+        rng = random.Random(3)
+        broadcaster = StateBroadcaster(interest=InterestManager())
+        connection = FakeConnection('v', codec, broadcaster.history, keyframe_interval=20)
+        broadcaster.add(connection)
+        client = ClientState()
+        table = {}
+        viewer = dict(make_player(rng, skeletons), x=100000, y=5000)
+        walker = make_player(rng, skeletons)
+        dxs = [tick / 2 for tick in range(121)] + [60 - tick / 2 for tick in range(1, 121)]
+        walkers = {}
+        seen = []
+        for seq, dx in enumerate(dxs, 1):
+            viewer = dict(step_player(viewer, rng), x=100000, y=5000)
+            walker = dict(step_player(walker, rng), x=100000 + round(dx * 100), y=5000)
+            walkers[seq] = walker
+            await broadcaster.broadcast(seq, {'v': viewer, 'w': walker})
+            payload = connection.sent.pop()
+            frame = decode_binary_frame(payload, table) if codec.binary else json.loads(payload)
+            players = client.apply(frame)
+            self.assertEqual(players['v'], project_player(viewer, LOD_FULL))
+
+            record = players.get('w')
+            lod = None if record is None else (record['flags'] >> LOD_SHIFT) & 3
+            self.assertEqual(lod, (connection.delta_encoder.view or {}).get('w'), f"seq {seq}")
+            if record is not None:
+                # Positions are only refreshed on the first tick of every interval
+                interval = broadcaster.history.position_interval
+                source = walkers[(seq - 1) // interval * interval + 1] if lod == LOD_POSITION else walker
+                expected = project_player(source, lod)
+                # Fields of other tiers the client still holds are stale, and ignored at this LOD
+                self.assertEqual({field: record[field] for field in expected}, expected, f"seq {seq}")
+                self.assertLessEqual(set(frame['players'].get('w', {})), set(expected), f"seq {seq}")
+            seen.append((dx, lod, record))
+            if seq > 2:
+                connection.delta_encoder.ack(seq - 2)
+        return seen
+
+    def check_tiers(self, seen, skeletons):
+        outbound, inbound = seen[:121], seen[121:]
+        # Walking out, each tier holds until its edge plus the margin
+        self.assertEqual(max(dx for dx, lod, _ in outbound if lod == LOD_FULL), 18)
+        self.assertEqual(max(dx for dx, lod, _ in outbound if lod == LOD_CLIP), 34)
+        self.assertEqual(max(dx for dx, lod, _ in outbound if lod == LOD_POSITION), 56)
+        # Walking back, each is only entered at its edge
+        self.assertEqual(max(dx for dx, lod, _ in inbound if lod is not None), 48)
+        self.assertEqual(max(dx for dx, lod, _ in inbound if lod in (LOD_FULL, LOD_CLIP)), 32)
+        self.assertEqual(max(dx for dx, lod, _ in inbound if lod == LOD_FULL), 16)
+        self.assertEqual([lod for _, lod, _ in seen if lod is not None][-1], LOD_FULL)
+        if skeletons:
+            # A demoted player keeps its last skeleton on the client, which
+            # the LOD says to ignore; the one it gets on promotion is current
+            self.assertIn('pivot_points', next(record for _, lod, record in outbound if lod == LOD_CLIP))
+        # Leaving the view removes the player altogether
+        self.assertIsNone(outbound[-1][2])
+
+    async def test_json_frames_at_each_lod(self):
+        for skeletons in (True, False):
+            with self.subTest(skeletons=skeletons):
+                self.check_tiers(await self.walk(JSON_CODEC, skeletons), skeletons)
+
+    async def test_binary_frames_at_each_lod(self):
+        for skeletons in (True, False):
+            with self.subTest(skeletons=skeletons):
+                self.check_tiers(await self.walk(BINARY_CODEC, skeletons), skeletons)
+
+
+# Shared with frontend/scripts/check-prediction.mjs
+MOVEMENT_STEPS_FILE = os.path.join(os.path.dirname(__file__), 'testdata', 'movement_steps.json')
+
+class MovementStepTests(SimpleTestCase):
+    """Pins the movement step to recorded values that the client's prediction must also reproduce.
+
+    `npm run check:prediction` in frontend/ replays the same steps through
+    stepPlayer and compares its results with `expected`, bit for bit. After
+    an intended change to the step, rerun this test with UPDATE_MOVEMENT_STEPS=1
+    to record the new values, then change prediction.jsx until the check passes.
+    """
+
+    def replay(self, case):
+        tiles = [(x, y, '#654321', 1) for x, y in case['map']['solid']]
+        game_state = GameState()
+        game_state.set_map_data(MapGrid.from_tiles('steps', case['map']['width'], case['map']['height'], tiles))
+        start = case['start']
+        game_state.add_player('p', start['x'], start['y'])
+        player = game_state.players['p']
+        self.assertEqual({key: player[key] for key in ('x', 'y', 'speed', 'angle')},
+                         {key: start[key] for key in ('x', 'y', 'speed', 'angle')})
+        results = []
+        for move, running, crouching in case['steps']:
+            game_state.movement_component.update_player_position('p', move, running, crouching)
+            results.append([player['x'], player['speed'], player['angle']])
+        return results
+
+    def test_steps_match_recorded_values(self):
+        with open(MOVEMENT_STEPS_FILE) as f:
+            case = json.load(f)
+        results = self.replay(case)
+        if os.environ.get('UPDATE_MOVEMENT_STEPS'):
+            case.update(params=MOVEMENT_PARAMS, expected=results)
+            with open(MOVEMENT_STEPS_FILE, 'w') as f:
+                json.dump(case, f, separators=(',', ':'))
+            return
+        self.assertEqual(case['params'], MOVEMENT_PARAMS, "update the recorded steps with UPDATE_MOVEMENT_STEPS=1")
+        self.assertEqual(len(results), len(case['expected']))
+        for step, (result, expected) in enumerate(zip(results, case['expected'])):
+            self.assertEqual(result, expected, f"step {step}")
+
+    def test_steps_cover_collisions_and_map_edges(self):
+        with open(MOVEMENT_STEPS_FILE) as f:
+            case = json.load(f)
+        xs = [case['start']['x']] + [x for x, _, _ in case['expected']]
+        stops = {(move, x) for (move, _, _), previous, (x, speed, _) in zip(case['steps'], xs, case['expected'])
+                 if move != 0 and speed > 0 and x == previous}
+        # Held back by the map's right edge, and by a wall on the way left
+        self.assertIn((1, case['map']['width'] - MOVEMENT_PARAMS['player_width']), stops)
+        self.assertIn((-1, 4), stops)
+        # The player leans both ways
+        angles = [angle for _, _, angle in case['expected']]
+        self.assertLess(min(angles), 0)
+        self.assertGreater(max(angles), 0)
+
+
+# Each of these used to fail the tick that applied it, or the broadcast after
+MALFORMED_INPUTS = [
+    {'move': 'x'},
+    {'move': None},
+    {'move': float('nan')},
+    {'running': 'yes'},
+    {'jump': 1},
+    {'player_mouse_position': 5},
+    {'player_mouse_position': {'x': 'a', 'y': 1}},
+    {'player_mouse_position': {'x': float('inf'), 'y': 1}},
+    {'player_mouse_position': {'x': 1}},
+    {'seq': 'abc', 'move': 1},
+    {'seq': -1, 'move': 1},
+    {'seq': 2 ** 40, 'move': 1},
+    {'seq': 1.5, 'move': 1},
+    {'ack': 'abc'},
+]
+
+
+class InputValidationTests(SimpleTestCase):
+    def test_malformed_json_inputs_are_rejected(self):
+        for data in MALFORMED_INPUTS:
+            with self.subTest(data=data):
+                with self.assertRaises(InputDecodeError):
+                    decode_input(json.dumps(data))
+
+    def test_client_inputs_are_accepted(self):
+        for data in ({'seq': 1, 'move': -1, 'running': True, 'crouching': False, 'ack': None},
+                     {'ack': 2 ** 32 - 1, 'crouching': True},
+                     {'player_mouse_position': {'x': 12.5, 'y': -3}},
+                     {'jump': True},
+                     {'guard': False}):
+            with self.subTest(data=data):
+                self.assertEqual(decode_input(json.dumps(data)), data)
+
+    async def test_room_keeps_ticking_after_a_failing_tick(self):
+        game_state = GameState()
+        floor = [(x, y, '#654321', 1) for x in range(20) for y in (8, 9)]
+        game_state.set_map_data(MapGrid.from_tiles('floor', 20, 10, floor))
+        game_state.add_player('p', 5, 10)
+        # Queued directly, as if decode_input had let them through
+        for data in MALFORMED_INPUTS:
+            game_state.queue_input('p', data)
+        await game_state.start_physics_update()
+        try:
+            await asyncio.sleep(0.1)
+            metrics = game_state.get_tick_metrics()
+            self.assertGreater(metrics['failed_ticks'], 0)
+            self.assertGreater(metrics['ticks'], metrics['failed_ticks'])
+            self.assertFalse(game_state.physics_task.done())
+            game_state.queue_input('p', {'seq': 1, 'move': 1})
+            await asyncio.sleep(0.1)
+            self.assertGreater(game_state.players['p']['x'], 5)
+            self.assertEqual(game_state.players['p']['input_seq'], 1)
+        finally:
+            await game_state.stop_physics_update()
+
+
+class InputQueueTests(SimpleTestCase):
+    def make_queue(self, **kwargs):
+        # Refills are too slow to matter unless a test moves the clock back
+        return InputQueue(max_rate=0.001, **kwargs)
+
+    def test_every_message_takes_a_token(self):
+        queue = self.make_queue(burst=3)
+        mouse = {'player_mouse_position': {'x': 1, 'y': 2}}
+        for data in (mouse, {'move': 1, 'jump': False}, {}):
+            self.assertTrue(queue.push(data))
+        for data in (mouse, {'move': 1, 'jump': False}, {}, {'guard': True}, {'crouching': False}):
+            self.assertFalse(queue.push(data))
+        self.assertEqual(queue.dropped, 5)
+        self.assertEqual(len(queue.drain()), 3)
+
+    def test_jumps_and_crouch_changes_skip_the_bucket(self):
+        queue = self.make_queue(burst=0)
+        self.assertTrue(queue.push({'jump': True}))
+        self.assertTrue(queue.push({'crouching': True}))
+        # Already crouching: nothing changes, so it waits for a token like the rest
+        self.assertFalse(queue.push({'crouching': True, 'seq': 1, 'move': 1}))
+        self.assertTrue(queue.push({'crouching': False, 'seq': 2, 'move': 1}))
+        self.assertEqual([data.get('seq') for data in queue.drain()], [None, None, 2])
+
+    def test_tokens_refill_with_time(self):
+        queue = InputQueue(max_rate=10, burst=2)
+        self.assertTrue(queue.push({}))
+        self.assertTrue(queue.push({}))
+        self.assertFalse(queue.push({}))
+        queue.last_refill -= 0.25
+        self.assertTrue(queue.push({}))
+        self.assertTrue(queue.push({}))
+        self.assertFalse(queue.push({}))
+        # Idle time refills up to the burst, not beyond
+        queue.last_refill -= 60
+        self.assertEqual(sum(queue.push({}) for _ in range(5)), 2)
+
+    def test_full_queue_drops_oldest_other_message_first(self):
+        queue = InputQueue(burst=100, max_pending=3)
+        queue.push({'seq': 1, 'move': 1})
+        queue.push({'jump': True})
+        queue.push({'seq': 2, 'move': 1})
+        queue.push({'seq': 3, 'move': 1})
+        self.assertEqual(queue.drain(), [{'jump': True}, {'seq': 2, 'move': 1}, {'seq': 3, 'move': 1}])
+        self.assertEqual(queue.dropped, 1)
+
+    def test_full_queue_stays_bounded_by_transitions(self):
+        queue = self.make_queue(burst=0, max_pending=4)
+        for i in range(100):
+            self.assertTrue(queue.push({'crouching': i % 2 == 0}))
+        inputs = queue.drain()
+        self.assertEqual(len(inputs), 4)
+        # The newest survive, so the last crouch state sent is the one applied
+        self.assertEqual(inputs[-1], {'crouching': False})
+
+    def test_drain_hands_out_one_step_per_tick_plus_saved_ones(self):
+        queue = InputQueue(burst=100, max_steps=4)
+        steps = [{'seq': seq, 'move': 1} for seq in range(1, 8)]
+        for data in steps:
+            queue.push(data)
+        inputs = queue.drain()
+        # Four saved steps plus this tick's, at most max_steps; the rest keep only their seq
+        self.assertEqual([data['seq'] for data in inputs], list(range(1, 8)))
+        self.assertEqual(sum('move' in data for data in inputs), 4)
+        self.assertEqual(queue.dropped, 3)
+        # The next tick has budget for one step again, and idle ticks save up to max_steps
+        for data in ({'seq': 8, 'move': 1}, {'seq': 9, 'move': 1}):
+            queue.push(data)
+        self.assertEqual(['move' in data for data in queue.drain()], [True, False])
+        for _ in range(10):
+            self.assertEqual(queue.drain(), [])
+        for seq in range(10, 16):
+            queue.push({'seq': seq, 'move': -1})
+        self.assertEqual(sum('move' in data for data in queue.drain()), 4)
+
+
+class PoseReplicationSettingTests(SimpleTestCase):
+    def test_known_modes_are_accepted(self):
+        for mode in POSE_REPLICATION_MODES:
+            with self.subTest(mode=mode), override_settings(GAME_POSE_REPLICATION=mode):
+                apps.get_app_config('game_app').ready()
+                bake_poses = GameState().animation_component.bake_poses
+                self.assertEqual(bake_poses, mode != POSE_REPLICATION_PARAMETERS)
+
+    def test_unknown_mode_stops_startup(self):
+        for mode in ('params', 'Skeleton', None):
+            with self.subTest(mode=mode), override_settings(GAME_POSE_REPLICATION=mode):
+                with self.assertRaises(ImproperlyConfigured):
+                    apps.get_app_config('game_app').ready()
+
+
+class FakeClock:
+    """Stands in for asyncio in tick_scheduler: the loop's clock, and sleeps that only move it."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def get_running_loop(self):
+        return self
+
+    def time(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += seconds
+
+
+class TickSchedulerTests(SimpleTestCase):
+    # Binary fractions, so every time below is exact
+    INTERVAL = 0.25
+    DURATION = 0.0625
+
+    async def run_ticks(self, durations, policy=TickScheduler.CATCH_UP, max_catch_up=5):
+        """Runs one tick per duration, each advancing the clock by it; returns their start times and the metrics."""
+        clock = FakeClock()
+        starts = []
+
+        async def tick():
+            if len(starts) == len(durations):
+                raise asyncio.CancelledError
+            starts.append(clock.now)
+            clock.now += durations[len(starts) - 1]
+
+        scheduler = TickScheduler(tick, self.INTERVAL, policy, max_catch_up)
+        with mock.patch.object(tick_scheduler, 'asyncio', clock):
+            with self.assertRaises(asyncio.CancelledError):
+                await scheduler.run()
+        return starts, scheduler.metrics.snapshot()
+
+    def stalled(self, tick, duration, count=30):
+        durations = [self.DURATION] * count
+        durations[tick] = duration
+        return durations
+
+    async def test_ticks_keep_to_their_deadlines(self):
+        starts, metrics = await self.run_ticks([self.DURATION] * 20)
+        # The time a tick takes does not push back the next one
+        self.assertEqual(starts, [n * self.INTERVAL for n in range(20)])
+        self.assertEqual((metrics['skipped_ticks'], metrics['catch_up_ticks'], metrics['max_lateness']), (0, 0, 0))
+
+    async def test_catch_up_after_a_stall(self):
+        # Tick 2 starts at 0.5 and takes 4.5 intervals
+        starts, metrics = await self.run_ticks(self.stalled(2, 4.5 * self.INTERVAL))
+        # The three missed ticks run back to back, then ticks are on their deadlines again
+        self.assertEqual(starts[3:9], [1.625, 1.6875, 1.75, 1.8125, 1.875, 2.0])
+        self.assertEqual(starts[9:], [2.25 + n * self.INTERVAL for n in range(21)])
+        # So by any later time as many ticks have run as without the stall
+        self.assertEqual(sum(start < 4 for start in starts), 4 / self.INTERVAL)
+        self.assertEqual(metrics['skipped_ticks'], 0)
+        self.assertEqual(metrics['catch_up_ticks'], 4)
+        self.assertEqual(metrics['max_lateness'], 0.875)
+
+    async def test_catch_up_is_clamped(self):
+        # A stall of 10 intervals leaves 9 ticks behind; only max_catch_up of them are run
+        starts, metrics = await self.run_ticks(self.stalled(2, 10 * self.INTERVAL), max_catch_up=5)
+        self.assertEqual(metrics['skipped_ticks'], 4)
+        self.assertEqual(sum(start < 4 for start in starts), 4 / self.INTERVAL - 4)
+        self.assertEqual(starts[10:], [3.5 + n * self.INTERVAL for n in range(20)])
+        self.assertLessEqual(metrics['max_lateness'], 5 * self.INTERVAL)
+
+    async def test_drop_skips_every_missed_tick(self):
+        starts, metrics = await self.run_ticks(self.stalled(2, 10 * self.INTERVAL), policy=TickScheduler.DROP)
+        self.assertEqual(starts[3:], [3.0 + n * self.INTERVAL for n in range(27)])
+        self.assertEqual(metrics['skipped_ticks'], 9)
+        self.assertEqual(metrics['catch_up_ticks'], 0)
+
+    async def test_failing_tick_keeps_the_schedule(self):
+        clock = FakeClock()
+        starts = []
+
+        async def tick():
+            if len(starts) == 6:
+                raise asyncio.CancelledError
+            starts.append(clock.now)
+            clock.now += self.DURATION
+            if len(starts) == 2:
+                raise ValueError("bad input")
+
+        scheduler = TickScheduler(tick, self.INTERVAL)
+        with mock.patch.object(tick_scheduler, 'asyncio', clock), self.assertLogs('game_app.tick_scheduler', 'ERROR'):
+            with self.assertRaises(asyncio.CancelledError):
+                await scheduler.run()
+        self.assertEqual(starts, [n * self.INTERVAL for n in range(6)])
+        self.assertEqual(scheduler.metrics.failed_ticks, 1)
+
+
+class RoomWorkerTests(SimpleTestCase):
+    async def collect(self, connection, seconds):
+        """Snapshots the worker sends over `seconds`, as (map_id, {player_id: input_seq}) pairs."""
+        loop = asyncio.get_running_loop()
+        snapshots = []
+        end = loop.time() + seconds
+        while loop.time() < end:
+            while connection.poll():
+                for kind, map_id, *args in connection.recv():
+                    if kind == 'snapshot':
+                        snapshots.append((map_id, {player_id: record['input_seq']
+                                                   for player_id, record in args[-1].items()}))
+            await asyncio.sleep(0.01)
+        return snapshots
+
+    async def test_map_load_does_not_hold_up_other_rooms(self):
+        floor = MapGrid.from_tiles('floor', 20, 10, [(x, y, '#654321', 1) for x in range(20) for y in (8, 9)])
+        released = asyncio.Event()
+
+        async def slow_load(room):
+            await released.wait()
+            room.set_map_data(floor)
+
+        parent, child = multiprocessing.Pipe()
+        with mock.patch.object(GameState, 'load_map_data', slow_load):
+            worker = asyncio.create_task(serve_rooms(child))
+            try:
+                parent.send([('open', 1, floor), ('add', 1, 'a', 2, 10),
+                             ('open', 2, None), ('add', 2, 'b', 3, 10), ('input', 2, 'b', {'seq': 1, 'move': 1})])
+                await self.collect(parent, 0.1)
+                parent.send([('input', 1, 'a', {'seq': 1, 'move': 1})])
+                snapshots = await self.collect(parent, 0.2)
+                # Map 1 takes its input while map 2 loads, and map 2's commands wait for its room
+                self.assertEqual({map_id for map_id, _ in snapshots}, {1})
+                self.assertEqual(snapshots[-1], (1, {'a': 1}))
+
+                released.set()
+                snapshots = await self.collect(parent, 0.2)
+                self.assertIn((2, {'b': 1}), snapshots)
+            finally:
+                parent.send([('stop',)])
+                await worker
+                parent.close()
+                child.close()
@@ -0,0 +1,208 @@
+# /backend/game_app/tick_profiler.py
+import asyncio
+import functools
+import time
+import numpy as np
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+QUANTILES = (0.5, 0.99)
+
+class Samples:
+    """The last `size` values of one per-tick series, plus running totals.
+
+    Recording is a single array store; percentiles are only computed when
+    the series is read, so ticks pay nothing for them while nobody scrapes.
+    """
+
+    def __init__(self, size=1024):
+        self.values = np.zeros(size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value):
+        self.values[self.count % len(self.values)] = value
+        self.count += 1
+        self.total += value
+
+    def recent(self):
+        return self.values[:min(self.count, len(self.values))].copy()
+
+    def summary(self):
+        recent = self.recent()
+        if len(recent):
+            quantiles = np.quantile(recent, QUANTILES).tolist()
+            maximum = float(recent.max())
+        else:
+            quantiles = [0.0] * len(QUANTILES)
+            maximum = 0.0
+        return {'quantiles': dict(zip(QUANTILES, quantiles)), 'max': maximum,
+                'sum': self.total, 'count': self.count}
+
+    def export(self):
+        return self.recent(), self.count, self.total
+
+    @classmethod
+    def restore(cls, exported, size=1024):
+        values, count, total = exported
+        samples = cls(size)
+        # Oldest first is not needed: percentiles ignore the order
+        samples.values[:len(values)] = values
+        samples.count = count
+        samples.total = total
+        return samples
+
+
+class TickProfiler:
+    """Per-tick time spent in each phase of a room, and a few per-tick values.
+
+    Phases are timed by wrapping the methods that implement them (`timed`),
+    or added by hand (`add`); a method called many times in a tick, such
+    as the collision check once per player, adds up to one sample for that
+    tick. `end_tick` turns the running totals into samples. A disabled
+    profiler wraps nothing, so the game runs its own methods untouched.
+    """
+
+    def __init__(self, enabled=True, window=1024):
+        self.enabled = enabled
+        self.window = window
+        # Phase -> seconds spent in it so far this tick
+        self.pending = {}
+        self.series = {}
+
+    def _samples(self, name):
+        samples = self.series.get(name)
+        if samples is None:
+            samples = self.series[name] = Samples(self.window)
+        return samples
+
+    def timed(self, phase, function):
+        """`function`, with the time every call takes added to `phase`."""
+        if not self.enabled:
+            return function
+        pending = self.pending
+        pending.setdefault(phase, 0.0)
+
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def timed_function(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    pending[phase] += time.perf_counter() - start
+        else:
+            @functools.wraps(function)
+            def timed_function(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    pending[phase] += time.perf_counter() - start
+        return timed_function
+
+    def tick(self, function):
+        """`timed('tick', function)`, ending the tick after every call."""
+        if not self.enabled:
+            return function
+        timed_function = self.timed('tick', function)
+
+        @functools.wraps(function)
+        async def tick(*args, **kwargs):
+            try:
+                return await timed_function(*args, **kwargs)
+            finally:
+                self.end_tick()
+        return tick
+
+    def add(self, phase, seconds):
+        if self.enabled:
+            self.pending[phase] = self.pending.get(phase, 0.0) + seconds
+
+    def record(self, name, value):
+        """One sample of a per-tick value, like the bytes sent."""
+        if self.enabled:
+            self._samples(name).add(value)
+
+    def end_tick(self):
+        for phase, seconds in self.pending.items():
+            self._samples(phase).add(seconds)
+            self.pending[phase] = 0.0
+
+    def export(self):
+        """Every series, in a form that pickles cheaply, for `merge` in another process."""
+        return {name: samples.export() for name, samples in self.series.items()}
+
+    def merge(self, exported):
+        for name, series in exported.items():
+            self.series[name] = Samples.restore(series, self.window)
+
+
+# Series recorded with `record` -> (metric name, help); every other series is a phase
+VALUE_SERIES = {
+    'sent_bytes': ('game_tick_sent_bytes', 'Bytes written to client sockets per tick.'),
+    'input_queue_depth': ('game_input_queue_depth', 'Inputs waiting in the deepest connection queue at the start of a tick.'),
+}
+
+def format_labels(labels):
+    return '{' + ','.join(f'{key}="{value}"' for key, value in labels.items()) + '}'
+
+def render_summary(lines, name, help_text, rows):
+    """Append one Prometheus summary family, and a gauge with the window maximum."""
+    if not rows:
+        return
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} summary')
+    for labels, summary in rows:
+        for quantile, value in summary['quantiles'].items():
+            lines.append(f'{name}{format_labels({**labels, "quantile": quantile})} {value!r}')
+        lines.append(f'{name}_sum{format_labels(labels)} {summary["sum"]!r}')
+        lines.append(f'{name}_count{format_labels(labels)} {summary["count"]}')
+    lines.append(f'# HELP {name}_max Largest {name} over the last {rows[0][1]["window"]} ticks.')
+    lines.append(f'# TYPE {name}_max gauge')
+    for labels, summary in rows:
+        lines.append(f'{name}_max{format_labels(labels)} {summary["max"]!r}')
+
+def render_metrics(rooms):
+    """Prometheus text exposition of every running room's tick metrics."""
+    rooms = sorted(rooms, key=lambda room: room.map_id)
+    lines = [
+        '# HELP game_rooms Rooms with a running tick loop.',
+        '# TYPE game_rooms gauge',
+        f'game_rooms {len(rooms)}',
+    ]
+    gauges = {
+        'game_room_players': ('Players in the room.', lambda room: len(room.players)),
+        'game_room_connections': ('Sockets the room broadcasts to.', lambda room: len(room.broadcaster.connections)),
+    }
+    for name, (help_text, value) in gauges.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        lines.extend(f'{name}{format_labels({"map": room.map_id})} {value(room)}' for room in rooms)
+
+    counters = {
+        'game_ticks_total': ('Ticks run.', 'ticks'),
+        'game_skipped_ticks_total': ('Ticks dropped because the loop fell behind.', 'skipped_ticks'),
+        'game_catch_up_ticks_total': ('Ticks run late to catch up.', 'catch_up_ticks'),
+        'game_failed_ticks_total': ('Ticks that raised an exception.', 'failed_ticks'),
+    }
+    tick_metrics = [(room, room.get_tick_metrics()) for room in rooms]
+    for name, (help_text, key) in counters.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        lines.extend(f'{name}{format_labels({"map": room.map_id})} {metrics[key]}'
+                     for room, metrics in tick_metrics if metrics)
+
+    phases = []
+    values = {name: [] for name in VALUE_SERIES}
+    for room in rooms:
+        for series, samples in sorted(room.profiler.series.items()):
+            summary = {**samples.summary(), 'window': room.profiler.window}
+            if series in VALUE_SERIES:
+                values[series].append(({'map': room.map_id}, summary))
+            else:
+                phases.append(({'map': room.map_id, 'phase': series}, summary))
+    render_summary(lines, 'game_tick_phase_seconds', 'Time per tick spent in each phase of the tick loop.', phases)
+    for series, (name, help_text) in VALUE_SERIES.items():
+        render_summary(lines, name, help_text, values[series])
+    return '\n'.join(lines) + '\n'
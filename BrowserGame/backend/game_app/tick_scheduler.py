@@ -0,0 +1,100 @@
+# /backend/game_app/tick_scheduler.py
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TickMetrics:
+    def __init__(self):
+        self.ticks = 0
+        self.skipped_ticks = 0
+        self.catch_up_ticks = 0
+        self.failed_ticks = 0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.avg_duration = 0.0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+        self.smoothing = 0.05
+
+    def record(self, duration, lateness):
+        self.ticks += 1
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+        if self.ticks == 1:
+            self.avg_duration = duration
+        else:
+            self.avg_duration += (duration - self.avg_duration) * self.smoothing
+        self.last_lateness = lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+
+    def snapshot(self):
+        return {
+            'ticks': self.ticks,
+            'skipped_ticks': self.skipped_ticks,
+            'catch_up_ticks': self.catch_up_ticks,
+            'failed_ticks': self.failed_ticks,
+            'last_duration': self.last_duration,
+            'max_duration': self.max_duration,
+            'avg_duration': self.avg_duration,
+            'last_lateness': self.last_lateness,
+            'max_lateness': self.max_lateness
+        }
+
+class TickScheduler:
+    """Calls `tick` at a fixed rate, scheduled against absolute deadlines.
+
+    Sleeping for a fixed interval after each tick lets the period stretch by
+    however long the tick took. Here every tick has a deadline of
+    `start + n * interval`, and the sleep only covers what is left of it.
+    When the loop falls behind, the policy decides what happens to the
+    missed ticks:
+
+    - 'catch_up' runs them back to back, up to `max_catch_up` at a time, and
+      drops any beyond that so one long stall cannot snowball.
+    - 'drop' skips them and resumes on the next deadline.
+
+    A tick that raises is logged and counted, and the next one runs on time.
+    """
+    CATCH_UP = 'catch_up'
+    DROP = 'drop'
+
+    def __init__(self, tick, interval, policy=CATCH_UP, max_catch_up=5):
+        if policy not in (self.CATCH_UP, self.DROP):
+            raise ValueError(f"Unknown tick policy: {policy}")
+        self.tick = tick
+        self.interval = interval
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+        self.metrics = TickMetrics()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+
+        while True:
+            now = loop.time()
+            lateness = now - deadline
+            behind = int(lateness // self.interval)
+            if behind > 0:
+                if self.policy == self.DROP:
+                    skipped = behind
+                else:
+                    skipped = max(0, behind - self.max_catch_up)
+                if skipped:
+                    self.metrics.skipped_ticks += skipped
+                    deadline += skipped * self.interval
+                    lateness = now - deadline
+                if behind > skipped:
+                    self.metrics.catch_up_ticks += 1
+
+            try:
+                await self.tick()
+            except Exception:
+                # One bad tick must not stop the loop, and with it the room
+                self.metrics.failed_ticks += 1
+                logger.exception("Tick failed")
+            self.metrics.record(loop.time() - now, max(0.0, lateness))
+
+            deadline += self.interval
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
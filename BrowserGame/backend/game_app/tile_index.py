@@ -0,0 +1,120 @@
+# /backend/game_app/tile_index.py
+import math
+import numpy as np
+
+class TileIndex:
+    """Lookup tables for the solid (collision) layer of a map.
+
+    Built once when a map is loaded so ground and collision queries only touch
+    the tiles under the player's box instead of scanning every tile.
+    Tiles sit on integer grid coordinates; `y` grows downwards from the top of
+    the map, matching the editor and `MapGrid`.
+    """
+
+    def __init__(self, map_height, tile_width=1, tile_height=1, layer=1):
+        self.map_height = map_height
+        # MapGrid layer the index was built from
+        self.layer = layer
+        self.tile_width = tile_width
+        self.tile_height = tile_height
+        # occupancy[y, x] is True when a solid tile sits at (x, y)
+        self.occupancy = np.zeros((0, 0), dtype=bool)
+        # column_tops[x] is the highest tile top (in world y, up is positive) of that column
+        self.column_tops = []
+        # Same values as an array, for queries over many spans at once
+        self.column_tops_array = np.zeros(0)
+
+    @classmethod
+    def from_grid(cls, grid, tile_width=1, tile_height=1, layer=1):
+        index = cls(grid.height, tile_width, tile_height, layer)
+        index.build(grid.occupancy(layer))
+        return index
+
+    def build(self, occupancy):
+        self.occupancy = occupancy
+        if occupancy.size == 0:
+            self.column_tops = []
+            self.column_tops_array = np.zeros(0)
+            return
+
+        # The topmost tile of a column is the one with the smallest row
+        has_tile = occupancy.any(axis=0)
+        first_row = occupancy.argmax(axis=0)
+        tops = self.map_height - first_row - 1
+        self.column_tops_array = np.where(has_tile, tops, -math.inf)
+        self.column_tops = self.column_tops_array.tolist()
+
+    def update_columns(self, layer_array, first, last):
+        """Re-read columns `first`..`last` (inclusive) of the solid layer after an edit.
+
+        `layer_array` is the layer from MapGrid; only the given columns are
+        compared and have their tops recomputed. If the layer changed shape,
+        the whole index is rebuilt instead.
+        """
+        if layer_array.shape != self.occupancy.shape:
+            self.build(layer_array != 0)
+            return
+        last = min(last, layer_array.shape[1] - 1)
+        if first > last:
+            return
+        columns = layer_array[:, first:last + 1] != 0
+        self.occupancy[:, first:last + 1] = columns
+        tops = np.where(columns.any(axis=0), self.map_height - columns.argmax(axis=0) - 1, -math.inf)
+        self.column_tops_array[first:last + 1] = tops
+        self.column_tops[first:last + 1] = tops.tolist()
+
+    def _column_range(self, left, right):
+        # Columns whose tiles overlap the open span (left, right)
+        first = math.floor(left - self.tile_width) + 1
+        last = math.ceil(right) - 1
+        return max(first, 0), min(last, len(self.column_tops) - 1)
+
+    def _row_range(self, top, bottom):
+        first = math.floor(top - self.tile_height) + 1
+        last = math.ceil(bottom) - 1
+        return max(first, 0), min(last, self.occupancy.shape[0] - 1)
+
+    def highest_top(self, left, right):
+        """Highest solid tile top overlapping the horizontal span, or -inf."""
+        first, last = self._column_range(left, right)
+        if first > last:
+            return -math.inf
+        return max(self.column_tops[first:last + 1])
+
+    def highest_tops(self, lefts, rights):
+        """`highest_top` for arrays of spans, in one pass per column of the widest span."""
+        lefts = np.asarray(lefts, dtype=float)
+        result = np.full(lefts.shape, -math.inf)
+        column_count = len(self.column_tops_array)
+        if column_count == 0 or lefts.size == 0:
+            return result
+
+        first = np.maximum(np.floor(lefts - self.tile_width).astype(np.intp) + 1, 0)
+        last = np.minimum(np.ceil(np.asarray(rights, dtype=float)).astype(np.intp) - 1, column_count - 1)
+        widest = int((last - first).max()) + 1
+        for offset in range(widest):
+            columns = first + offset
+            tops = self.column_tops_array[np.minimum(columns, column_count - 1)]
+            np.maximum(result, np.where(columns <= last, tops, -math.inf), out=result)
+        return result
+
+    def tiles_in_box(self, left, right, top, bottom, reverse=False):
+        """Solid tiles overlapping the box, as (x, y) pairs ordered by column.
+
+        The box uses map coordinates (y grows downwards) and overlap is strict,
+        so tiles that only touch an edge are not returned.
+        """
+        first_col, last_col = self._column_range(left, right)
+        first_row, last_row = self._row_range(top, bottom)
+        if first_col > last_col or first_row > last_row:
+            return []
+
+        window = self.occupancy[first_row:last_row + 1, first_col:last_col + 1]
+        if not window.any():
+            return []
+
+        cols, rows = np.nonzero(window.T)
+        tiles = [(c + first_col, r + first_row) for c, r in zip(cols.tolist(), rows.tolist())]
+        if reverse:
+            tiles.reverse()
+        return tiles
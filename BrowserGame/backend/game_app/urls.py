@@ -1,8 +1,13 @@
-# /backend/game_app/urls.py
-from django.urls import path
-from . import views
-
-urlpatterns = [
-    path('initialize/', views.initialize_game, name='initialize_game'),
-    path('save-map/', views.save_map, name='save_map'),    
+# /backend/game_app/urls.py
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('initialize/', views.initialize_game, name='initialize_game'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('maps/<int:map_id>/', views.map_payload, name='map_payload'),
+    path('maps/<int:map_id>/edits/', views.edit_map, name='edit_map'),
+    path('maps/<int:map_id>/chunks/', views.map_chunks, name='map_chunks'),
+    path('animation-frames/', views.animation_frames, name='animation_frames'),
+    path('save-map/', views.save_map, name='save_map'),    
 ]
\ No newline at end of file
@@ -1,74 +1,231 @@
-# /backend/game_app/views.py
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
-from django.views.decorators.csrf import csrf_exempt
-from django.db import transaction
-from asgiref.sync import async_to_sync
-from .game_state import game_state
-from .models import Map, MapTile, Player
-import uuid
-import json
-import logging
-
-logger = logging.getLogger(__name__)
-
-def initialize_game(request):
-    player_id = str(uuid.uuid4())
-    
-    try:
-        map_obj = Map.objects.get(id=game_state.map_id)
-        map_data = {
-            'name': map_obj.name,
-            'width': map_obj.width,
-            'height': map_obj.height,
-            'tiles': map_obj.get_tile_data()
-        }
-    except Map.DoesNotExist:
-        map_data = None
-        logger.error(f"Map with id {game_state.map_id} not found")
-
-    response_data = {
-        'player_id': player_id,
-        'map': map_data
-    }
-
-    return JsonResponse(response_data)
-
-@csrf_exempt
-@require_http_methods(["POST"])
-def save_map(request):
-    try:
-        data = json.loads(request.body)
-        map_name = data.get('name')
-        map_width = data.get('width')
-        map_height = data.get('height')
-        layers = data.get('layers')
-
-        if not all([map_name, map_width, map_height, layers]):
-            return JsonResponse({'error': 'Missing required data'}, status=400)
-
-        map_obj, created = Map.objects.update_or_create(
-            name=map_name,
-            defaults={'width': map_width, 'height': map_height}
-        )
-
-        MapTile.objects.filter(map=map_obj).delete()
-
-        tiles_to_create = []
-        for layer_index, layer in enumerate(layers):
-            for tile in layer.get('data', []):
-                tiles_to_create.append(MapTile(
-                    map=map_obj,
-                    x=tile['x'],
-                    y=tile['y'],
-                    color=tile['color'],
-                    layer=layer_index
-                ))
-
-        MapTile.objects.bulk_create(tiles_to_create)
-
-        logger.info(f"Map '{map_name}' saved successfully")
-        return JsonResponse({'success': True, 'map_id': map_obj.id})
-    except Exception as e:
-        logger.error(f"Error saving map: {str(e)}", exc_info=True)
-        return JsonResponse({'error': 'Internal server error'}, status=500)
\ No newline at end of file
+# /backend/game_app/views.py
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.urls import reverse
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_http_methods
+from django.views.decorators.csrf import csrf_exempt
+from django.db import transaction
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from .game_state import DEFAULT_MAP_ID
+from .animation_component import read_animation_frames
+from .movement_component import MOVEMENT_PARAMS
+from .models import Map, MapChunk, Player
+from .map_cache import map_payload_cache
+from .map_chunks import CHUNK_SIZE, chunk_payload
+from .map_edits import TileEdits, MapVersionConflict, apply_map_edits, replace_map_chunks
+from .map_grid import MapGrid
+from .rooms import room_manager
+from .tick_profiler import PROMETHEUS_CONTENT_TYPE, render_metrics
+import uuid
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Map body encodings, most preferred first, for clients that accept several
+MAP_ENCODINGS = ('br', 'gzip')
+# Most chunks one request to maps/<id>/chunks/ may ask for
+MAX_CHUNKS_PER_REQUEST = 64
+
+def initialize_game(request):
+    player_id = str(uuid.uuid4())
+    try:
+        map_id = int(request.GET.get('map_id', DEFAULT_MAP_ID))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid map_id'}, status=400)
+
+    # The map itself is fetched separately: whole from map_url, or streamed
+    # around the player a chunk at a time from chunks_url
+    response_data = {
+        'player_id': player_id,
+        'map_id': map_id,
+        'map_url': reverse('map_payload', args=[map_id]),
+        'chunks_url': reverse('map_chunks', args=[map_id]),
+        'map': Map.objects.filter(id=map_id).values('width', 'height', 'version').first(),
+        'chunk_size': CHUNK_SIZE,
+        # The client predicts its own movement with the server's step
+        'movement': MOVEMENT_PARAMS
+    }
+
+    return JsonResponse(response_data)
+
+async def metrics(request):
+    # Async so this runs on the event loop that owns the rooms and their profilers;
+    # a sync view's thread would iterate them while ticks change them
+    # Percentiles are computed here, per scrape, from the samples the rooms keep
+    if not settings.GAME_METRICS:
+        return JsonResponse({'error': 'Metrics are disabled'}, status=404)
+    return HttpResponse(render_metrics(list(room_manager.rooms.values())), content_type=PROMETHEUS_CONTENT_TYPE)
+
+def accepted_encodings(accept_encoding):
+    """Content codings an Accept-Encoding header allows, ignoring any with q=0."""
+    accepted = set()
+    for item in accept_encoding.split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.lower())
+    return accepted
+
+def map_payload(request, map_id):
+    payload = map_payload_cache.get(map_id)
+    if payload is None:
+        logger.error(f"Map with id {map_id} not found")
+        return JsonResponse({'error': 'Map not found'}, status=404)
+
+    # Weak comparison: every encoding of the map shares its ETag
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (if_none_match.strip() == '*' or
+                          payload.etag.removeprefix('W/') in (etag.removeprefix('W/') for etag in parse_etags(if_none_match))):
+        response = HttpResponseNotModified()
+    else:
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding = next((encoding for encoding in MAP_ENCODINGS
+                         if encoding in accepted and encoding in payload.encodings), 'identity')
+        response = HttpResponse(payload.encodings[encoding], content_type='application/json')
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+
+    response['ETag'] = payload.etag
+    # Clients keep the map but revalidate it on every load, which costs a 304 until it changes
+    response['Cache-Control'] = 'no-cache'
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+def map_chunks(request, map_id):
+    """Every layer of the chunks listed in `?keys=cx,cy;cx,cy;...`.
+
+    Requested chunks with no tiles come back with no layers, so clients
+    can tell them apart from chunks they have not asked for yet. The cost
+    follows the number of chunks requested, not the size of the map.
+    """
+    try:
+        keys = {tuple(int(value) for value in key.split(','))
+                for key in request.GET.get('keys', '').split(';') if key}
+        if any(len(key) != 2 for key in keys) or len(keys) > MAX_CHUNKS_PER_REQUEST:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'error': f'keys must be up to {MAX_CHUNKS_PER_REQUEST} "cx,cy" pairs'}, status=400)
+
+    version = Map.objects.filter(id=map_id).values_list('version', flat=True).first()
+    if version is None:
+        return JsonResponse({'error': 'Map not found'}, status=404)
+
+    layers = {key: [] for key in keys}
+    if keys:
+        stored = MapChunk.objects.filter(map_id=map_id, cx__in={cx for cx, _ in keys}, cy__in={cy for _, cy in keys})
+        for layer, cx, cy, data in stored.values_list('layer', 'cx', 'cy', 'data'):
+            if (cx, cy) in layers:
+                layers[(cx, cy)].append((layer, data))
+
+    return JsonResponse({
+        'map_id': map_id,
+        'version': version,
+        'chunk_size': CHUNK_SIZE,
+        'chunks': [chunk_payload(cx, cy, chunk_layers) for (cx, cy), chunk_layers in sorted(layers.items())]
+    })
+
+def notify_rooms(map_id, version, chunks):
+    """Tell the room running `map_id`, if there is one, that the map changed.
+
+    `chunks` lists the (layer, cx, cy) that changed, or is None when the
+    whole map has to be reloaded. The room's connections are all in its
+    channel group, and whichever receives this first has the room reload.
+    """
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    async_to_sync(channel_layer.group_send)(f'game_{map_id}', {
+        'type': 'map.changed',
+        'version': version,
+        'chunks': None if chunks is None else [list(key) for key in chunks]
+    })
+
+def animation_frames(request):
+    # Clients rebuild the poses of distant players from the same frames the server animates with
+    return JsonResponse(read_animation_frames())
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def save_map(request):
+    try:
+        data = json.loads(request.body)
+        map_name = data.get('name')
+        map_width = data.get('width')
+        map_height = data.get('height')
+        layers = data.get('layers')
+
+        if not all([map_name, map_width, map_height, layers]):
+            return JsonResponse({'error': 'Missing required data'}, status=400)
+
+        # Readers see the old map or the new one, never the empty map in between
+        with transaction.atomic():
+            previous_size = Map.objects.filter(name=map_name).values_list('width', 'height').first()
+            map_obj, created = Map.objects.update_or_create(
+                name=map_name,
+                defaults={'width': map_width, 'height': map_height}
+            )
+
+            grid = MapGrid.from_tiles(map_name, map_width, map_height, (
+                (tile['x'], tile['y'], tile['color'], layer_index)
+                for layer_index, layer in enumerate(layers)
+                for tile in layer.get('data', [])
+            ))
+            map_obj.version += 1
+            changed = replace_map_chunks(map_obj, grid)
+            map_obj.save(update_fields=['version', 'updated_at'])
+        map_payload_cache.invalidate(map_obj.id)
+        # Resizing moves the ground in every column, so live rooms reload it whole
+        resized = previous_size is not None and previous_size != (map_obj.width, map_obj.height)
+        if resized or changed:
+            notify_rooms(map_obj.id, map_obj.version, None if resized else changed)
+
+        logger.info(f"Map '{map_name}' saved successfully")
+        return JsonResponse({'success': True, 'map_id': map_obj.id, 'version': map_obj.version})
+    except Exception as e:
+        logger.error(f"Error saving map: {str(e)}", exc_info=True)
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def edit_map(request, map_id):
+    """Apply tile edits to a stored map without rewriting the rest of it.
+
+    Body: `{'base_version': n, 'layers': [{'layer': n, 'set': [{'x', 'y',
+    'color'}], 'remove': [{'x', 'y'}]}]}`. `base_version` is optional; when
+    given and the map has been saved since, nothing is applied and the
+    response is a 409 carrying the current version.
+    """
+    try:
+        data = json.loads(request.body)
+        edits = TileEdits.from_request(data.get('layers'))
+        base_version = data.get('base_version')
+        if base_version is not None and not isinstance(base_version, int):
+            raise ValueError(f"Invalid base_version: {base_version!r}")
+    except (ValueError, AttributeError) as e:
+        return JsonResponse({'error': f'Invalid edits: {e}'}, status=400)
+
+    try:
+        version, changed = apply_map_edits(map_id, edits, base_version)
+    except Map.DoesNotExist:
+        return JsonResponse({'error': 'Map not found'}, status=404)
+    except MapVersionConflict as e:
+        return JsonResponse({'error': 'Map has changed', 'version': e.version}, status=409)
+    except Exception as e:
+        logger.error(f"Error editing map {map_id}: {str(e)}", exc_info=True)
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+    map_payload_cache.invalidate(map_id)
+    if changed:
+        notify_rooms(map_id, version, changed)
+
+    return JsonResponse({'success': True, 'map_id': map_id, 'version': version,
+                         'changed': len(edits), 'bounds': edits.bounds()})
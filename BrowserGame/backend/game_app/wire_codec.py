@@ -0,0 +1,325 @@
+# /backend/game_app/wire_codec.py
+import json
+import math
+import struct
+from .animation_component import JOINT_NAMES
+
+BINARY_SUBPROTOCOL = 'browsergame.bin.v5'
+
+FRAME_KEY = 1
+FRAME_DELTA = 2
+
+# Per-player field mask
+FIELD_X = 1
+FIELD_Y = 2
+FIELD_SPEED = 4
+FIELD_ANGLE = 8
+FIELD_FLAGS = 16
+FIELD_MOUSE = 32
+FIELD_PIVOTS = 64
+FIELD_ANIM = 128
+FIELD_INPUT_SEQ = 256
+
+# Input flags
+INPUT_STEP = 1
+INPUT_RUNNING = 2
+INPUT_CROUCHING = 4
+INPUT_JUMP = 8
+INPUT_HAS_MOUSE = 16
+INPUT_HAS_ACK = 32
+INPUT_GUARD = 64
+INPUT_HAS_GUARD = 128
+INPUT_LEFT = 256
+INPUT_RIGHT = 512
+
+INPUT_STRUCT = struct.Struct('<HIIhh')
+
+class InputDecodeError(ValueError):
+    """A client message that is not a valid input in either format."""
+
+INT16_MIN = -32768
+INT16_MAX = 32767
+UINT32_MAX = 2 ** 32 - 1
+
+def clamp_int16(value):
+    return max(INT16_MIN, min(INT16_MAX, value))
+
+class PlayerIndexTable:
+    """Assigns the u16 indices binary frames use to refer to players.
+
+    Shared by every connection of a game so a frame encodes identically for
+    all of them. `update` runs once per broadcast and returns what changed
+    since the previous one.
+    """
+
+    def __init__(self):
+        self.indices = {}
+        self.free_indices = []
+        self.next_index = 0
+        self.released = []
+        self.assigned = []
+
+    def update(self, player_ids):
+        self.released = [self.indices.pop(player_id) for player_id in list(self.indices) if player_id not in player_ids]
+        self.free_indices.extend(self.released)
+
+        self.assigned = []
+        for player_id in player_ids:
+            if player_id not in self.indices:
+                if self.free_indices:
+                    index = self.free_indices.pop()
+                else:
+                    index = self.next_index
+                    self.next_index += 1
+                self.indices[player_id] = index
+                self.assigned.append(player_id)
+
+# Frames of one broadcast share player record objects (see FrameBuilder), so
+# `encode_frame` can cache encoded records in `records`, keyed by object id.
+# The cache must not outlive the broadcast's frames.
+
+class JsonCodec:
+    binary = False
+
+    def encode_frame(self, frame, table, records=None):
+        if records is None:
+            records = {}
+        player_parts = []
+        for player_id, player in frame['players'].items():
+            record = records.get(id(player))
+            if record is None:
+                record = records[id(player)] = json.dumps(player_id) + ':' + json.dumps(player, separators=(',', ':'))
+            player_parts.append(record)
+
+        # JSON clients tell full records from changes by whether they already have the player
+        parts = [f'{{"type":"{frame["type"]}","seq":{frame["seq"]}']
+        if 'base' in frame:
+            parts.append(f',"base":{frame["base"]}')
+        parts.append(',"players":{')
+        parts.append(','.join(player_parts))
+        parts.append('}')
+        if 'removed' in frame:
+            parts.append(',"removed":')
+            parts.append(json.dumps(frame['removed'], separators=(',', ':')))
+        parts.append('}')
+        return ''.join(parts)
+
+class BinaryCodec:
+    """Packs state frames into a compact little-endian layout.
+
+    Players are referred to by a u16 index from the game's PlayerIndexTable.
+    A frame assigns indices only for the players it sends in full (players
+    new to this client), and releases the indices of players who left the
+    game since the last broadcast. Layout:
+
+        u8 frame type, u32 seq, u32 base seq (0 on keyframes)
+        u16 n, n * u16                     indices released
+        u16 n, n * (u16 index, u8 len, id)  indices assigned
+        u16 n, n * player record
+        u16 n, n * u16                     indices removed from this client's view
+
+    A player record is a u16 index and a u16 field mask. The fields present
+    follow in mask order:
+    - x and y: i32 each
+    - speed and angle: i16 each
+    - flags: u8
+    - mouse: 2 * i16
+    - pivots: a u16 joint mask (bit i is JOINT_NAMES[i]) then 2 * i16 per joint
+    - anim: u8 clip id, i16 progress, i16 walk/run blend; when the clip id
+      has CLIP_BLENDED set, an i16 mix and a second clip id, progress and
+      blend follow
+    - input seq: u32, the last movement step of the player's own client
+      the server has applied
+
+    Clients drop removed players, and any player whose index has been
+    released, so a player who leaves the game disappears even from frames
+    encoded against an older baseline.
+    """
+    binary = True
+
+    def __init__(self):
+        self.joint_bits = {joint: 1 << bit for bit, joint in enumerate(JOINT_NAMES)}
+
+    def encode_frame(self, frame, table, records=None):
+        if records is None:
+            records = {}
+        keyframe = frame['type'] == 'key'
+        released = table.released
+        assigned = frame['entered']
+        # Players who left the game are covered by their released index
+        removed = [table.indices[player_id] for player_id in frame.get('removed', ()) if player_id in table.indices]
+
+        fmt = ['<BII', 'H', 'H' * len(released), 'H']
+        values = [FRAME_KEY if keyframe else FRAME_DELTA, frame['seq'], frame.get('base', 0), len(released)]
+        values.extend(released)
+        values.append(len(assigned))
+        for player_id in assigned:
+            encoded_id = player_id.encode('utf-8')
+            fmt.append(f'HB{len(encoded_id)}s')
+            values.extend((table.indices[player_id], len(encoded_id), encoded_id))
+        fmt.append('H')
+        values.append(len(frame['players']))
+        parts = [struct.pack(''.join(fmt), *values)]
+
+        for player_id, player in frame['players'].items():
+            record = records.get(id(player))
+            if record is None:
+                record = records[id(player)] = self._pack_player(table.indices[player_id], player)
+            parts.append(record)
+
+        parts.append(struct.pack(f'<H{len(removed)}H', len(removed), *removed))
+        return b''.join(parts)
+
+    def _pack_player(self, index, player):
+        mask = 0
+        fields = []
+        field_fmt = []
+        if 'x' in player:
+            mask |= FIELD_X
+            field_fmt.append('i')
+            fields.append(player['x'])
+        if 'y' in player:
+            mask |= FIELD_Y
+            field_fmt.append('i')
+            fields.append(player['y'])
+        if 'speed' in player:
+            mask |= FIELD_SPEED
+            field_fmt.append('h')
+            fields.append(clamp_int16(player['speed']))
+        if 'angle' in player:
+            mask |= FIELD_ANGLE
+            field_fmt.append('h')
+            fields.append(clamp_int16(player['angle']))
+        if 'flags' in player:
+            mask |= FIELD_FLAGS
+            field_fmt.append('B')
+            fields.append(player['flags'])
+        if 'mouse_position' in player:
+            mask |= FIELD_MOUSE
+            field_fmt.append('hh')
+            fields.extend(clamp_int16(value) for value in player['mouse_position'])
+        if 'pivot_points' in player:
+            mask |= FIELD_PIVOTS
+            joint_mask = 0
+            points = []
+            for joint in JOINT_NAMES:
+                point = player['pivot_points'].get(joint)
+                if point is not None:
+                    joint_mask |= self.joint_bits[joint]
+                    points.append(clamp_int16(point[0]))
+                    points.append(clamp_int16(point[1]))
+            field_fmt.append('H' + 'h' * len(points))
+            fields.append(joint_mask)
+            fields.extend(points)
+        if 'anim' in player:
+            mask |= FIELD_ANIM
+            anim = player['anim']
+            field_fmt.append('Bhh' if len(anim) == 3 else 'BhhhBhh')
+            fields.extend(value if i % 4 == 0 else clamp_int16(value) for i, value in enumerate(anim))
+        if 'input_seq' in player:
+            mask |= FIELD_INPUT_SEQ
+            field_fmt.append('I')
+            fields.append(player['input_seq'])
+
+        return struct.pack('<HH' + ''.join(field_fmt), index, mask, *fields)
+
+def decode_binary_input(bytes_data):
+    if len(bytes_data) != INPUT_STRUCT.size:
+        raise InputDecodeError(f"binary input is {len(bytes_data)} bytes, expected {INPUT_STRUCT.size}")
+    flags, ack, seq, mouse_x, mouse_y = INPUT_STRUCT.unpack(bytes_data)
+    data = {
+        'running': bool(flags & INPUT_RUNNING),
+        'crouching': bool(flags & INPUT_CROUCHING)
+    }
+    if flags & INPUT_STEP:
+        data['seq'] = seq
+        data['move'] = 1 if flags & INPUT_RIGHT else -1 if flags & INPUT_LEFT else 0
+    if flags & INPUT_JUMP:
+        data['jump'] = True
+    if flags & INPUT_HAS_MOUSE:
+        data['player_mouse_position'] = {'x': mouse_x, 'y': mouse_y}
+    if flags & INPUT_HAS_ACK:
+        data['ack'] = ack
+    if flags & INPUT_HAS_GUARD:
+        data['guard'] = bool(flags & INPUT_GUARD)
+    return data
+
+def encode_binary_input(data):
+    """What the frontend's encodeBinaryInput sends for `data`; for simulated clients."""
+    flags = 0
+    if data.get('seq') is not None:
+        flags |= INPUT_STEP
+        if data.get('move', 0) > 0:
+            flags |= INPUT_RIGHT
+        elif data.get('move', 0) < 0:
+            flags |= INPUT_LEFT
+    if data.get('running'):
+        flags |= INPUT_RUNNING
+    if data.get('crouching'):
+        flags |= INPUT_CROUCHING
+    if data.get('jump'):
+        flags |= INPUT_JUMP
+    mouse = data.get('player_mouse_position')
+    if mouse:
+        flags |= INPUT_HAS_MOUSE
+    if data.get('ack') is not None:
+        flags |= INPUT_HAS_ACK
+    if data.get('guard') is not None:
+        flags |= INPUT_HAS_GUARD | (INPUT_GUARD if data['guard'] else 0)
+    return INPUT_STRUCT.pack(
+        flags,
+        data['ack'] if flags & INPUT_HAS_ACK else 0,
+        data['seq'] if flags & INPUT_STEP else 0,
+        clamp_int16(round(mouse['x'])) if mouse else 0,
+        clamp_int16(round(mouse['y'])) if mouse else 0)
+
+def is_number(value):
+    # bool is an int, and json.loads accepts NaN and Infinity
+    if isinstance(value, bool):
+        return False
+    return isinstance(value, int) or (isinstance(value, float) and math.isfinite(value))
+
+def is_uint32(value):
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= UINT32_MAX
+
+def is_position(value):
+    return isinstance(value, dict) and is_number(value.get('x')) and is_number(value.get('y'))
+
+# What each key of a JSON input may hold. Binary inputs can only hold valid
+# values; a JSON one is checked here, because a bad value would otherwise
+# fail the tick that applies it or the broadcast that sends it back.
+# Clients send null for an ack or seq they do not have yet.
+JSON_INPUT_FIELDS = {
+    'move': is_number,
+    'running': lambda value: isinstance(value, bool),
+    'crouching': lambda value: isinstance(value, bool),
+    'jump': lambda value: isinstance(value, bool),
+    'guard': lambda value: isinstance(value, bool),
+    'player_mouse_position': is_position,
+    'seq': lambda value: value is None or is_uint32(value),
+    'ack': lambda value: value is None or is_uint32(value),
+}
+
+def decode_input(text_data=None, bytes_data=None):
+    # Either format is accepted on any connection; JSON stays the fallback
+    if bytes_data is not None:
+        return decode_binary_input(bytes_data)
+    try:
+        data = json.loads(text_data)
+    except (TypeError, ValueError) as e:
+        raise InputDecodeError(f"invalid JSON input: {e}") from e
+    if not isinstance(data, dict):
+        raise InputDecodeError(f"JSON input is a {type(data).__name__}, expected an object")
+    for key, is_valid in JSON_INPUT_FIELDS.items():
+        if key in data and not is_valid(data[key]):
+            raise InputDecodeError(f"invalid {key!r} in JSON input: {data[key]!r}")
+    return data
+
+# Codecs hold no per-connection state, so connections share these
+JSON_CODEC = JsonCodec()
+BINARY_CODEC = BinaryCodec()
+
+def create_codec(subprotocols):
+    if BINARY_SUBPROTOCOL in subprotocols:
+        return BINARY_CODEC
+    return JSON_CODEC
@@ -1,8 +1,8 @@
-#/backend/game_project/urls.py
-from django.contrib import admin
-from django.urls import path, include
-
-urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('api/game/', include('game_app.urls')),
+#/backend/game_project/urls.py
+from django.contrib import admin
+from django.urls import path, include
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('api/game/', include('game_app.urls')),
 ]
\ No newline at end of file
@@ -1,8 +1,8 @@
-#/backend/game_project/wsgi.py
-import os
-
-from django.core.wsgi import get_wsgi_application
-
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'game_project.settings')
-
-application = get_wsgi_application()
+#/backend/game_project/wsgi.py
+import os
+
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'game_project.settings')
+
+application = get_wsgi_application()
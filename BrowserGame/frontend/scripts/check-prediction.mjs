@@ -0,0 +1,33 @@
+// Replays the movement steps recorded by the backend's MovementStepTests
+// through stepPlayer and checks that every step lands on exactly the value the
+// server's update_player_position produced.
+import { readFile } from 'node:fs/promises';
+
+const root = new URL('../', import.meta.url);
+
+// prediction.jsx has no JSX or imports, but Node only loads it as a module from its source
+const source = await readFile(new URL('src/game/prediction.jsx', root), 'utf8');
+const { stepPlayer } = await import(`data:text/javascript,${encodeURIComponent(source)}`);
+
+const steps = JSON.parse(await readFile(new URL('../backend/game_app/testdata/movement_steps.json', root), 'utf8'));
+const solid = new Set(steps.map.solid.map(([x, y]) => `${x},${y}`));
+const map = { width: steps.map.width, height: steps.map.height, isSolid: (x, y) => solid.has(`${x},${y}`) };
+
+let state = steps.start;
+let mismatches = 0;
+steps.steps.forEach(([move, running, crouching], i) => {
+  state = stepPlayer(state, { move, running, crouching }, steps.params, map);
+  const [x, speed, angle] = steps.expected[i];
+  if (state.x !== x || state.speed !== speed || state.angle !== angle) {
+    if (mismatches++ < 10) {
+      console.error(`step ${i}: got x=${state.x} speed=${state.speed} angle=${state.angle}, ` +
+                    `expected x=${x} speed=${speed} angle=${angle}`);
+    }
+  }
+});
+
+if (mismatches) {
+  console.error(`${mismatches} of ${steps.steps.length} steps differ from the server's`);
+  process.exit(1);
+}
+console.log(`All ${steps.steps.length} steps match the server's`);
@@ -2,11 +2,20 @@ import React, { useRef, useEffect, useState, useCallback } from 'react';
 import Player from './Player';
 import Landscape from './Landscape';
 import DustAnimation from './DustAnimation';
+import StateDecoder from '../game/stateDecoder';
+import PoseEvaluator from '../game/poseEvaluator';
+import ChunkStreamer from '../game/chunkStreamer';
+import Prediction from '../game/prediction';
+import { BINARY_SUBPROTOCOL, decodeMessage, sendInput } from '../game/wireCodec';
 
 const Game = () => {
   const containerRef = useRef(null);
   const socketRef = useRef(null);
+  const stateDecoderRef = useRef(new StateDecoder());
+  const playerTableRef = useRef(new Map());
   const initializedRef = useRef(false);
+  const chunkStreamerRef = useRef(null);
+  const predictionRef = useRef(null);
   const animationFrameRef = useRef(null);
 
   const [gameState, setGameState] = useState({
@@ -18,16 +27,25 @@ const Game = () => {
   const lastDirectionRef = useRef(null);
 
   const [playerId, setPlayerId] = useState(null);
+  const [mapId, setMapId] = useState(null);
   const [canvasSize, setCanvasSize] = useState({ width: 0, height: 0 });
-  const [mapData, setMapData] = useState(null);
+  const [mapChunks, setMapChunks] = useState([]);
 
   const [localPlayerState, setLocalPlayerState] = useState({ x: 0, y: 0, speed: 0, angle: 0 });
-  const lastServerUpdateTimeRef = useRef(0);
-  const serverUpdateIntervalRef = useRef(5); // 50ms
+  // Time not yet covered by movement steps, and the last state seq acked
+  const stepTimeRef = useRef(0);
+  const lastAckRef = useRef(null);
+  // After a stall (a background tab), catch up at most this many steps
+  const MAX_STEPS_PER_FRAME = 5;
 
   const [mousePosition, setMousePosition] = useState({ x: 0, y: 0 });
   const [playerMousePosition, setPlayerMousePosition] = useState({ x: 0, y: 0 });
   const playerRef = useRef(null);
+  // Mouse moves share the server's input budget with movement steps, so the
+  // latest position is sent with the next step or ack instead of on every
+  // mousemove, and on its own at most once per tick
+  const unsentMouseRef = useRef(null);
+  const mouseTimeRef = useRef(0);
 
   const [playerMovement, setPlayerMovement] = useState({
     left: false,
@@ -87,11 +105,32 @@ const convertToPixels = (tileX, tileY) => {
       initializedRef.current = true;
 
       try {
-        const response = await fetch('/api/game/initialize/');
+        // Each map runs in its own room; /game?map=<id> picks one
+        const requestedMap = new URLSearchParams(window.location.search).get('map');
+        const query = requestedMap ? `?map_id=${encodeURIComponent(requestedMap)}` : '';
+        const response = await fetch(`/api/game/initialize/${query}`);
         const data = await response.json();
         console.log("Parsed data:", data);
+        // The map streams in around the player rather than loading whole
+        if (data.map) {
+          chunkStreamerRef.current = new ChunkStreamer(data.chunks_url, data.chunk_size, {
+            width: data.map.width,
+            height: data.map.height,
+            onChange: setMapChunks,
+          });
+          // Our own movement is shown as soon as it is made, not a round trip later
+          predictionRef.current = new Prediction(data.movement, {
+            width: data.map.width,
+            height: data.map.height,
+            isSolid: (x, y) => chunkStreamerRef.current.isSolid(x, y),
+          });
+        }
+        setMapId(data.map_id);
         setPlayerId(data.player_id);
-        setMapData(data.map);
+
+        // Distant players arrive without skeletons; their poses are rebuilt from these frames
+        const framesResponse = await fetch('/api/game/animation-frames/');
+        stateDecoderRef.current.poseEvaluator = new PoseEvaluator(await framesResponse.json());
       } catch (error) {
         console.error('Error initializing game:', error);
       }
@@ -103,7 +142,8 @@ const convertToPixels = (tileX, tileY) => {
   useEffect(() => {
     if (!playerId) return;
 
-    socketRef.current = new WebSocket(`ws://${window.location.hostname}:8000/ws/game/${playerId}/`);
+    socketRef.current = new WebSocket(`ws://${window.location.hostname}:8000/ws/game/${mapId}/${playerId}/`, [BINARY_SUBPROTOCOL]);
+    socketRef.current.binaryType = 'arraybuffer';
 
     socketRef.current.onopen = () => {
       console.log('WebSocket connection established');
@@ -111,7 +151,18 @@ const convertToPixels = (tileX, tileY) => {
 
     socketRef.current.onmessage = (event) => {
       try {
-        const newGameState = JSON.parse(event.data);
+        const message = decodeMessage(event.data, playerTableRef.current);
+        if (message.type === 'map') {
+          // The map was edited while we play; only the changed chunks are sent
+          if (chunkStreamerRef.current) chunkStreamerRef.current.applyUpdate(message);
+          if (message.stale === null && predictionRef.current) {
+            predictionRef.current.map.width = message.width;
+            predictionRef.current.map.height = message.height;
+          }
+          return;
+        }
+        const newGameState = stateDecoderRef.current.apply(message);
+        if (!newGameState) return;
         // console.log('Received game state:', newGameState);
 
         Object.entries(newGameState).forEach(([id, playerData]) => {
@@ -124,6 +175,7 @@ const convertToPixels = (tileX, tileY) => {
         }));
 
         if (newGameState[playerId]) {
+          if (predictionRef.current) predictionRef.current.reconcile(newGameState[playerId]);
           playerPositionRef.current = {
             x: newGameState[playerId].x,
             y: newGameState[playerId].y,
@@ -171,20 +223,41 @@ const handleDirectionChange = useCallback(() => {
 }, [gameState, playerId, localPlayerState.x, localPlayerState.y]);
 
   const updatePlayerPosition = useCallback((deltaTime) => {
-    if (!playerId || !gameState.players[playerId]) return;
-
-    const serverPlayer = gameState.players[playerId];
-    const currentSpeed = serverPlayer.speed;
-
-    let newX = localPlayerState.x;
-    const moveDistance = (currentSpeed / TILE_SIZE) * deltaTime;
-
-    if (playerMovement.left) {
-      newX = Math.max(0, newX - moveDistance);
+    const prediction = predictionRef.current;
+    if (!playerId || !gameState.players[playerId] || !prediction || !prediction.state) return;
+
+    // One step per server tick: the server applies each of them as it was predicted here
+    const interval = prediction.params.update_interval;
+    const move = (playerMovement.right ? 1 : 0) - (playerMovement.left ? 1 : 0);
+    const ack = stateDecoderRef.current.lastSeq;
+    const send = (message) => {
+      if (unsentMouseRef.current) {
+        message.player_mouse_position = unsentMouseRef.current;
+        unsentMouseRef.current = null;
+        mouseTimeRef.current = 0;
+      }
+      sendInput(socketRef.current, message);
+    };
+    stepTimeRef.current = Math.min(stepTimeRef.current + deltaTime, MAX_STEPS_PER_FRAME * interval);
+    while (stepTimeRef.current >= interval) {
+      stepTimeRef.current -= interval;
+      const input = prediction.step(move, playerMovement.running, playerMovement.crouching);
+      if (input) {
+        send({ ...input, ack });
+        lastAckRef.current = ack;
+      }
     }
-    if (playerMovement.right) {
-      newX = Math.min(MAP_WIDTH - 1, newX + moveDistance);
+    // Standing still sends no steps, but the server needs acks to keep sending deltas
+    if (ack !== lastAckRef.current) {
+      send({ ack, crouching: playerMovement.crouching });
+      lastAckRef.current = ack;
     }
+    mouseTimeRef.current += deltaTime;
+    if (unsentMouseRef.current && mouseTimeRef.current >= interval) {
+      send({ crouching: playerMovement.crouching });
+    }
+
+    const { x: newX, y: newY, speed, angle } = prediction.state;
 
 	if (playerMovement.running) {
 	  const currentDirection = newX > lastPlayerPositionRef.current.x ? 'right' : 'left';
@@ -194,20 +267,9 @@ const handleDirectionChange = useCallback(() => {
 	  }
 	}
 
-    lastPlayerPositionRef.current = { x: newX, y: localPlayerState.y };
-    setLocalPlayerState(prev => ({ ...prev, x: newX, speed: currentSpeed }));
-
-    if (Date.now() - lastServerUpdateTimeRef.current > serverUpdateIntervalRef.current) {
-      if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
-        socketRef.current.send(JSON.stringify({ 
-          x: newX,
-          running: playerMovement.running,
-		  crouching: playerMovement.crouching
-        }));
-      }
-      lastServerUpdateTimeRef.current = Date.now();
-    }
-  }, [playerId, gameState, playerMovement, localPlayerState]);
+    lastPlayerPositionRef.current = { x: newX, y: newY };
+    setLocalPlayerState(prev => ({ ...prev, x: newX, y: newY, speed, angle }));
+  }, [playerId, gameState, playerMovement]);
 
   const gameLoop = useCallback((timestamp) => {
     if (!lastUpdateTimeRef.current) {
@@ -222,18 +284,12 @@ const handleDirectionChange = useCallback(() => {
     animationFrameRef.current = requestAnimationFrame(gameLoop);
   }, [updatePlayerPosition]);
 
+  // Chunks are laid out like tiles, so they follow where the player is drawn
   useEffect(() => {
-    if (gameState.players[playerId]) {
-      const serverPlayer = gameState.players[playerId];
-      setLocalPlayerState(prev => ({
-        ...prev,
-        x: serverPlayer.x,
-        y: serverPlayer.y,
-        speed: serverPlayer.speed,
-        angle: serverPlayer.angle
-      }));
+    if (chunkStreamerRef.current) {
+      chunkStreamerRef.current.update(localPlayerState.x, MAP_HEIGHT - localPlayerState.y - 2);
     }
-  }, [gameState, playerId]);
+  }, [mapId, localPlayerState.x, localPlayerState.y]);
 
   useEffect(() => {
     animationFrameRef.current = requestAnimationFrame(gameLoop);
@@ -256,24 +312,18 @@ const handleDirectionChange = useCallback(() => {
         break;
       case 'arrowup':
       case ' ':
-        if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
-          socketRef.current.send(JSON.stringify({ jump: true }));
-        }
+        sendInput(socketRef.current, { jump: true });
         break;
       case 'w':
         setPlayerMovement(prev => ({ ...prev, guard: true }));
-        if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
-          socketRef.current.send(JSON.stringify({ guard: true }));
-        }
+        sendInput(socketRef.current, { guard: true });
         break;
       case 'shift':
         setPlayerMovement(prev => ({ ...prev, running: true }));
         break;
       case 'c':
         setPlayerMovement(prev => ({ ...prev, crouching: true }));
-        if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
-          socketRef.current.send(JSON.stringify({ crouching: true }));
-        }
+        sendInput(socketRef.current, { crouching: true });
         break;
     }
   }, []);
@@ -290,18 +340,14 @@ const handleDirectionChange = useCallback(() => {
         break;
       case 'w':
         setPlayerMovement(prev => ({ ...prev, guard: false }));
-        if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
-          socketRef.current.send(JSON.stringify({ guard: false }));
-        }
+        sendInput(socketRef.current, { guard: false });
         break;
       case 'shift':
         setPlayerMovement(prev => ({ ...prev, running: false }));
         break;
       case 'c':
         setPlayerMovement(prev => ({ ...prev, crouching: false }));
-        if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
-          socketRef.current.send(JSON.stringify({ crouching: false }));
-        }
+        sendInput(socketRef.current, { crouching: false });
         break;
     }
   }, []);
@@ -323,12 +369,7 @@ const handleDirectionChange = useCallback(() => {
         y: e.clientY - playerRect.top
       };
       setPlayerMousePosition(newPlayerMousePosition);
-
-      if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
-        socketRef.current.send(JSON.stringify({
-          player_mouse_position: newPlayerMousePosition
-        }));
-      }
+      unsentMouseRef.current = newPlayerMousePosition;
     }
   }, [playerId]);
 
@@ -349,9 +390,10 @@ const handleDirectionChange = useCallback(() => {
         position: 'relative',
       }}
     >
-      {mapData && (
+      {chunkStreamerRef.current && (
         <Landscape
-          worldData={mapData}
+          chunks={mapChunks}
+          chunkSize={chunkStreamerRef.current.chunkSize}
           tileSize={TILE_SIZE}
         />
       )}
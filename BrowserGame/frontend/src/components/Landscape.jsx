@@ -1,14 +1,11 @@
-import React, { useRef, useEffect } from 'react';
+import React, { useRef, useEffect, memo } from 'react';
 
-const Landscape = ({ worldData, tileSize }) => {
+// One canvas per streamed chunk, so a newly loaded chunk is drawn on its own
+// and nothing else is redrawn
+const ChunkCanvas = memo(({ chunk, chunkSize, tileSize }) => {
   const canvasRef = useRef(null);
 
   useEffect(() => {
-    if (!worldData) {
-      console.log('Missing world data:', worldData);
-      return;
-    }
-
     const canvas = canvasRef.current;
     if (!canvas) {
       console.error('Canvas ref is null');
@@ -16,50 +13,57 @@ const Landscape = ({ worldData, tileSize }) => {
     }
 
     const ctx = canvas.getContext('2d');
-	ctx.imageSmoothingEnabled = false;
-    const { width, height, tiles } = worldData;
-
-    console.log('World data:', { width, height, tileCount: tiles.length, tileSize });
-
-    canvas.width = width * tileSize;
-    canvas.height = height * tileSize;
-
-    console.log('Canvas dimensions:', { width: canvas.width, height: canvas.height });
-
+    ctx.imageSmoothingEnabled = false;
     ctx.clearRect(0, 0, canvas.width, canvas.height);
 
-    tiles.forEach(tile => {
-      ctx.fillStyle = tile.color;
-      ctx.fillRect(
-        tile.x * tileSize,
-        tile.y * tileSize,
-        tileSize,
-        tileSize
-      );
+    const originX = chunk.cx * chunkSize;
+    const originY = chunk.cy * chunkSize;
+    // Layers arrive in order, so higher layers are drawn over lower ones
+    chunk.layers.forEach(({ colors, tiles }) => {
+      for (let i = 0; i < tiles.length; i += 3) {
+        const x = (tiles[i] - originX) * tileSize;
+        const y = (tiles[i + 1] - originY) * tileSize;
+        ctx.fillStyle = colors[tiles[i + 2]];
+        ctx.fillRect(x, y, tileSize, tileSize);
 
-      ctx.strokeStyle = 'black';
-      ctx.lineWidth = 1;
-      ctx.strokeRect(
-        tile.x * tileSize,
-        tile.y * tileSize,
-        tileSize,
-        tileSize
-      );
+        ctx.strokeStyle = 'black';
+        ctx.lineWidth = 1;
+        ctx.strokeRect(x, y, tileSize, tileSize);
+      }
     });
-
-    console.log('Landscape rendered successfully');
-  }, [worldData, tileSize]);
+  }, [chunk, chunkSize, tileSize]);
 
   return (
     <canvas
       ref={canvasRef}
+      width={chunkSize * tileSize}
+      height={chunkSize * tileSize}
       style={{
         position: 'absolute',
-        top: 0,
-        left: 0,
+        left: chunk.cx * chunkSize * tileSize,
+        top: chunk.cy * chunkSize * tileSize,
       }}
     />
   );
-};
+});
+
+const Landscape = ({ chunks, chunkSize, tileSize }) => (
+  <div
+    style={{
+      position: 'absolute',
+      top: 0,
+      left: 0,
+    }}
+  >
+    {chunks.filter(chunk => chunk.layers.length > 0).map(chunk => (
+      <ChunkCanvas
+        key={`${chunk.cx},${chunk.cy}`}
+        chunk={chunk}
+        chunkSize={chunkSize}
+        tileSize={tileSize}
+      />
+    ))}
+  </div>
+);
 
-export default Landscape;
\ No newline at end of file
+export default Landscape;
@@ -2,6 +2,36 @@ import React, { useState, useRef, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { HexColorPicker, HexColorInput } from 'react-colorful';
 
+// Tiles by cell, with layers numbered by position as the server stores them
+const indexTiles = (layers) => {
+  const tiles = new Map();
+  layers.forEach((layer, layerIndex) => {
+    layer.data.forEach(({ x, y, color }) => {
+      tiles.set(`${layerIndex}:${x}:${y}`, { layer: layerIndex, x, y, color });
+    });
+  });
+  return tiles;
+};
+
+// Per-layer edits turning `saved` into `current`, in the format /maps/<id>/edits/ takes
+const diffTiles = (saved, current) => {
+  const edits = {};
+  const layerEdits = (layer) => {
+    if (!edits[layer]) edits[layer] = { layer, set: [], remove: [] };
+    return edits[layer];
+  };
+  current.forEach((tile, key) => {
+    const savedTile = saved.get(key);
+    if (!savedTile || savedTile.color !== tile.color) {
+      layerEdits(tile.layer).set.push({ x: tile.x, y: tile.y, color: tile.color });
+    }
+  });
+  saved.forEach((tile, key) => {
+    if (!current.has(key)) layerEdits(tile.layer).remove.push({ x: tile.x, y: tile.y });
+  });
+  return Object.values(edits);
+};
+
 const MapMaker = () => {
   const navigate = useNavigate();
   const [gridSize, setGridSize] = useState({ width: 20, height: 15 });
@@ -21,6 +51,8 @@ const MapMaker = () => {
   });
   const [activeLayer, setActiveLayer] = useState(1);
   const canvasRef = useRef(null);
+  // The map as the server holds it after our last save, so later saves only send changes
+  const savedMapRef = useRef(null);
 
   useEffect(() => {
     renderLayers();
@@ -118,27 +150,61 @@ const MapMaker = () => {
       return;
     }
 
-    const mapData = {
-      name: mapName,
-      width: gridSize.width,
-      height: gridSize.height,
-      layers: layers
-    };
-
-    try {
+    const saveFullMap = async () => {
       const response = await fetch('/api/game/save-map/', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify(mapData),
+        body: JSON.stringify({
+          name: mapName,
+          width: gridSize.width,
+          height: gridSize.height,
+          layers: layers
+        }),
       });
+      if (!response.ok) {
+        throw new Error('Network response was not ok');
+      }
+      return response.json();
+    };
 
+    // Resolves to null when someone else saved the map since, so it is saved in full instead
+    const saveEdits = async (saved, tiles) => {
+      const edits = diffTiles(saved.tiles, tiles);
+      if (edits.length === 0) return { map_id: saved.mapId, version: saved.version };
+      const response = await fetch(`/api/game/maps/${saved.mapId}/edits/`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({ base_version: saved.version, layers: edits }),
+      });
+      if (response.status === 409 || response.status === 404) return null;
       if (!response.ok) {
         throw new Error('Network response was not ok');
       }
+      return response.json();
+    };
 
-      const result = await response.json();
+    try {
+      const tiles = indexTiles(layers);
+      const saved = savedMapRef.current;
+      let result = null;
+      if (saved && saved.name === mapName && saved.width === gridSize.width && saved.height === gridSize.height) {
+        result = await saveEdits(saved, tiles);
+      }
+      if (!result) {
+        result = await saveFullMap();
+      }
+      savedMapRef.current = {
+        name: mapName,
+        width: gridSize.width,
+        height: gridSize.height,
+        mapId: result.map_id,
+        version: result.version,
+        tiles,
+      };
       alert(`Map saved successfully! Map ID: ${result.map_id}`);
     } catch (error) {
       console.error('Error saving map:', error);
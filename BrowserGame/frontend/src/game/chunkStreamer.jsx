@@ -0,0 +1,133 @@
+// Loads the map a chunk at a time around the player from /api/game/maps/<id>/chunks/,
+// so the first frame waits for a few chunks instead of the whole map. Chunks are
+// square, `chunkSize` tiles wide, and arrive with all of their layers.
+// Must match views.MAX_CHUNKS_PER_REQUEST
+const MAX_CHUNKS_PER_REQUEST = 64;
+// The layer players collide with; must match TileIndex's
+const SOLID_LAYER = 1;
+
+const chunkKey = (cx, cy) => `${cx},${cy}`;
+
+class ChunkStreamer {
+  // `radius` chunks around the player are loaded; chunks further than
+  // `keepRadius` are dropped again. `width` and `height` are the map's, in tiles.
+  constructor(url, chunkSize, { width, height, radius = 1, keepRadius = 2, onChange }) {
+    this.url = url;
+    this.chunkSize = chunkSize;
+    this.columns = Math.ceil(width / chunkSize);
+    this.rows = Math.ceil(height / chunkSize);
+    this.radius = radius;
+    this.keepRadius = keepRadius;
+    this.onChange = onChange;
+    this.chunks = new Map();
+    this.pending = new Set();
+    this.center = null;
+    this.position = null;
+    this.version = 0;
+  }
+
+  isNear(cx, cy, radius) {
+    return Math.abs(cx - this.center[0]) <= radius && Math.abs(cy - this.center[1]) <= radius;
+  }
+
+  // Tile coordinates of the player, as drawn; cheap to call every frame
+  update(tileX, tileY) {
+    this.position = [tileX, tileY];
+    const cx = Math.floor(tileX / this.chunkSize);
+    const cy = Math.floor(tileY / this.chunkSize);
+    if (this.center && this.center[0] === cx && this.center[1] === cy) return;
+    this.center = [cx, cy];
+
+    let dropped = false;
+    this.chunks.forEach((chunk, key) => {
+      if (!this.isNear(chunk.cx, chunk.cy, this.keepRadius)) {
+        this.chunks.delete(key);
+        dropped = true;
+      }
+    });
+
+    const missing = [];
+    for (let y = Math.max(cy - this.radius, 0); y <= Math.min(cy + this.radius, this.rows - 1); y++) {
+      for (let x = Math.max(cx - this.radius, 0); x <= Math.min(cx + this.radius, this.columns - 1); x++) {
+        const key = chunkKey(x, y);
+        if (!this.chunks.has(key) && !this.pending.has(key)) missing.push(key);
+      }
+    }
+    for (let i = 0; i < missing.length; i += MAX_CHUNKS_PER_REQUEST) {
+      this.load(missing.slice(i, i + MAX_CHUNKS_PER_REQUEST));
+    }
+    if (dropped) this.notify();
+  }
+
+  async load(keys) {
+    keys.forEach(key => this.pending.add(key));
+    try {
+      const response = await fetch(`${this.url}?keys=${keys.join(';')}`);
+      if (!response.ok) throw new Error(`HTTP ${response.status}`);
+      const data = await response.json();
+      // A map update sent while this was in flight already has newer tiles
+      if (data.version < this.version) return;
+      this.version = data.version;
+      // The player may have moved on while the request was in flight
+      data.chunks.forEach(chunk => {
+        if (this.isNear(chunk.cx, chunk.cy, this.keepRadius)) {
+          this.chunks.set(chunkKey(chunk.cx, chunk.cy), chunk);
+        }
+      });
+      this.notify();
+    } catch (error) {
+      console.error('Error loading map chunks:', error);
+    } finally {
+      keys.forEach(key => this.pending.delete(key));
+    }
+  }
+
+  // A `map` message from the game socket, sent when the map is edited: the
+  // changed chunks themselves, or the keys of chunks to fetch again, or with
+  // `stale` null, a new map size and everything to fetch again
+  applyUpdate(update) {
+    if (update.version <= this.version) return;
+    this.version = update.version;
+    if (update.stale === null) {
+      this.columns = Math.ceil(update.width / this.chunkSize);
+      this.rows = Math.ceil(update.height / this.chunkSize);
+      this.chunks.clear();
+      this.center = null;
+      if (this.position) this.update(...this.position);
+      this.notify();
+      return;
+    }
+    (update.chunks || []).forEach(chunk => {
+      if (this.center && this.isNear(chunk.cx, chunk.cy, this.keepRadius)) {
+        this.chunks.set(chunkKey(chunk.cx, chunk.cy), chunk);
+      }
+    });
+    const stale = (update.stale || []).map(([cx, cy]) => chunkKey(cx, cy)).filter(key => this.chunks.has(key));
+    stale.forEach(key => this.chunks.delete(key));
+    for (let i = 0; i < stale.length; i += MAX_CHUNKS_PER_REQUEST) {
+      this.load(stale.slice(i, i + MAX_CHUNKS_PER_REQUEST));
+    }
+    this.notify();
+  }
+
+  // Whether a loaded chunk has a solid tile at (x, y), in map coordinates.
+  // Chunks that are not loaded count as empty; the server corrects the rare
+  // prediction that walks into one of their tiles.
+  isSolid(x, y) {
+    const chunk = this.chunks.get(chunkKey(Math.floor(x / this.chunkSize), Math.floor(y / this.chunkSize)));
+    if (!chunk) return false;
+    if (!chunk.solid) {
+      chunk.solid = new Set();
+      chunk.layers.filter(({ layer }) => layer === SOLID_LAYER).forEach(({ tiles }) => {
+        for (let i = 0; i < tiles.length; i += 3) chunk.solid.add(chunkKey(tiles[i], tiles[i + 1]));
+      });
+    }
+    return chunk.solid.has(chunkKey(x, y));
+  }
+
+  notify() {
+    if (this.onChange) this.onChange(Array.from(this.chunks.values()));
+  }
+}
+
+export default ChunkStreamer;
@@ -0,0 +1,149 @@
+import { JOINT_NAMES } from './wireCodec';
+
+// Rebuilds skeletons from the animation parameters the server sends instead.
+// Must match backend/game_app/pose_evaluator.py and pose_table.py down to the
+// order of operations, so poses come out the same as the server's. Frames are
+// the server's own copy of animation_frames.json, from /api/game/animation-frames/.
+export const CLIP_IDLE = 0;
+export const CLIP_CROUCH_IDLE = 1;
+export const CLIP_MOVE = 2;
+export const CLIP_CROUCH_MOVE = 3;
+export const CLIP_JUMP = 4;
+export const CLIP_TURN = 5;
+export const CLIP_CROUCH_TURN = 6;
+const CLIP_BACKWARD = 0x80;
+const CLIP_BLENDED = 0x40;
+const ANIM_SCALE = 1000;
+// AnimationComponent.pose_table_resolution
+const TABLE_RESOLUTION = 64;
+
+// Each cycle goes PASS -> REACH over the first half and back over the second
+const CYCLE_FRAMES = {
+  WALK: ['WALK_PASS', 'WALK_REACH'],
+  RUN: ['RUN_PASS', 'RUN_REACH'],
+  CROUCH: ['CROUCH_PASS', 'CROUCH_REACH'],
+  JUMP: ['JUMP_START_END', 'JUMP_APEX'],
+};
+
+// Poses are flat [x0, y0, x1, y1, ...] arrays in JOINT_NAMES order
+const toArray = frame => Float64Array.from(JOINT_NAMES.flatMap(joint => frame[joint]));
+
+const toPose = points => {
+  const pose = {};
+  JOINT_NAMES.forEach((joint, i) => {
+    pose[joint] = [points[2 * i], points[2 * i + 1]];
+  });
+  return pose;
+};
+
+// Cubic Hermite blend with both tangents at (end - start) / 2
+const hermite = (start, end, t) => {
+  const t2 = t * t;
+  const t3 = t2 * t;
+  const h00 = 2 * t3 - 3 * t2 + 1;
+  const h01 = -2 * t3 + 3 * t2;
+  const h1 = t3 - 2 * t2 + t + t3 - t2;
+  const pose = new Float64Array(start.length);
+  for (let i = 0; i < start.length; i++) {
+    pose[i] = h00 * start[i] + h01 * end[i] + h1 * ((end[i] - start[i]) * 0.5);
+  }
+  return pose;
+};
+
+class PoseEvaluator {
+  constructor(frames) {
+    this.frames = {};
+    Object.entries(frames).forEach(([name, frame]) => {
+      this.frames[name] = toArray(frame);
+    });
+    this.flippedFrames = {};
+    this.samples = {};
+    this.steps = {};
+    Object.keys(CYCLE_FRAMES).forEach(cycle => {
+      [false, true].forEach(backward => this.bakeCycle(cycle, backward));
+    });
+  }
+
+  getFrame(name, backward) {
+    if (!backward) return this.frames[name];
+    const flippedName = `${name}_FLIP`;
+    if (this.frames[flippedName]) return this.frames[flippedName];
+    if (!this.flippedFrames[name]) {
+      const flipped = Float64Array.from(this.frames[name]);
+      for (let i = 0; i < flipped.length; i += 2) {
+        flipped[i] = 1 - flipped[i];
+      }
+      this.flippedFrames[name] = flipped;
+    }
+    return this.flippedFrames[name];
+  }
+
+  // Same samples as PoseTable: `TABLE_RESOLUTION + 1` evenly spaced poses per cycle
+  bakeCycle(cycle, backward) {
+    const [passName, reachName] = CYCLE_FRAMES[cycle];
+    const pass = this.getFrame(passName, backward);
+    const reach = this.getFrame(reachName, backward);
+    const step = 1 / TABLE_RESOLUTION;
+    const samples = [];
+    for (let i = 0; i <= TABLE_RESOLUTION; i++) {
+      const progress = i * step;
+      samples.push(progress < 0.5 ? hermite(pass, reach, progress * 2) : hermite(reach, pass, (progress - 0.5) * 2));
+    }
+    const steps = samples.slice(0, -1).map((sample, i) => sample.map((value, j) => samples[i + 1][j] - value));
+    this.samples[`${cycle}:${backward}`] = samples;
+    this.steps[`${cycle}:${backward}`] = steps;
+  }
+
+  sampleCycle(cycle, backward, progress) {
+    const position = Math.min(Math.max(progress, 0), 1) * TABLE_RESOLUTION;
+    const index = Math.trunc(position);
+    const samples = this.samples[`${cycle}:${backward}`];
+    if (index >= TABLE_RESOLUTION) return Float64Array.from(samples[TABLE_RESOLUTION]);
+    const sample = samples[index];
+    const steps = this.steps[`${cycle}:${backward}`][index];
+    const fraction = position - index;
+    return sample.map((value, i) => value + steps[i] * fraction);
+  }
+
+  layerPose(clip, backward, progress, blend) {
+    switch (clip) {
+      case CLIP_MOVE: {
+        const walk = this.sampleCycle('WALK', backward, progress);
+        const run = this.sampleCycle('RUN', backward, progress);
+        return walk.map((value, i) => value * (1 - blend) + run[i] * blend);
+      }
+      case CLIP_CROUCH_MOVE:
+        return this.sampleCycle('CROUCH', backward, progress);
+      case CLIP_JUMP:
+        return this.sampleCycle('JUMP', backward, progress);
+      case CLIP_TURN:
+        return hermite(this.getFrame('TURN_PASS', !backward), this.getFrame('TURN_REACH', backward), progress);
+      case CLIP_CROUCH_TURN:
+        return hermite(this.getFrame('CROUCH_IDLE', !backward), this.getFrame('CROUCH_IDLE', backward), progress);
+      case CLIP_CROUCH_IDLE:
+        return this.getFrame('CROUCH_IDLE', backward);
+      default:
+        return this.getFrame('IDLE', backward);
+    }
+  }
+
+  quantizedLayerPose(clipId, progress, blend) {
+    const clip = clipId & ~(CLIP_BACKWARD | CLIP_BLENDED);
+    return this.layerPose(clip, Boolean(clipId & CLIP_BACKWARD), progress / ANIM_SCALE, blend / ANIM_SCALE);
+  }
+
+  idle(backward, crouching) {
+    return toPose(this.getFrame(crouching ? 'CROUCH_IDLE' : 'IDLE', backward));
+  }
+
+  // `anim` is the quantized [clip, progress, blend] the server sends, followed
+  // by [mix, clip, progress, blend] while the pose mixes two layers
+  evaluate(anim) {
+    const first = this.quantizedLayerPose(anim[0], anim[1], anim[2]);
+    if (anim.length === 3) return toPose(first);
+    const second = this.quantizedLayerPose(anim[4], anim[5], anim[6]);
+    return toPose(hermite(first, second, anim[3] / ANIM_SCALE));
+  }
+}
+
+export default PoseEvaluator;
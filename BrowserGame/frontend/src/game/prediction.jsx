@@ -0,0 +1,104 @@
+// Client-side prediction of the local player, reconciled with the server.
+// The step below is MovementComponent.update_player_position, with the
+// arithmetic in the same order so both sides compute the same result, and
+// `params` is the server's MOVEMENT_PARAMS from /api/game/initialize/.
+
+// CollisionComponent.check_horizontal_collision for unit tiles: the nearest
+// solid tile the player's box overlaps at `newX`, scanning in the direction
+// of travel, stops the player against it
+const collideHorizontal = (oldX, newX, y, params, map) => {
+  const top = map.height - y - params.player_height;
+  const bottom = map.height - y;
+  const firstColumn = Math.max(Math.floor(newX - 1) + 1, 0);
+  const lastColumn = Math.min(Math.ceil(newX + params.player_width) - 1, map.width - 1);
+  const firstRow = Math.max(Math.floor(top - 1) + 1, 0);
+  const lastRow = Math.min(Math.ceil(bottom) - 1, map.height - 1);
+  const movingLeft = newX < oldX;
+  for (let i = 0; i <= lastColumn - firstColumn; i++) {
+    const column = movingLeft ? lastColumn - i : firstColumn + i;
+    for (let row = firstRow; row <= lastRow; row++) {
+      if (map.isSolid(column, row)) return oldX < column ? column - params.player_width : column + 1;
+    }
+  }
+  return newX;
+};
+
+// One tick of movement in direction `move` (-1, 0 or 1). `state` holds x, y,
+// speed and angle as the server sends them, and the direction of the
+// previous step.
+export const stepPlayer = (state, { move, running, crouching }, params, map) => {
+  const dt = params.update_interval;
+  let speed;
+  if (state.direction !== 0 && move !== state.direction) {
+    speed = 0;
+  } else if (crouching) {
+    speed = params.base_speed;
+  } else if (running && move !== 0) {
+    speed = Math.min(state.speed + params.acceleration_rate * dt, params.max_speed);
+  } else {
+    speed = Math.max(params.base_speed, state.speed - params.deceleration_rate * dt);
+  }
+
+  let targetAngle = 0;
+  if (Math.abs(speed - params.base_speed) > params.min_speed_for_tilt && move !== 0) {
+    targetAngle = move * params.max_tilt_angle * (speed - params.base_speed) / (params.max_speed - params.base_speed);
+  }
+  const angleChange = params.tilt_speed * dt;
+  let angle;
+  if (Math.abs(targetAngle - state.angle) <= angleChange) {
+    angle = targetAngle;
+  } else {
+    angle = state.angle + (targetAngle > state.angle ? angleChange : -angleChange);
+  }
+
+  let x = state.x + move * speed / params.tile_pixels * dt;
+  x = Math.min(Math.max(x, 0), map.width - params.player_width);
+  x = collideHorizontal(state.x, x, state.y, params, map);
+  return { x, y: state.y, speed, angle, direction: move };
+};
+
+// Every tick the player takes a numbered step, sent to the server and applied
+// here at once. States from the server say which step they include
+// (`input_seq`); the prediction is rebuilt from each one by replaying the
+// steps the server has not applied yet, so it only moves back when the
+// server disagreed. Vertical movement (gravity, jumps) is left to the server.
+// `map` has the map's width and height and an isSolid(x, y) tile lookup.
+class Prediction {
+  constructor(params, map, maxPending = 120) {
+    this.params = params;
+    this.map = map;
+    this.maxPending = maxPending;
+    this.pending = [];
+    this.nextSeq = 1;
+    // Direction of the last step the server applied
+    this.direction = 0;
+    this.state = null;
+  }
+
+  // Takes one tick's step and returns the input to send, or null when a step
+  // would change nothing, so a player standing still sends none
+  step(move, running, crouching) {
+    const { state, params } = this;
+    if (!state) return null;
+    if (move === 0 && state.direction === 0 && state.speed === params.base_speed && state.angle === 0) return null;
+    const input = { seq: this.nextSeq++, move, running, crouching };
+    this.pending.push(input);
+    if (this.pending.length > this.maxPending) this.pending.shift();
+    this.state = stepPlayer(state, input, params, this.map);
+    return input;
+  }
+
+  // `player` is the local player as decoded from the latest state frame
+  reconcile(player) {
+    while (this.pending.length && this.pending[0].seq <= player.input_seq) {
+      this.direction = this.pending.shift().move;
+    }
+    let state = { x: player.x, y: player.y, speed: player.speed, angle: player.angle, direction: this.direction };
+    this.pending.forEach(input => {
+      state = stepPlayer(state, input, this.params, this.map);
+    });
+    this.state = state;
+  }
+}
+
+export default Prediction;
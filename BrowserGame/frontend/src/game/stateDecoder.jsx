@@ -0,0 +1,121 @@
+// Must match the scales in backend/game_app/delta_encoder.py
+const POSITION_SCALE = 100;
+const ANGLE_SCALE = 100;
+const PIVOT_SCALE = 1000;
+const FLAG_BACKWARD = 1;
+const FLAG_CROUCHING = 2;
+const FLAG_RUNNING = 4;
+const FLAG_JUMPING = 8;
+// Level of detail, in bits 4-5 of flags
+const LOD_SHIFT = 4;
+const LOD_MASK = 3;
+const LOD_FULL = 0;
+const LOD_CLIP = 1;
+const MAX_SNAPSHOTS = 120;
+
+const mergePlayer = (base, changes) => {
+  if (!base) return changes;
+  const merged = { ...base, ...changes };
+  if (changes.pivot_points) {
+    merged.pivot_points = { ...base.pivot_points, ...changes.pivot_points };
+  }
+  return merged;
+};
+
+// Players below full detail are missing fields they were never sent; a
+// player that came closer keeps stale ones, which the LOD says to ignore.
+// Full detail is a skeleton, or animation parameters when the server
+// replicates those instead, and never both.
+const dequantizePivotPoints = (player, lod, poseEvaluator) => {
+  if (lod === LOD_FULL && player.pivot_points) {
+    const pivotPoints = {};
+    Object.entries(player.pivot_points).forEach(([joint, [x, y]]) => {
+      pivotPoints[joint] = [x / PIVOT_SCALE, y / PIVOT_SCALE];
+    });
+    return pivotPoints;
+  }
+  // Frames are still loading; the player is drawn once they arrive
+  if (!poseEvaluator) return undefined;
+  if (lod === LOD_FULL || lod === LOD_CLIP) return poseEvaluator.evaluate(player.anim);
+  return poseEvaluator.idle(Boolean(player.flags & FLAG_BACKWARD), Boolean(player.flags & FLAG_CROUCHING));
+};
+
+const dequantizePlayer = (player, poseEvaluator) => {
+  const lod = (player.flags >> LOD_SHIFT) & LOD_MASK;
+  const mousePosition = player.mouse_position || [0, 0];
+  return {
+    x: player.x / POSITION_SCALE,
+    y: player.y / POSITION_SCALE,
+    speed: (player.speed || 0) / POSITION_SCALE,
+    angle: (player.angle || 0) / ANGLE_SCALE,
+    direction: player.flags & FLAG_BACKWARD ? 'backward' : 'forward',
+    crouching: Boolean(player.flags & FLAG_CROUCHING),
+    running: Boolean(player.flags & FLAG_RUNNING),
+    jumping: Boolean(player.flags & FLAG_JUMPING),
+    mouse_position: { x: mousePosition[0], y: mousePosition[1] },
+    pivot_points: dequantizePivotPoints(player, lod, poseEvaluator),
+    // Last movement step of this player's client the server has applied; only
+    // sent at full detail, which a client's own player always is
+    input_seq: player.input_seq || 0,
+    lod,
+  };
+};
+
+// Rebuilds full game state from keyframes and deltas sent by the server.
+// Deltas reference a snapshot we acknowledged earlier, so every decoded
+// snapshot is kept (quantized) until the server moves past it. Skeletons
+// the server leaves out are rebuilt by `poseEvaluator` once it is set.
+class StateDecoder {
+  constructor(poseEvaluator = null) {
+    this.snapshots = new Map();
+    this.lastSeq = null;
+    this.poseEvaluator = poseEvaluator;
+  }
+
+  apply(frame) {
+    let players;
+    if (frame.type === 'key') {
+      players = frame.players;
+    } else {
+      const base = this.snapshots.get(frame.base);
+      if (!base) return null;  // Wait for the next keyframe
+
+      players = {};
+      Object.entries(base).forEach(([id, player]) => {
+        players[id] = player;
+      });
+      Object.entries(frame.players).forEach(([id, changes]) => {
+        players[id] = mergePlayer(base[id], changes);
+      });
+      (frame.removed || []).forEach(id => {
+        delete players[id];
+      });
+      // Binary frames also list who is still in the game, which covers players
+      // who left since a baseline older than the frame that released them
+      if (frame.present) {
+        Object.keys(players).forEach(id => {
+          if (!frame.present.has(id)) delete players[id];
+        });
+      }
+
+      // The server never goes back to a baseline older than the one it just used
+      this.snapshots.forEach((_, seq) => {
+        if (seq < frame.base) this.snapshots.delete(seq);
+      });
+    }
+
+    this.snapshots.set(frame.seq, players);
+    if (this.snapshots.size > MAX_SNAPSHOTS) {
+      this.snapshots.delete(this.snapshots.keys().next().value);
+    }
+    this.lastSeq = frame.seq;
+
+    const state = {};
+    Object.entries(players).forEach(([id, player]) => {
+      state[id] = dequantizePlayer(player, this.poseEvaluator);
+    });
+    return state;
+  }
+}
+
+export default StateDecoder;
@@ -0,0 +1,155 @@
+// Binary layout must match backend/game_app/wire_codec.py
+export const BINARY_SUBPROTOCOL = 'browsergame.bin.v5';
+
+export const JOINT_NAMES = [
+  'top_head', 'neck', 'spine_01', 'spine_02', 'pelvis',
+  'r_shoulder', 'l_elbow', 'l_hand', 'r_elbow', 'r_hand',
+  'l_knee', 'l_ankle', 'l_toe', 'r_knee', 'r_ankle', 'r_toe',
+];
+
+const FRAME_KEY = 1;
+
+const FIELD_X = 1;
+const FIELD_Y = 2;
+const FIELD_SPEED = 4;
+const FIELD_ANGLE = 8;
+const FIELD_FLAGS = 16;
+const FIELD_MOUSE = 32;
+const FIELD_PIVOTS = 64;
+const FIELD_ANIM = 128;
+const FIELD_INPUT_SEQ = 256;
+const CLIP_BLENDED = 0x40;
+
+const INPUT_STEP = 1;
+const INPUT_RUNNING = 2;
+const INPUT_CROUCHING = 4;
+const INPUT_JUMP = 8;
+const INPUT_HAS_MOUSE = 16;
+const INPUT_HAS_ACK = 32;
+const INPUT_GUARD = 64;
+const INPUT_HAS_GUARD = 128;
+const INPUT_LEFT = 256;
+const INPUT_RIGHT = 512;
+const INPUT_SIZE = 14;
+
+const clampInt16 = value => Math.max(-32768, Math.min(32767, Math.round(value)));
+
+const textDecoder = new TextDecoder();
+
+// Decodes a binary state frame into the same shape as a JSON frame.
+// `table` maps player indices to ids and persists across frames.
+export const decodeBinaryFrame = (buffer, table) => {
+  const view = new DataView(buffer);
+  let offset = 0;
+
+  const type = view.getUint8(offset); offset += 1;
+  const seq = view.getUint32(offset, true); offset += 4;
+  const base = view.getUint32(offset, true); offset += 4;
+
+  // The table is kept across keyframes: a delta may still use a baseline
+  // from before the latest keyframe, so only released indices are dropped
+  const releasedCount = view.getUint16(offset, true); offset += 2;
+  for (let i = 0; i < releasedCount; i++) {
+    table.delete(view.getUint16(offset, true)); offset += 2;
+  }
+
+  const assignedCount = view.getUint16(offset, true); offset += 2;
+  for (let i = 0; i < assignedCount; i++) {
+    const index = view.getUint16(offset, true); offset += 2;
+    const length = view.getUint8(offset); offset += 1;
+    table.set(index, textDecoder.decode(new Uint8Array(buffer, offset, length))); offset += length;
+  }
+
+  const players = {};
+  const playerCount = view.getUint16(offset, true); offset += 2;
+  for (let i = 0; i < playerCount; i++) {
+    const id = table.get(view.getUint16(offset, true)); offset += 2;
+    const mask = view.getUint16(offset, true); offset += 2;
+    const player = {};
+    if (mask & FIELD_X) { player.x = view.getInt32(offset, true); offset += 4; }
+    if (mask & FIELD_Y) { player.y = view.getInt32(offset, true); offset += 4; }
+    if (mask & FIELD_SPEED) { player.speed = view.getInt16(offset, true); offset += 2; }
+    if (mask & FIELD_ANGLE) { player.angle = view.getInt16(offset, true); offset += 2; }
+    if (mask & FIELD_FLAGS) { player.flags = view.getUint8(offset); offset += 1; }
+    if (mask & FIELD_MOUSE) {
+      player.mouse_position = [view.getInt16(offset, true), view.getInt16(offset + 2, true)];
+      offset += 4;
+    }
+    if (mask & FIELD_PIVOTS) {
+      const jointMask = view.getUint16(offset, true); offset += 2;
+      player.pivot_points = {};
+      JOINT_NAMES.forEach((joint, bit) => {
+        if (jointMask & (1 << bit)) {
+          player.pivot_points[joint] = [view.getInt16(offset, true), view.getInt16(offset + 2, true)];
+          offset += 4;
+        }
+      });
+    }
+    if (mask & FIELD_ANIM) {
+      const clip = view.getUint8(offset);
+      player.anim = [clip, view.getInt16(offset + 1, true), view.getInt16(offset + 3, true)];
+      offset += 5;
+      if (clip & CLIP_BLENDED) {
+        player.anim.push(
+          view.getInt16(offset, true), view.getUint8(offset + 2),
+          view.getInt16(offset + 3, true), view.getInt16(offset + 5, true),
+        );
+        offset += 7;
+      }
+    }
+    if (mask & FIELD_INPUT_SEQ) { player.input_seq = view.getUint32(offset, true); offset += 4; }
+    players[id] = player;
+  }
+
+  // Players that left this client's view but are still in the game
+  const removed = [];
+  const removedCount = view.getUint16(offset, true); offset += 2;
+  for (let i = 0; i < removedCount; i++) {
+    removed.push(table.get(view.getUint16(offset, true))); offset += 2;
+  }
+
+  const frame = { type: type === FRAME_KEY ? 'key' : 'delta', seq, players, removed, present: new Set(table.values()) };
+  if (type !== FRAME_KEY) frame.base = base;
+  return frame;
+};
+
+export const encodeBinaryInput = (message) => {
+  const buffer = new ArrayBuffer(INPUT_SIZE);
+  const view = new DataView(buffer);
+  let flags = 0;
+  if (message.seq !== undefined && message.seq !== null) {
+    flags |= INPUT_STEP;
+    if (message.move > 0) flags |= INPUT_RIGHT;
+    else if (message.move < 0) flags |= INPUT_LEFT;
+  }
+  if (message.running) flags |= INPUT_RUNNING;
+  if (message.crouching) flags |= INPUT_CROUCHING;
+  if (message.jump) flags |= INPUT_JUMP;
+  if (message.player_mouse_position) flags |= INPUT_HAS_MOUSE;
+  if (message.ack !== undefined && message.ack !== null) flags |= INPUT_HAS_ACK;
+  if (message.guard !== undefined) flags |= INPUT_HAS_GUARD | (message.guard ? INPUT_GUARD : 0);
+
+  view.setUint16(0, flags, true);
+  view.setUint32(2, flags & INPUT_HAS_ACK ? message.ack : 0, true);
+  view.setUint32(6, flags & INPUT_STEP ? message.seq : 0, true);
+  if (message.player_mouse_position) {
+    view.setInt16(10, clampInt16(message.player_mouse_position.x), true);
+    view.setInt16(12, clampInt16(message.player_mouse_position.y), true);
+  }
+  return buffer;
+};
+
+export const decodeMessage = (data, table) => {
+  if (data instanceof ArrayBuffer) return decodeBinaryFrame(data, table);
+  return JSON.parse(data);
+};
+
+// Sends an input message in whichever format the server accepted
+export const sendInput = (socket, message) => {
+  if (!socket || socket.readyState !== WebSocket.OPEN) return;
+  if (socket.protocol === BINARY_SUBPROTOCOL) {
+    socket.send(encodeBinaryInput(message));
+  } else {
+    socket.send(JSON.stringify(message));
+  }
+};